@@ -1,18 +1,43 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, make_response
 from flask_cors import CORS
 import json
-import threading
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from utils.domain_gen import get_amazon_domain
-from services.amazon_scraper import amazon_category_top_products, scrape_amazon_product
-from services.prompt_builder import build_and_get_categories
+from services.amazon_scraper import (
+    async_amazon_category_top_products,
+    get_client_pool_stats,
+    get_coalescing_stats,
+    submit_coroutine,
+)
+from services.rate_limiter import get_rate_limit_stats
+from services.scrape_scheduler import INTERACTIVE, get_scrape_scheduler_stats, scrape_scheduler
+from services.circuit_breaker import get_circuit_breaker_stats
+from services.page_cache import get_search_cache_stats
+from services.category_cache import get_category_cache_stats
+from services.gemini_client import GEMINI_GENERATE_URL, get_gemini_client_stats
+from services.image_proxy import (
+    CACHE_CONTROL,
+    ImageNotFound,
+    get_image_proxy_stats,
+    image_proxy,
+    is_image_key,
+    rewrite_product_images,
+)
+from services.prefetcher import get_prefetch_stats, record_category_request, start_prefetcher
+from services.product_cache import get_product_cache_stats
+from services.prompt_builder import build_and_get_categories, stream_categories
 from services.sorting_algorithm import SortingAlgorithm
+from services.price_parser import filter_by_budget, get_price_parser
+from services.product import Product, dedupe_products, to_minor_units
+from utils.deadline import Deadline
 import re
 from threading import Lock
 from queue import Queue
 import random
 import time
+import uuid
 
 app = Flask(__name__)
 app.config['APP_NAME'] = 'Eventually Yours Shopping App'
@@ -30,6 +55,8 @@ CORS(app, resources={
 
 # Load environment variables
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+# Stream categories from Gemini and start scraping each one as it arrives ("false": wait for the full list)
+GEMINI_STREAM_CATEGORIES = os.getenv("GEMINI_STREAM_CATEGORIES", "true").lower() != "false"
 
 # Global variables to store user data and results
 user_sessions = {}
@@ -43,6 +70,15 @@ request_results = {}
 # Worker pool for concurrent processing - reduced for deployment
 worker_pool = ThreadPoolExecutor(max_workers=2)  # Reduced from 3 to 2
 
+# End-to-end latency budget for one recommendation request, every stage draws from it
+REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", "45"))
+# Budget kept back from scraping so Gemini ranking still gets a chance
+RANKING_RESERVE_SECONDS = 12
+# Below this, ranking is skipped and scraped products are returned as they are
+MIN_RANKING_SECONDS = 5
+# Extra time the HTTP handler waits so the worker can return its own fallback response
+RESPONSE_GRACE_SECONDS = 2
+
 
 @app.route("/api/health", methods=["GET"])
 def health_check():
@@ -240,6 +276,23 @@ def get_currency_symbol(location):
     return currency_map.get(location, "$")
 
 
+def public_base_url():
+    """Origin clients reach this API at (PUBLIC_API_URL, or the request's own), for absolute URLs in responses"""
+    configured = os.getenv("PUBLIC_API_URL")
+    if configured:
+        return configured.rstrip("/")
+    scheme = request.headers.get("X-Forwarded-Proto", request.scheme).split(",")[0].strip()
+    return f"{scheme}://{request.host}"
+
+
+def format_products(products, currency_symbol, category, reasoning, start_id=1):
+    """Serialize Product records to the frontend product shape"""
+    return [
+        product.to_api(str(start_id + i), currency_symbol, category, reasoning)
+        for i, product in enumerate(products)
+    ]
+
+
 def parse_ai_recommendations(sorted_products_text):
     """Parse AI recommendations text into structured product objects"""
     import re
@@ -315,6 +368,81 @@ def parse_ai_recommendations(sorted_products_text):
     return ai_recommendations
 
 
+def clean_categories(categories):
+    """Strip markdown bullets, parenthesised brand examples and "e.g." from Gemini category lines"""
+    cleaned_categories = []
+    for category in categories:
+        # Remove bullet points and clean the category name
+        clean_cat = category.replace("*", "").replace("  ", " ").strip()
+        # Remove brand examples in parentheses
+        clean_cat = re.sub(r'\s*\([^)]*\)', '', clean_cat)
+        # Remove "e.g." and similar text
+        clean_cat = re.sub(r'\s*e\.g\.,?\s*', '', clean_cat)
+        clean_cat = clean_cat.strip()
+        if clean_cat and len(clean_cat) > 2:
+            cleaned_categories.append(clean_cat)
+    return cleaned_categories
+
+
+# Keyword groups used to find what kind of product a shopping request is about
+CATEGORY_KEYWORDS = {
+    'music': ['music', 'song', 'album', 'artist', 'band', 'vinyl', 'cd', 'spotify', 'apple music', 'headphones', 'speaker', 'audio'],
+    'gaming': ['game', 'gaming', 'console', 'controller', 'headset', 'pc gaming', 'playstation', 'xbox', 'nintendo'],
+    'sports': ['sport', 'basketball', 'football', 'cricket', 'fitness', 'exercise', 'workout', 'training', 'athletic'],
+    'tech': ['tech', 'technology', 'computer', 'laptop', 'phone', 'tablet', 'accessory', 'gadget', 'electronic'],
+    'fashion': ['clothes', 'fashion', 'clothing', 'shirt', 'dress', 'shoes', 'sneakers', 'outfit', 'style'],
+    'books': ['book', 'reading', 'novel', 'textbook', 'kindle', 'ebook', 'literature', 'author'],
+    'home': ['home', 'kitchen', 'furniture', 'decor', 'appliance', 'garden', 'outdoor', 'household'],
+    'automotive': ['car', 'automotive', 'vehicle', 'accessory', 'maintenance', 'parts', 'tools'],
+    'beauty': ['beauty', 'makeup', 'skincare', 'cosmetic', 'perfume', 'lotion', 'cream'],
+    'food': ['food', 'cooking', 'recipe', 'ingredient', 'snack', 'beverage', 'drink'],
+    'pet': ['pet', 'dog', 'cat', 'animal', 'pet food', 'toy', 'accessory'],
+    'baby': ['baby', 'infant', 'toddler', 'diaper', 'toy', 'clothing'],
+    'office': ['office', 'work', 'desk', 'stationery', 'paper', 'pen', 'notebook'],
+    'travel': ['travel', 'luggage', 'backpack', 'suitcase', 'trip', 'vacation'],
+    'art': ['art', 'craft', 'painting', 'drawing', 'creative', 'diy', 'hobby']
+}
+
+
+def primary_category_for(shopping_request):
+    """Keyword group with the most matches in the (lowercased) shopping request, None when nothing matches"""
+    category_scores = {}
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        score = sum(1 for keyword in keywords if keyword in shopping_request)
+        if score > 0:
+            category_scores[category] = score
+    return max(category_scores, key=category_scores.get) if category_scores else None
+
+
+def _matches_primary(category, primary_category):
+    return any(keyword in category.lower() for keyword in CATEGORY_KEYWORDS[primary_category])
+
+
+def prioritize_categories(categories, brands, primary_category):
+    """Order Gemini categories: ones naming a preferred brand first, else ones matching the request's keyword group"""
+    if brands:
+        brand_categories = [cat for cat in categories if any(brand in cat.lower() for brand in brands)]
+        if brand_categories:
+            return brand_categories + [cat for cat in categories if cat not in brand_categories]
+    if primary_category:
+        primary_categories = [cat for cat in categories if _matches_primary(cat, primary_category)]
+        other_categories = [cat for cat in categories if not _matches_primary(cat, primary_category)]
+        return primary_categories + other_categories
+    return categories
+
+
+def is_top_priority(category, brands, primary_category):
+    """
+    Whether prioritize_categories() puts `category` in its first group whatever else
+    Gemini returns, so its scrape can start before the full list is known
+    """
+    if brands:
+        return any(brand in category.lower() for brand in brands)
+    if primary_category:
+        return _matches_primary(category, primary_category)
+    return True
+
+
 @app.route("/api/shopping-recommendations", methods=["POST", "OPTIONS"])
 def get_shopping_recommendations():
     """Get product recommendations based on user input and stored user data"""
@@ -381,14 +509,15 @@ def get_shopping_recommendations():
             active_requests[session_id] = True
 
         try:
+            # The budget starts when the request arrives, time spent queued for a worker counts
+            deadline = Deadline(REQUEST_BUDGET_SECONDS)
+
             # Submit request to worker pool for concurrent processing
-            future = worker_pool.submit(process_recommendation_request, data)
+            future = worker_pool.submit(process_recommendation_request, data, deadline)
             
             # Wait for result with reduced timeout for faster response
             try:
-                # Shorter timeout for production to prevent worker timeouts
-                timeout_seconds = 45 if IS_PRODUCTION else 45
-                result = future.result(timeout=timeout_seconds)
+                result = future.result(timeout=deadline.remaining() + RESPONSE_GRACE_SECONDS)
                 
                 # Remove from active requests
                 with processing_lock:
@@ -399,6 +528,9 @@ def get_shopping_recommendations():
                 if isinstance(result, tuple):
                     return jsonify(result[0]), result[1]
                 else:
+                    # Thumbnails are served through the caching image proxy
+                    if image_proxy is not None and result.get("products"):
+                        rewrite_product_images(result["products"], public_base_url())
                     return jsonify(result)
                     
             except Exception as e:
@@ -438,6 +570,33 @@ def get_shopping_recommendations():
         return jsonify({"status": "error", "message": str(e).strip()}), 500
 
 
+@app.route("/api/image/<key>", methods=["GET"])
+def get_product_image(key):
+    """Product thumbnail from the image cache, fetched from Amazon's CDN on a miss"""
+    if image_proxy is None or not is_image_key(key):
+        return jsonify({"status": "error", "message": "Image not found"}), 404
+
+    # Images never change for a key, so a client that has it needs nothing else, as long as
+    # the key names a real image: one that is neither cached nor on the CDN is a 404 either way
+    not_modified = request.if_none_match.contains(key)
+    try:
+        content = None if not_modified and image_proxy.has(key) else image_proxy.get(key)
+    except ImageNotFound:
+        return jsonify({"status": "error", "message": "Image not found"}), 404
+    except Exception as e:
+        print(f"Error fetching image {key}: {str(e).strip()}")
+        return jsonify({"status": "error", "message": "Image temporarily unavailable"}), 502
+    if not_modified:
+        image_proxy.record_not_modified()
+        response = make_response("", 304)
+    else:
+        response = make_response(content)
+        response.headers["Content-Type"] = image_proxy.content_type(key)
+    response.set_etag(key)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
 @app.route("/api/export-data/<session_id>", methods=["GET"])
 def export_user_data(session_id):
     """Export user data for download"""
@@ -535,7 +694,18 @@ def get_worker_stats():
                 "active_request_sessions": list(active_requests.keys()),
                 "worker_pool_size": worker_pool._max_workers,
                 "total_sessions": len(user_sessions),
-                "sessions_with_results": len([s for s in user_sessions.values() if "results" in s])
+                "sessions_with_results": len([s for s in user_sessions.values() if "results" in s]),
+                "rate_limits": get_rate_limit_stats(),
+                "circuit_breakers": get_circuit_breaker_stats(),
+                "search_cache": get_search_cache_stats(),
+                "product_cache": get_product_cache_stats(),
+                "http_clients": get_client_pool_stats(),
+                "scrape_scheduler": get_scrape_scheduler_stats(),
+                "category_coalescing": get_coalescing_stats(),
+                "prefetch": get_prefetch_stats(),
+                "image_proxy": get_image_proxy_stats(),
+                "category_cache": get_category_cache_stats(),
+                "gemini": get_gemini_client_stats(),
             }
             return jsonify({"status": "success", "stats": stats})
                 
@@ -543,11 +713,10 @@ def get_worker_stats():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
-def process_recommendation_request(request_data):
-    """Process a single recommendation request concurrently"""
-    # Set global timeout for entire process
-    global_start_time = time.time()
-    global_timeout = 45  # 45 seconds total timeout
+def process_recommendation_request(request_data, deadline=None):
+    """Process a single recommendation request concurrently within the request's deadline"""
+    if deadline is None:
+        deadline = Deadline(REQUEST_BUDGET_SECONDS)
     
     session_id = request_data.get("session_id")
     shopping_input = request_data.get("shopping_input", {})
@@ -575,9 +744,8 @@ def process_recommendation_request(request_data):
         print(f"Processing recommendation request for session: {session_id}")
         
         # Check global timeout
-        elapsed = time.time() - global_start_time
-        if elapsed >= global_timeout:
-            print(f"⏰ Global timeout reached ({elapsed:.1f}s), returning error")
+        if deadline.expired():
+            print(f"⏰ Global timeout reached ({deadline.elapsed():.1f}s), returning error")
             return {"status": "error", "message": "Request timed out. Please try again."}, 408
         
         if session_id not in user_sessions:
@@ -606,143 +774,33 @@ def process_recommendation_request(request_data):
         {brand_emphasis}
         """
 
-        # Get categories from Gemini
-        categories = build_and_get_categories(
-            GEMINI_API_KEY, user_input, user_data["user_location"], user_data
-        )
-        
-        if not categories:
-            return {"status": "error", "message": "Failed to get categories from Gemini API"}, 500
-
-        # Filter and prioritize categories based on user request and brand preferences
-        shopping_request = shopping_input.get('shoppingInput', '').lower()
-        filtered_categories = []
-        
-        # Define keyword mappings for different types of requests
-        category_keywords = {
-            'music': ['music', 'song', 'album', 'artist', 'band', 'vinyl', 'cd', 'spotify', 'apple music', 'headphones', 'speaker', 'audio'],
-            'gaming': ['game', 'gaming', 'console', 'controller', 'headset', 'pc gaming', 'playstation', 'xbox', 'nintendo'],
-            'sports': ['sport', 'basketball', 'football', 'cricket', 'fitness', 'exercise', 'workout', 'training', 'athletic'],
-            'tech': ['tech', 'technology', 'computer', 'laptop', 'phone', 'tablet', 'accessory', 'gadget', 'electronic'],
-            'fashion': ['clothes', 'fashion', 'clothing', 'shirt', 'dress', 'shoes', 'sneakers', 'outfit', 'style'],
-            'books': ['book', 'reading', 'novel', 'textbook', 'kindle', 'ebook', 'literature', 'author'],
-            'home': ['home', 'kitchen', 'furniture', 'decor', 'appliance', 'garden', 'outdoor', 'household'],
-            'automotive': ['car', 'automotive', 'vehicle', 'accessory', 'maintenance', 'parts', 'tools'],
-            'beauty': ['beauty', 'makeup', 'skincare', 'cosmetic', 'perfume', 'lotion', 'cream'],
-            'food': ['food', 'cooking', 'recipe', 'ingredient', 'snack', 'beverage', 'drink'],
-            'pet': ['pet', 'dog', 'cat', 'animal', 'pet food', 'toy', 'accessory'],
-            'baby': ['baby', 'infant', 'toddler', 'diaper', 'toy', 'clothing'],
-            'office': ['office', 'work', 'desk', 'stationery', 'paper', 'pen', 'notebook'],
-            'travel': ['travel', 'luggage', 'backpack', 'suitcase', 'trip', 'vacation'],
-            'art': ['art', 'craft', 'painting', 'drawing', 'creative', 'diy', 'hobby']
-        }
-        
-        # Determine the primary category based on user request
-        primary_category = None
-        category_scores = {}
-        
-        # Score each category based on keyword matches
-        for category, keywords in category_keywords.items():
-            score = 0
-            for keyword in keywords:
-                if keyword in shopping_request:
-                    score += 1
-            if score > 0:
-                category_scores[category] = score
-        
-        # Get the category with the highest score
-        if category_scores:
-            primary_category = max(category_scores, key=category_scores.get)
-        else:
-            # Try to extract keywords from the request for better matching
-            request_words = shopping_request.split()
-            
-            # Check if any of the user's favorite categories match the request
-            user_categories = user_data.get('favorite_categories', [])
-            for user_cat in user_categories:
-                if user_cat.lower() in shopping_request:
-                    break
-        
-        # Enhanced category filtering with brand priority
-        if preferred_brands and preferred_brands.strip():
-            brands = [brand.strip().lower() for brand in preferred_brands.split(',') if brand.strip()]
-            
-            # First, prioritize categories that contain brand names
-            brand_categories = []
-            other_categories = []
-            
-            for category in categories:
-                category_lower = category.lower()
-                brand_found = False
-                
-                for brand in brands:
-                    if brand in category_lower:
-                        brand_categories.append(category)
-                        brand_found = True
-                        break
-                
-                if not brand_found:
-                    other_categories.append(category)
-            
-            # If we found brand-specific categories, prioritize them
-            if brand_categories:
-                filtered_categories = brand_categories + other_categories
-            else:
-                # If no brand-specific categories, use primary category logic
-                if primary_category:
-                    primary_keywords = category_keywords[primary_category]
-                    primary_categories = [cat for cat in categories if any(keyword in cat.lower() for keyword in primary_keywords)]
-                    other_categories = [cat for cat in categories if not any(keyword in cat.lower() for keyword in primary_keywords)]
-                    filtered_categories = primary_categories + other_categories
-                else:
-                    filtered_categories = categories
-        else:
-            # If no brands specified, use original logic
-            if primary_category:
-                primary_keywords = category_keywords[primary_category]
-                primary_categories = [cat for cat in categories if any(keyword in cat.lower() for keyword in primary_keywords)]
-                other_categories = [cat for cat in categories if not any(keyword in cat.lower() for keyword in primary_keywords)]
-                filtered_categories = primary_categories + other_categories
-            else:
-                filtered_categories = categories
-
-        # Process all categories for maximum variety - let Gemini select the best
-        filtered_categories = filtered_categories
-        
-        # Clean category names for better scraping
-        cleaned_categories = []
-        for category in filtered_categories:
-            # Remove bullet points and clean the category name
-            clean_cat = category.replace("*", "").replace("  ", " ").strip()
-            # Remove brand examples in parentheses
-            clean_cat = re.sub(r'\s*\([^)]*\)', '', clean_cat)
-            # Remove "e.g." and similar text
-            clean_cat = re.sub(r'\s*e\.g\.,?\s*', '', clean_cat)
-            clean_cat = clean_cat.strip()
-            if clean_cat and len(clean_cat) > 2:
-                cleaned_categories.append(clean_cat)
-        
-        categories = cleaned_categories
-
         # Get Amazon domain
         amazon_domain = get_amazon_domain(user_data["user_location"])
 
+        # Get currency symbol (needed by every response formatter below)
+        currency_symbol = get_currency_symbol(user_data.get("user_location", ""))
+
         # Dictionary to store category -> products
         category_products = {}
 
-        def fetch_category_products(category):
+        # Budget in the marketplace's minor units, parsed once and compared as integers per product
+        budget = get_price_parser(amazon_domain).parse_budget(user_data.get("budget_range"))
+
+        async def fetch_category_products(category, deadline):
             """Fetch products for a category with enhanced error handling"""
             try:
                 # Extract preferred brands from shopping input
                 preferred_brands = shopping_input.get('brandsPreferred', '')
+                record_category_request(amazon_domain, category, user_data.get("budget_range"), preferred_brands)
                 
                 # Get products directly from search results with better error handling
-                scraped_products = amazon_category_top_products(
+                scraped_products = await async_amazon_category_top_products(
                     category,
                     amazon_domain,
                     num_results=random.randint(2, 3),  # Reduced to 2-3 products per category
                     budget_range=user_data.get("budget_range"),
                     preferred_brands=preferred_brands,  # Pass preferred brands to scraper
+                    deadline=deadline,  # Retries are only scheduled while they can still finish
                 )
                 
                 if not scraped_products:
@@ -751,9 +809,14 @@ def process_recommendation_request(request_data):
 
                 # Process and score the scraped products
                 scored_products = []
+                in_budget = filter_by_budget(
+                    [product.price_minor if product else None for product in scraped_products], budget
+                )
                 
-                for product in scraped_products:
-                    if not product or not product.get('title'):
+                for product, affordable in zip(scraped_products, in_budget):
+                    if not product or not product.title:
+                        continue
+                    if not affordable:
                         continue
                         
                     # Enhanced brand filtering and scoring
@@ -762,7 +825,7 @@ def process_recommendation_request(request_data):
                     # Check if product title contains preferred brands
                     if preferred_brands and preferred_brands.strip():
                         brands = [brand.strip().lower() for brand in preferred_brands.split(',') if brand.strip()]
-                        product_title = product.get('title', '').lower()
+                        product_title = product.title.lower()
                         
                         # Check brand matches in title
                         for brand in brands:
@@ -775,32 +838,15 @@ def process_recommendation_request(request_data):
                                 product_score += 5  # Medium score for partial brand match
                                 break
                     
-                    # Filter products by budget range if price_value is available
-                    budget_range = user_data.get("budget_range")
-                    if budget_range and product.get("price_value") is not None:
-                        try:
-                            low, high = (
-                                budget_range.replace("€", "")
-                                .replace("$", "")
-                                .replace("£", "")
-                                .split("-")
-                            )
-                            low = float(low.strip())
-                            high = float(high.strip())
-                            if low <= product["price_value"] <= high:
-                                # Add budget score (closer to middle of range gets higher score)
-                                budget_mid = (low + high) / 2
-                                price_diff = abs(product["price_value"] - budget_mid)
-                                budget_score = max(0, 5 - (price_diff / budget_mid) * 5)
-                                product_score += budget_score
-                                scored_products.append((product, product_score))
-                        except Exception as e:
-                            # If budget parsing fails, include product anyway
-                            print(f"⚠️ Budget parsing failed for {category}: {str(e)}")
-                            scored_products.append((product, product_score))
-                    else:
-                        # If no budget range or price value, include product with base score
-                        scored_products.append((product, product_score))
+                    # Products in the budget range get a budget score (closer to middle of range gets higher score)
+                    if budget and product.price_minor is not None:
+                        budget_mid = (budget[0] + budget[1]) / 2
+                        if budget_mid:
+                            price_diff = abs(product.price_minor - budget_mid)
+                            product_score += max(0, 5 - (price_diff / budget_mid) * 5)
+
+                    # Products without a price or budget range are kept with their base score
+                    scored_products.append((product, product_score))
                 
                 # Sort by score and return top products
                 scored_products.sort(key=lambda x: x[1], reverse=True)
@@ -816,95 +862,133 @@ def process_recommendation_request(request_data):
         # --- PRODUCTION-ONLY LIMIT AND DELAY ---
         if IS_PRODUCTION:
             max_categories = 2  # Further reduced to 2 for better reliability
-            categories_to_process = categories[:max_categories]
-            print(f"Production mode: Processing {len(categories_to_process)} categories")
         else:
             max_categories = 3  # Reduced to 3 for development too
-            categories_to_process = categories[:max_categories]
-            print(f"Development mode: Processing {len(categories_to_process)} categories")
 
-        # Controlled concurrent processing with limited workers
-        # Use a smaller thread pool to avoid overwhelming Amazon
-        # Adjust concurrency based on environment
-        if IS_PRODUCTION:
-            max_workers = 1  # Single worker for maximum reliability
-        else:
-            max_workers = 1  # Single worker for development too for consistency
-            
-        category_worker_pool = ThreadPoolExecutor(max_workers=max_workers)
+        # All categories are scraped concurrently on the shared scraper event loop as one
+        # interactive job of the process-wide scrape scheduler, which shares each
+        # marketplace's request slots fairly between the requests being served
+        scrape_job_id = f"{session_id}:{uuid.uuid4().hex[:8]}"
         category_futures = {}
-        category_products = {}
 
-        print(f"🚀 Starting concurrent processing with {len(categories_to_process)} categories using {max_workers} workers")
-        print(f"⏱️  Scraping timeout: 30 seconds maximum (IS_PRODUCTION={IS_PRODUCTION})")
+        timeout_seconds = 25 if IS_PRODUCTION else 30  # Shorter timeout in production
+        timeout_reached = False
+        scrape_deadline = None
+
+        def submit_category(category):
+            nonlocal scrape_deadline
+            if scrape_deadline is None:
+                # Scraping gets what is left of the request budget (at most timeout_seconds) minus
+                # the ranking reserve, counted from the first scrape. Request retries back off on
+                # the scraper event loop within it, so no request thread sleeps and nothing is
+                # retried after we stop waiting
+                scrape_deadline = deadline.child(timeout_seconds, reserve=RANKING_RESERVE_SECONDS)
+                print(f"⏱️  Scraping budget: {scrape_deadline.remaining():.1f} seconds (IS_PRODUCTION={IS_PRODUCTION})")
+            category_futures[category] = submit_coroutine(
+                scrape_scheduler.run(fetch_category_products(category, scrape_deadline), scrape_job_id, INTERACTIVE)
+            )
+            print(f"📋 Submitted category {len(category_futures)}/{max_categories}: {category}")
 
-        # Submit all categories for concurrent processing
-        for idx, category in enumerate(categories_to_process):
-            future = category_worker_pool.submit(fetch_category_products, category)
-            category_futures[category] = future
-            print(f"📋 Submitted category {idx + 1}/{len(categories_to_process)}: {category}")
+        try:
+            # Filter and prioritize categories based on user request and brand preferences
+            shopping_request = shopping_input.get('shoppingInput', '').lower()
+            brands = [brand.strip().lower() for brand in preferred_brands.split(',') if brand.strip()]
+            primary_category = primary_category_for(shopping_request)
 
-        # Track successful and failed categories
-        successful_categories = 0
-        failed_categories = 0
+            # Get categories from Gemini
+            if GEMINI_STREAM_CATEGORIES:
+                # Categories certain to be scraped start while Gemini is still writing the rest
+                categories = []
+                try:
+                    for category in stream_categories(
+                        GEMINI_API_KEY, user_input, user_data["user_location"], user_data, deadline=deadline
+                    ):
+                        categories.append(category)
+                        cleaned = clean_categories([category])
+                        if (
+                            cleaned
+                            and cleaned[0] not in category_futures
+                            and len(category_futures) < max_categories
+                            and is_top_priority(category, brands, primary_category)
+                        ):
+                            submit_category(cleaned[0])
+                except Exception as e:
+                    if not categories:
+                        raise
+                    print(f"⚠️ Category stream broke off after {len(categories)} categories, continuing with those: {e}")
+            else:
+                categories = build_and_get_categories(
+                    GEMINI_API_KEY, user_input, user_data["user_location"], user_data, deadline=deadline
+                )
 
-        print(f"⏳ Waiting for {len(category_futures)} categories to complete ({timeout_seconds} second timeout)...")
+            if not categories:
+                return {"status": "error", "message": "Failed to get categories from Gemini API"}, 500
 
-        # Collect results with shorter timeout for better reliability
-        start_time = time.time()
-        timeout_seconds = 25 if IS_PRODUCTION else 30  # Shorter timeout in production
-        timeout_reached = False
+            # Process all categories for maximum variety - let Gemini select the best
+            filtered_categories = prioritize_categories(categories, brands, primary_category)
+
+            # Clean category names for better scraping
+            categories = clean_categories(filtered_categories)
+            categories_to_process = categories[:max_categories]
+            print(f"{'Production' if IS_PRODUCTION else 'Development'} mode: Processing {len(categories_to_process)} categories")
+
+            # Collect results with shorter timeout for better reliability
+            start_time = time.time()
+
+            # Submit the remaining categories for concurrent processing
+            for category in categories_to_process:
+                if category not in category_futures:
+                    submit_category(category)
+            if scrape_deadline is None:
+                scrape_deadline = deadline.child(timeout_seconds, reserve=RANKING_RESERVE_SECONDS)
+            print(f"🚀 Processing {len(category_futures)} categories concurrently on the scraper event loop")
+
+            # Track successful and failed categories
+            successful_categories = 0
+            failed_categories = 0
+
+            print(f"⏳ Waiting for {len(category_futures)} categories to complete ({scrape_deadline.remaining():.1f} second budget)...")
         
-        for idx, (category, future) in enumerate(category_futures.items()):
-            # Check if we've exceeded the 30-second timeout
-            elapsed_time = time.time() - start_time
-            if elapsed_time >= timeout_seconds:
-                print(f"⏰ {timeout_seconds}-second timeout reached! Stopping scraping and using {successful_categories} successful categories")
-                timeout_reached = True
-                break
+            for idx, (category, future) in enumerate(category_futures.items()):
+                # Check if the scraping budget is used up
+                elapsed_time = time.time() - start_time
+                remaining_time = scrape_deadline.remaining()
+                if remaining_time <= 0:
+                    print(f"⏰ Scraping budget used up! Stopping scraping and using {successful_categories} successful categories")
+                    timeout_reached = True
+                    break
                 
-            print(f"🔄 Processing result {idx + 1}/{len(category_futures)}: {category} (elapsed: {elapsed_time:.1f}s)")
-            max_retries = 1  # Allow 1 retry per category in concurrent mode
-            retry_count = 0
-            success = False
-            
-            while retry_count <= max_retries and not success:
+                print(f"🔄 Processing result {idx + 1}/{len(category_futures)}: {category} (elapsed: {elapsed_time:.1f}s)")
                 try:
-                    # Calculate remaining time for this category
-                    remaining_time = timeout_seconds - (time.time() - start_time)
-                    if remaining_time <= 0:
-                        print(f"⏰ Timeout reached while processing {category}, stopping scraping")
-                        timeout_reached = True
-                        break
-                        
                     # Wait for each category with remaining timeout
                     category_name, products = future.result(timeout=remaining_time)
                     category_products[category] = products
                     successful_categories += 1
-                    success = True
                     print(f"✅ Successfully processed category: {category} ({len(products)} products)")
+                except FuturesTimeoutError:
+                    print(f"⏰ Timeout reached while processing {category}, stopping scraping")
+                    category_products[category] = []
+                    failed_categories += 1
+                    timeout_reached = True
+                    break
                 except Exception as e:
-                    retry_count += 1
-                    print(f"❌ Error processing category {category} (attempt {retry_count}/{max_retries + 1}): {str(e).strip()}")
-                    
-                    if retry_count <= max_retries:
-                        print(f"🔄 Retrying category {category} in 3 seconds...")
-                        import time
-                        time.sleep(3)  # Wait before retry
-                        # Submit a new future for retry
-                        future = category_worker_pool.submit(fetch_category_products, category)
-                    else:
-                        print(f"❌ Failed to process category {category} after {max_retries + 1} attempts")
-                        category_products[category] = []  # Empty list for failed category
-                        failed_categories += 1
-
-        # Shutdown the worker pool
-        category_worker_pool.shutdown(wait=False)  # Don't wait for completion since we have timeout
+                    print(f"❌ Failed to process category {category}: {str(e).strip()}")
+                    category_products[category] = []  # Empty list for failed category
+                    failed_categories += 1
+        finally:
+            # Cancel any scrapes still in flight so they stop taking request slots, nobody is waiting for them anymore
+            # (cancelling the futures as well covers scrapes the event loop has not started yet). This also runs when
+            # the category stream fails or the request returns early, after some scrapes were already submitted
+            abandoned = scrape_scheduler.cancel_job(scrape_job_id)
+            for future in category_futures.values():
+                future.cancel()
+            if abandoned:
+                print(f"🛑 Cancelled {abandoned} unfinished category scrapes")
 
         elapsed_time = time.time() - start_time
         print(f"📊 Category processing summary: {successful_categories} successful, {failed_categories} failed in {elapsed_time:.1f} seconds")
         if timeout_reached:
-            print(f"⚠️  Processing was cut off due to {timeout_seconds}-second timeout")
+            print("⚠️  Processing was cut off when the scraping budget ran out")
 
         # Check if we have any successful categories
         if successful_categories == 0:
@@ -912,19 +996,10 @@ def process_recommendation_request(request_data):
             fallback_products = generate_fallback_products(shopping_request, user_data)
             if fallback_products:
                 # Format fallback products
-                formatted_products = []
-                for i, product in enumerate(fallback_products):
-                    formatted_products.append({
-                        "id": str(i + 1),
-                        "name": product["title"],
-                        "price": product.get("price_value", 0),
-                        "currency": currency_symbol,
-                        "image": product.get("image_url", "/placeholder.svg"),
-                        "buyUrl": product.get("url", ""),
-                        "category": "Sample",
-                        "rating": product.get("rating", 4.0),
-                        "reasoning": "Sample product based on your interests",
-                    })
+                formatted_products = format_products(
+                    [Product.from_dict(product) for product in fallback_products],
+                    currency_symbol, "Sample", "Sample product based on your interests",
+                )
                 
                 response_data = {
                     "status": "success",
@@ -939,17 +1014,11 @@ def process_recommendation_request(request_data):
             else:
                 return {"status": "error", "message": "Unable to fetch product recommendations at this time. Amazon is temporarily blocking requests. Please try again in a few minutes."}, 503
 
-        # Check total processing time
-        total_elapsed = time.time() - start_time
-        if total_elapsed >= 45:  # 45 second total timeout
-            print(f"⏰ Total processing timeout reached ({total_elapsed:.1f}s), proceeding with available products")
-            
         print(f"📊 Proceeding to Gemini ranking with {successful_categories} successful categories")
 
         # Check global timeout before Gemini processing
-        global_elapsed = time.time() - global_start_time
-        if global_elapsed >= global_timeout:
-            print(f"⏰ Global timeout reached before Gemini processing ({global_elapsed:.1f}s)")
+        if deadline.expired():
+            print(f"⏰ Global timeout reached before Gemini processing ({deadline.elapsed():.1f}s)")
             # Use whatever products we have
             if successful_categories > 0:
                 print(f"📊 Using {successful_categories} successful categories despite timeout")
@@ -962,7 +1031,12 @@ def process_recommendation_request(request_data):
             all_products.extend(products)
 
         # Check if we have any real scraped products
-        valid_products = [p for p in all_products if p and p.get("title") and p.get("url")]
+        valid_products = [p for p in all_products if p and p.title and p.url]
+
+        # Overlapping categories and URL variants surface the same listing more than once
+        valid_products, duplicates_removed = dedupe_products(valid_products)
+        if duplicates_removed:
+            print(f"🧹 Removed {duplicates_removed} duplicate products before ranking ({len(valid_products)} unique)")
         
         # Increased product limits to better utilize scraped data
         if IS_PRODUCTION:
@@ -973,28 +1047,16 @@ def process_recommendation_request(request_data):
         if len(valid_products) > max_products:
             valid_products = valid_products[:max_products]
         
-        # Get currency symbol (moved here to fix scope issue)
-        currency_symbol = get_currency_symbol(user_data.get("user_location", ""))
-        
         if not valid_products:
             print(f"No valid products found for session {session_id}, using fallback products")
             # Fallback to sample products based on the detected category
             fallback_products = generate_fallback_products(shopping_request, user_data)
             if fallback_products:
                 # Format fallback products
-                formatted_products = []
-                for i, product in enumerate(fallback_products):
-                    formatted_products.append({
-                        "id": str(i + 1),
-                        "name": product["title"],
-                        "price": product.get("price_value", 0),
-                        "currency": currency_symbol,
-                        "image": product.get("image_url", "/placeholder.svg"),
-                        "buyUrl": product.get("url", ""),
-                        "category": "Sample",
-                        "rating": product.get("rating", 4.0),
-                        "reasoning": "Sample product based on your interests",
-                    })
+                formatted_products = format_products(
+                    [Product.from_dict(product) for product in fallback_products],
+                    currency_symbol, "Sample", "Sample product based on your interests",
+                )
                 
                 response_data = {
                     "status": "success",
@@ -1009,35 +1071,14 @@ def process_recommendation_request(request_data):
             else:
                 return {"status": "error", "message": "Unable to fetch product recommendations at this time. Please try again later."}, 503
 
-        # Check global timeout before Gemini API call
-        global_elapsed = time.time() - global_start_time
-        if global_elapsed >= global_timeout:
-            print(f"⏰ Global timeout reached before Gemini API ({global_elapsed:.1f}s), using scraped products directly")
+        # Ranking is optional: without enough budget left, return scraped products directly
+        if not deadline.has(MIN_RANKING_SECONDS):
+            print(f"⏰ Only {deadline.remaining():.1f}s left before Gemini API, using scraped products directly")
             # Use scraped products directly without Gemini ranking
-            formatted_products = []
-            for i, product in enumerate(valid_products[:6]):  # Limit to 6 for direct use
-                rating = 0
-                try:
-                    rating_str = str(product.get("average_rating", "0"))
-                    rating_clean = "".join(
-                        c for c in rating_str if c.isdigit() or c == "."
-                    )
-                    if rating_clean:
-                        rating = min(max(float(rating_clean), 0), 5)
-                except:
-                    pass
-
-                formatted_products.append({
-                    "id": str(i + 1),
-                    "name": product["title"],
-                    "price": product.get("price_value", 0) or 0,
-                    "currency": currency_symbol,
-                    "image": product.get("image_url", "/placeholder.svg"),
-                    "buyUrl": product.get("url", ""),
-                    "category": "Scraped",
-                    "rating": rating,
-                    "reasoning": "Product found through scraping",
-                })
+            formatted_products = format_products(
+                valid_products[:6],  # Limit to 6 for direct use
+                currency_symbol, "Scraped", "Product found through scraping",
+            )
 
             response_data = {
                 "status": "success",
@@ -1052,7 +1093,7 @@ def process_recommendation_request(request_data):
 
         # Now sort these products using the SortingAlgorithm
         sorting_algo = SortingAlgorithm(
-            "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent",
+            GEMINI_GENERATE_URL,
             GEMINI_API_KEY,
         )
 
@@ -1061,13 +1102,12 @@ def process_recommendation_request(request_data):
             print(f"🤖 Calling Gemini API for product ranking...")
             print(f"📊 Sending {len(valid_products)} scraped products to Gemini for ranking:")
             for i, product in enumerate(valid_products, 1):
-                print(f"   {i}. {product.get('title', 'No title')} - {product.get('price', 'No price')}")
+                print(f"   {i}. {product.title or 'No title'} - {product.price_text or 'No price'}")
             
             gemini_start_time = time.time()
-            gemini_timeout = 15  # 15 seconds for Gemini API
             
             sorted_products_text = sorting_algo.get_sorted_products(
-                user_input, user_data, valid_products
+                user_input, user_data, valid_products, deadline=deadline
             )
             
             gemini_elapsed = time.time() - gemini_start_time
@@ -1085,8 +1125,8 @@ def process_recommendation_request(request_data):
             # Create a mapping of scraped products by title for easy lookup
             scraped_products_map = {}
             for product in valid_products:
-                if product and product.get("title"):
-                    title_key = product["title"].strip().lower()
+                if product and product.title:
+                    title_key = product.title.strip().lower()
                     scraped_products_map[title_key] = product
 
             # Process AI recommendations and match with scraped data
@@ -1124,32 +1164,12 @@ def process_recommendation_request(request_data):
                 # Add to matched products if we found a match
                 if scraped_product:
                     # Use scraped data as primary source
-                    product_data = {
-                        "id": str(len(matched_products) + 1),
-                        "name": scraped_product["title"],
-                        "price": scraped_product.get("price_value", 0),
-                        "currency": currency_symbol,
-                        "image": scraped_product.get("image_url", "/placeholder.svg"),
-                        "buyUrl": scraped_product.get("url", ""),
-                        "category": "Recommended",
-                        "rating": 0,
-                        "reasoning": ai_product.get("reasoning", "AI recommended product"),
-                    }
-
-                    # Parse rating from scraped data
-                    if scraped_product.get("average_rating"):
-                        try:
-                            rating_str = str(scraped_product["average_rating"])
-                            rating_clean = "".join(
-                                c for c in rating_str if c.isdigit() or c == "."
-                            )
-                            if rating_clean:
-                                scraped_rating = float(rating_clean)
-                                product_data["rating"] = min(max(scraped_rating, 0), 5)
-                        except:
-                            pass
-
-                    matched_products.append(product_data)
+                    matched_products.append(scraped_product.to_api(
+                        str(len(matched_products) + 1),
+                        currency_symbol,
+                        "Recommended",
+                        ai_product.get("reasoning", "AI recommended product"),
+                    ))
                 else:
                     # Keep track of unmatched AI products for potential fallback
                     unmatched_ai_products.append(ai_product)
@@ -1160,47 +1180,29 @@ def process_recommendation_request(request_data):
             # If we don't have enough matched products, add some unmatched AI products
             if len(formatted_products) < 10 and unmatched_ai_products:  # Allow up to 10 products
                 print(f"📊 Adding {len(unmatched_ai_products)} unmatched AI products to supplement results")
-                for i, ai_product in enumerate(unmatched_ai_products[:10 - len(formatted_products)]):  # Allow up to 10 products
-                    formatted_products.append({
-                        "id": str(len(formatted_products) + 1),
-                        "name": ai_product.get("title", "Recommended Product"),
-                        "price": ai_product.get("price", 0),
-                        "currency": currency_symbol,
-                        "image": ai_product.get("image_url", "/placeholder.svg"),
-                        "buyUrl": ai_product.get("url", ""),
-                        "category": "AI Recommended",
-                        "rating": ai_product.get("rating", 4.0),
-                        "reasoning": ai_product.get("reasoning", "AI recommended based on your request"),
-                    })
+                for ai_product in unmatched_ai_products[:10 - len(formatted_products)]:  # Allow up to 10 products
+                    product = Product(
+                        url=ai_product.get("url", ""),
+                        title=ai_product.get("title", "Recommended Product"),
+                        price_minor=to_minor_units(ai_product.get("price")),
+                        rating=ai_product.get("rating", 4.0),
+                        image_url=ai_product.get("image_url"),
+                    )
+                    formatted_products.append(product.to_api(
+                        str(len(formatted_products) + 1),
+                        currency_symbol,
+                        "AI Recommended",
+                        ai_product.get("reasoning", "AI recommended based on your request"),
+                    ))
 
             # If still not enough products, use scraped products directly
             if len(formatted_products) < 10 and valid_products:  # Allow up to 10 products
                 print(f"📊 Adding {min(10 - len(formatted_products), len(valid_products))} scraped products to supplement results")
-                for i, product in enumerate(valid_products[:10 - len(formatted_products)]):  # Allow up to 10 products
-                    rating = 0
-                    try:
-                        rating_str = str(product.get("average_rating", "0"))
-                        rating_clean = "".join(
-                            c for c in rating_str if c.isdigit() or c == "."
-                        )
-                        if rating_clean:
-                            rating = min(max(float(rating_clean), 0), 5)
-                    except:
-                        pass
-
-                    formatted_products.append(
-                        {
-                            "id": str(len(formatted_products) + 1),
-                            "name": product["title"],
-                            "price": product.get("price_value", 0) or 0,
-                            "currency": currency_symbol,
-                            "image": product.get("image_url", "/placeholder.svg"),
-                            "buyUrl": product.get("url", ""),
-                            "category": "General",
-                            "rating": rating,
-                            "reasoning": "Product recommendation based on your preferences",
-                        }
-                    )
+                formatted_products.extend(format_products(
+                    valid_products[:10 - len(formatted_products)],  # Allow up to 10 products
+                    currency_symbol, "General", "Product recommendation based on your preferences",
+                    start_id=len(formatted_products) + 1,
+                ))
 
             print(f"📊 Final result: {len(formatted_products)} products (AI matched: {len(matched_products)}, supplemented: {len(formatted_products) - len(matched_products)})")
 
@@ -1238,33 +1240,10 @@ def process_recommendation_request(request_data):
 
             # Only use scraped products if they exist and are valid
             if valid_products:
-                fallback_products = []
                 # Allow up to 10 products for better user experience
-                for i, product in enumerate(valid_products[:10]):  # Increased from 4 to 10
-                    rating = 0
-                    try:
-                        rating_str = str(product.get("average_rating", "0"))
-                        rating_clean = "".join(
-                            c for c in rating_str if c.isdigit() or c == "."
-                        )
-                        if rating_clean:
-                            rating = min(max(float(rating_clean), 0), 5)
-                    except:
-                        pass
-
-                    fallback_products.append(
-                        {
-                            "id": str(i + 1),
-                            "name": product["title"],
-                            "price": product.get("price_value", 0) or 0,
-                            "currency": currency_symbol,
-                            "image": product.get("image_url", "/placeholder.svg"),
-                            "buyUrl": product.get("url", ""),
-                            "category": "General",
-                            "rating": rating,
-                            "reasoning": "Product recommendation based on your preferences",
-                        }
-                    )
+                fallback_products = format_products(
+                    valid_products[:10], currency_symbol, "General", "Product recommendation based on your preferences"
+                )
 
                 response_data = {
                     "status": "success",
@@ -1518,14 +1497,6 @@ def generate_fallback_products(shopping_request, user_data):
         # Default to tech if no match
         else:
             return sample_products.get('tech', [])
-            return sample_products.get('sports', [])
-        elif any(word in request_lower for word in ['game', 'gaming', 'console', 'controller']):
-            return sample_products.get('gaming', [])
-        elif any(word in request_lower for word in ['music', 'audio', 'sound', 'speaker']):
-            return sample_products.get('music', [])
-        else:
-            # Default to tech if no specific category detected
-            return sample_products.get('tech', [])
             
     except Exception as e:
         print(f"Error generating fallback products: {str(e).strip()}")
@@ -1536,4 +1507,5 @@ if __name__ == "__main__":
     print("Starting Shopping Recommendation API...")
     print("API will be available at: https://eventually-yours-shopping-app-project-production.up.railway.app/")
     print("Health check: https://eventually-yours-shopping-app-project-production.up.railway.app/api/health")
+    start_prefetcher()
     app.run(debug=True, host="0.0.0.0", port=5000)
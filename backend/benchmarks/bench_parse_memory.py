@@ -0,0 +1,82 @@
+"""
+Peak memory per search results page: full DOM vs result-containers-only parse.
+
+Each variant runs in its own interpreter so the RSS high-water mark is not
+shared between them. Run from the backend directory:
+    python -m benchmarks.bench_parse_memory [--pages 5] [--size 1500000]
+"""
+import argparse
+import gc
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fixtures import build_search_page
+from services.amazon_scraper import SEARCH_RESULTS_ONLY, ParsedPage, _extract_products_from_page
+
+VARIANTS = {
+    "full": None,
+    "restricted": SEARCH_RESULTS_ONLY,
+}
+
+
+def _run_variant(name: str, pages: int, size: int) -> dict:
+    content = build_search_page(target_bytes=size).encode("utf-8")
+    parse_only = VARIANTS[name]
+    gc.collect()
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    peaks = []
+    cpu = []
+    found = 0
+    for _ in range(pages):
+        tracemalloc.start()
+        start = time.process_time()
+        page = ParsedPage("https://www.amazon.com/s?k=bench", content, "utf-8", parse_only)
+        found = len(_extract_products_from_page(page.soup, "amazon.com"))
+        page.release()
+        cpu.append(time.process_time() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "variant": name,
+        "page_bytes": len(content),
+        "products": found,
+        "peak_traced_mb": max(peaks) / 1024 / 1024,
+        "cpu_ms": sum(cpu) / len(cpu) * 1000,
+        # ru_maxrss is KiB on Linux
+        "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--size", type=int, default=1_500_000)
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(_run_variant(args.variant, args.pages, args.size)))
+        return
+
+    for name in VARIANTS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_parse_memory", "--variant", name,
+             "--pages", str(args.pages), "--size", str(args.size)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{name:<11} page {result['page_bytes'] / 1024 / 1024:.2f} MB   "
+            f"peak traced {result['peak_traced_mb']:7.1f} MB   RSS growth {result['rss_growth_mb']:7.1f} MB   "
+            f"CPU {result['cpu_ms']:7.1f} ms/page   products {result['products']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
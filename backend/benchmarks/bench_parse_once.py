@@ -0,0 +1,79 @@
+"""
+CPU cost per search results page: parse-twice (old search path) vs parse-once.
+
+Run from the backend directory:
+    python -m benchmarks.bench_parse_once [--pages 20] [--size 1500000]
+"""
+import argparse
+import statistics
+import time
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import build_search_page
+from services.amazon_scraper import ParsedPage, _detect_bot_protection, _extract_products_from_page
+
+
+def _legacy_detect_bot_protection(soup: BeautifulSoup) -> bool:
+    """The whole-document get_text() detector the search path used to run"""
+    page_text = soup.get_text().lower()
+    bot_indicators = [
+        "robot", "captcha", "blocked", "unusual", "verify", "security check",
+        "enter the characters you see below", "type the characters you see",
+        "to discuss automated access", "automated requests"
+    ]
+    return any(indicator in page_text for indicator in bot_indicators)
+
+
+def search_page_parse_twice(content: bytes, domain: str):
+    """The search path before ParsedPage: one parse for bot detection, one for extraction"""
+    html = content.decode("utf-8")
+    soup = BeautifulSoup(html, "html.parser")
+    if _legacy_detect_bot_protection(soup):
+        return []
+    soup = BeautifulSoup(html, "html.parser")
+    return _extract_products_from_page(soup, domain)
+
+
+def search_page_parse_once(content: bytes, domain: str):
+    """The current search path: bytes are screened, then the retry layer's tree is handed to the extractor"""
+    if _detect_bot_protection(content):
+        return []
+    page = ParsedPage("https://www.amazon.com/s?k=bench", content, "utf-8")
+    return _extract_products_from_page(page.soup, domain)
+
+
+def _measure(func, content: bytes, pages: int):
+    samples = []
+    for _ in range(pages):
+        start = time.process_time()
+        products = func(content, "amazon.com")
+        samples.append(time.process_time() - start)
+    return samples, len(products)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20, help="pages to process per variant")
+    parser.add_argument("--size", type=int, default=1_500_000, help="approximate page size in bytes")
+    args = parser.parse_args()
+
+    content = build_search_page(target_bytes=args.size).encode("utf-8")
+    print(f"Search page: {len(content) / 1024 / 1024:.2f} MB, {args.pages} pages per variant")
+
+    results = {}
+    for name, func in (("parse twice (before)", search_page_parse_twice), ("parse once (after)", search_page_parse_once)):
+        func(content, "amazon.com")  # warm up
+        samples, found = _measure(func, content, args.pages)
+        results[name] = statistics.mean(samples)
+        print(
+            f"{name:<22} mean {statistics.mean(samples) * 1000:8.1f} ms CPU/page"
+            f"   p50 {statistics.median(samples) * 1000:8.1f} ms   products {found}"
+        )
+
+    before, after = results.values()
+    print(f"CPU saved per page: {(before - after) * 1000:.1f} ms ({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
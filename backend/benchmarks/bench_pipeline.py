@@ -0,0 +1,112 @@
+"""
+End-to-end latency and throughput of process_recommendation_request, offline.
+
+Starts the local stand-in (benchmarks/standin.py) in-process, points the scraper
+and the Gemini calls at it, then pushes requests through the real pipeline.
+Run from the backend directory:
+    python -m benchmarks.bench_pipeline [--requests 20] [--concurrency 2] [--corpus benchmarks/corpus]
+        [--latency 150] [--jitter 50] [--gemini-latency 1500] [--error-rate 0.0]
+Without --corpus every response is synthetic.
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.standin import GEMINI_PREFIX, StandIn, add_replay_arguments, config_from_args
+
+_USER_DATA = {
+    "age": "25-34",
+    "gender": "",
+    "favorite_categories": ["Electronics", "Sports & Outdoors"],
+    "interests": "hiking, music",
+    "preferred_shopping_method": "online",
+    "user_location": "united states",
+    "budget_range": "20-200",
+}
+
+_SHOPPING_INPUT = {
+    "occasion": "Birthday",
+    "brandsPreferred": "",
+    "shoppingInput": "Gift ideas for someone who likes hiking and music",
+}
+
+
+def _percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=2, help="requests in flight (the API runs 2 workers)")
+    parser.add_argument("--rate", default="1000:1000", help="AMAZON_RATE_LIMIT for the run (rate:burst)")
+    parser.add_argument("--search-cache", action="store_true", help="keep the search page cache enabled")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own logging")
+    add_replay_arguments(parser)
+    args = parser.parse_args()
+    if not args.corpus:
+        args.synthetic = True
+
+    standin = StandIn(config_from_args("replay", args)).start()
+
+    # Must be set before the backend modules are imported, they read them once
+    os.environ["SCRAPER_UPSTREAM"] = standin.url
+    os.environ["GEMINI_API_BASE"] = standin.url + GEMINI_PREFIX
+    os.environ.setdefault("GEMINI_API_KEY", "offline")
+    os.environ["AMAZON_RATE_LIMIT"] = args.rate
+    # Background prefetches would compete with the measured requests
+    os.environ["PREFETCH_ENABLED"] = "false"
+    if not args.search_cache:
+        os.environ["SEARCH_CACHE_ENABLED"] = "false"
+
+    from api import backend_api
+
+    def run_one(index: int):
+        session_id = f"bench_{index}"
+        backend_api.user_sessions[session_id] = {"user_data": dict(_USER_DATA)}
+        start = time.perf_counter()
+        result = backend_api.process_recommendation_request(
+            {"session_id": session_id, "shopping_input": dict(_SHOPPING_INPUT)}
+        )
+        elapsed = time.perf_counter() - start
+        body, status = result if isinstance(result, tuple) else (result, 200)
+        return elapsed, status, len(body.get("products", [])), body.get("note")
+
+    print(
+        f"Stand-in at {standin.url}: latency {args.latency:.0f}±{args.jitter:.0f} ms, "
+        f"Gemini {args.gemini_latency:.0f} ms, error rate {args.error_rate:.0%}, "
+        f"{'corpus ' + args.corpus if args.corpus else 'synthetic responses'}"
+    )
+    # stdout is process-wide, so the pipeline's logging is silenced for the whole run
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+        run_one(-1)  # warm up imports, the scraper event loop and connection pools
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(run_one, range(args.requests)))
+        wall = time.perf_counter() - started
+    standin.stop()
+
+    latencies = [elapsed for elapsed, _, _, _ in results]
+    statuses = {}
+    for _, status, _, note in results:
+        label = f"{status}" + (f" ({note})" if note else "")
+        statuses[label] = statuses.get(label, 0) + 1
+    print(f"{args.requests} requests, concurrency {args.concurrency}: {args.requests / wall:.2f} req/s")
+    print(
+        f"latency mean {statistics.mean(latencies):.2f}s   p50 {_percentile(latencies, 0.5):.2f}s   "
+        f"p95 {_percentile(latencies, 0.95):.2f}s   p99 {_percentile(latencies, 0.99):.2f}s   max {max(latencies):.2f}s"
+    )
+    print(f"products per response: {statistics.mean(count for _, _, count, _ in results):.1f}")
+    print(f"responses: {statuses}")
+    print(f"stand-in served: {standin.config.served}")
+
+
+if __name__ == "__main__":
+    main()
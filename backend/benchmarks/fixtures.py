@@ -0,0 +1,198 @@
+"""
+Synthetic but realistically shaped Amazon pages for offline benchmarks.
+
+Real search result pages are 1-2 MB: most of that is navigation, inline
+scripts, JSON state blobs and footer markup around a few dozen result
+containers. The generator reproduces that shape deterministically.
+"""
+import json
+import random
+from typing import List
+
+_ADJECTIVES = ["Wireless", "Portable", "Ergonomic", "Premium", "Compact", "Waterproof", "Smart", "Foldable"]
+_NOUNS = ["Headphones", "Keyboard", "Backpack", "Water Bottle", "Desk Lamp", "Yoga Mat", "Speaker", "Charger"]
+_BRANDS = ["Anker", "Logitech", "Sony", "JBL", "Nike", "Adidas", "Philips", "Bose"]
+
+
+def _asin(rng: random.Random) -> str:
+    return "B0" + "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(8))
+
+
+def _result_container(rng: random.Random, index: int, currency: str) -> str:
+    asin = _asin(rng)
+    title = f"{rng.choice(_BRANDS)} {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)} - Model {index} with Extended Warranty"
+    slug = title.replace(" ", "-")[:60]
+    price = f"{currency}{rng.randint(5, 400)}.{rng.randint(0, 99):02d}"
+    rating = f"{rng.uniform(3.0, 5.0):.1f} out of 5 stars"
+    badges = "".join(
+        f'<span class="a-badge-label-inner a-text-ellipsis"><span class="a-badge-text">Badge {i}</span></span>'
+        for i in range(rng.randint(1, 4))
+    )
+    # Amazon wraps every result in deeply nested layout divs
+    padding = "".join(f'<div class="a-section a-spacing-none puis-padding-{i}">' for i in range(12))
+    padding_close = "</div>" * 12
+    return (
+        f'<div data-asin="{asin}" data-index="{index}" data-component-type="s-search-result" '
+        f'class="sg-col-4-of-24 sg-col-4-of-12 s-result-item s-asin sg-col-4-of-16 sg-col s-widget-spacing-small">'
+        f"{padding}"
+        f'<span class="a-declarative" data-action="puis-card-click">'
+        f'<a class="a-link-normal s-no-outline" href="/{slug}/dp/{asin}/ref=sr_1_{index}?keywords=test&amp;qid=1700000000&amp;sr=8-{index}">'
+        f'<div class="a-section aok-relative s-image-square-aspect">'
+        f'<img class="s-image" src="https://m.media-amazon.com/images/I/{asin}._AC_UL320_.jpg" '
+        f'srcset="https://m.media-amazon.com/images/I/{asin}._AC_UL320_.jpg 1x, https://m.media-amazon.com/images/I/{asin}._AC_UL480_.jpg 1.5x" '
+        f'alt="{title}" data-image-latency="s-product-image"/></div></a></span>'
+        f'<div class="a-section a-spacing-small puis-padding-left-small">'
+        f'<h2 class="a-size-mini a-spacing-none a-color-base s-line-clamp-4">'
+        f'<a class="a-link-normal s-underline-text s-underline-link-text s-link-style a-text-normal" href="/{slug}/dp/{asin}/">'
+        f'<span class="a-size-base-plus a-color-base a-text-normal">{title}</span></a></h2>'
+        f'<div class="a-row a-size-small"><span aria-label="{rating}"><span class="a-declarative">'
+        f'<a class="a-popover-trigger a-declarative"><i class="a-icon a-icon-star-small a-star-small-4-5">'
+        f'<span class="a-icon-alt">{rating}</span></i></a></span></span>'
+        f'<span aria-label="{rng.randint(10, 90000)}"><span class="a-size-base s-underline-text">{rng.randint(10, 90000)}</span></span></div>'
+        f'<div class="a-row a-size-base a-color-base"><a class="a-size-base a-link-normal s-no-hover s-underline-text" href="/dp/{asin}">'
+        f'<span class="a-price" data-a-size="xl" data-a-color="base"><span class="a-offscreen">{price}</span>'
+        f'<span aria-hidden="true"><span class="a-price-symbol">{currency}</span><span class="a-price-whole">{price[len(currency):].split(".")[0]}<span class="a-price-decimal">.</span></span>'
+        f'<span class="a-price-fraction">{price.split(".")[1]}</span></span></span></a></div>'
+        f"{badges}"
+        f'<div class="a-row a-size-base a-color-secondary"><span>FREE delivery <span class="a-text-bold">Tomorrow</span></span></div>'
+        f"</div>{padding_close}</div>"
+    )
+
+
+def _navigation(rng: random.Random) -> str:
+    links = "".join(
+        f'<li><a class="hmenu-item" href="/gp/browse.html?node={rng.randint(10**6, 10**7)}&amp;ref_=nav_em_{i}">Department {i}</a></li>'
+        for i in range(400)
+    )
+    return f'<header id="navbar-main"><div id="nav-belt"><nav id="nav-main"><ul class="hmenu hmenu-visible">{links}</ul></nav></div></header>'
+
+
+def _inline_scripts(rng: random.Random, target_bytes: int) -> List[str]:
+    chunks = []
+    size = 0
+    i = 0
+    while size < target_bytes:
+        state = {
+            "widget": f"search-widget-{i}",
+            "metrics": [rng.random() for _ in range(200)],
+            "weblab": {f"SEARCH_{j}": rng.choice(["C", "T1", "T2"]) for j in range(50)},
+        }
+        chunk = f'<script type="text/javascript">P.when("A").execute(function(A){{A.state("s-{i}", {json.dumps(state)});}});</script>'
+        chunks.append(chunk)
+        size += len(chunk)
+        i += 1
+    return chunks
+
+
+def _footer() -> str:
+    columns = "".join(
+        f'<div class="navFooterLinkCol navAccessibility"><div class="navFooterColHead">Column {c}</div><ul>'
+        + "".join(f'<li class="nav_first"><a href="/gp/help/{c}/{i}" class="nav_a">Footer link {c}.{i}</a></li>' for i in range(25))
+        + "</ul></div>"
+        for c in range(8)
+    )
+    return f'<div id="navFooter" class="navLeftFooter nav-sprite-v1">{columns}</div>'
+
+
+def build_search_page(num_results: int = 48, target_bytes: int = 1_500_000, currency: str = "$", seed: int = 7) -> str:
+    """Return a search results page of roughly target_bytes with num_results result containers"""
+    rng = random.Random(seed)
+    results = "".join(_result_container(rng, i, currency) for i in range(1, num_results + 1))
+    body_without_scripts = (
+        _navigation(rng)
+        + f'<div class="s-main-slot s-result-list s-search-results sg-row">{results}</div>'
+        + _footer()
+    )
+    scripts = _inline_scripts(rng, max(target_bytes - len(body_without_scripts), 0))
+    half = len(scripts) // 2
+    return (
+        "<!doctype html><html lang=\"en-us\"><head><meta charset=\"utf-8\"/>"
+        "<title>Amazon.com : headphones</title>"
+        f"{''.join(scripts[:half])}</head><body>"
+        f"{body_without_scripts}{''.join(scripts[half:])}</body></html>"
+    )
+
+
+def build_captcha_page() -> str:
+    """Return the small interstitial Amazon serves when it suspects automation"""
+    return (
+        "<!doctype html><html><head><title dir=\"ltr\">Amazon.com</title></head><body>"
+        "<div class=\"a-container a-padding-double-large\"><div class=\"a-row a-spacing-double-large\">"
+        "<h4>Enter the characters you see below</h4>"
+        "<p class=\"a-last\">Sorry, we just need to make sure you're not a robot. For best results, please make sure your browser is accepting cookies.</p>"
+        "<form method=\"get\" action=\"/errors/validateCaptcha\" name=\"\">"
+        "<input type=hidden name=\"amzn\" value=\"abc\" /><input type=hidden name=\"amzn-r\" value=\"&#047;\" />"
+        "<img src=\"https://images-na.ssl-images-amazon.com/captcha/usvmgloq/Captcha_kwrrnqwkph.jpg\">"
+        "<input autocomplete=\"off\" spellcheck=\"false\" placeholder=\"Type characters\" id=\"captchacharacters\" name=\"field-keywords\" type=\"text\">"
+        "</form></div></div></body></html>"
+    )
+
+
+# Price strings as they appear in search results and product pages across marketplaces,
+# including ranges, missing prices and long digit runs
+PRICE_STRINGS = [
+    "$19.99", "$1,299.99", "$0.99", "$24.99 - $39.99", "£12.50", "£1,049.00", "€9,99", "€ 1.299,00",
+    "¥1,980", "¥12,800", "₹1,499.00", "R$ 89,90", "CDN$ 45.00", "A$ 129.95", "MX$1,299.00",
+    "Currently unavailable.", "See price in cart", "", "  $ 7.49  ", "$19.99$24.99",
+    "From $5", "Was: $59.99", "9.99", "1" * 64, "$" + "9" * 40 + ".99",
+]
+
+# Locations as users type them into their profile
+LOCATIONS = [
+    "united states", "United Kingdom", "germany", "London, United Kingdom", "Toronto, Canada",
+    "São Paulo, Brazil", "new south wales australia", "Atlantis", "", "UK",
+]
+
+
+def build_category_response(lines: int = 10, seed: int = 7) -> List[str]:
+    """Category lines as get_gemini_categories returns them: bullets, bold markers and brand examples"""
+    rng = random.Random(seed)
+    categories = []
+    for i in range(lines):
+        brands = ", ".join(rng.sample(_BRANDS, 3))
+        style = i % 4
+        if style == 0:
+            categories.append(f"**{rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}** (e.g., {brands})")
+        elif style == 1:
+            categories.append(f"* {rng.choice(_BRANDS)} {rng.choice(_NOUNS)}  e.g. {brands}")
+        elif style == 2:
+            categories.append(f"{rng.choice(_ADJECTIVES)}  {rng.choice(_NOUNS)} accessories (for travel) (gift sets)")
+        else:
+            categories.append(rng.choice(["**", "*", "ab", "(e.g., x)"]))
+    return categories
+
+
+def build_ranking_response(num_products: int = 10, seed: int = 7) -> str:
+    """A well-formed Gemini ranking answer in the format parse_ai_recommendations expects"""
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(num_products):
+        asin = _asin(rng)
+        blocks.append(
+            f"Product: {rng.choice(_BRANDS)} {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)} - Model {i}\n"
+            f"URL: https://www.amazon.com/dp/{asin}\n"
+            f"Price: ${rng.randint(5, 2000):,}.{rng.randint(0, 99):02d}\n"
+            f"Rating: {rng.uniform(3.0, 5.0):.1f}\n"
+            f"Image URL: https://m.media-amazon.com/images/I/{asin}._AC_SL1500_.jpg\n"
+            f"Reasoning: " + " ".join(rng.choice(_ADJECTIVES).lower() for _ in range(40))
+        )
+    return "\n\n".join(blocks)
+
+
+def build_adversarial_ranking_response(num_products: int = 200, seed: int = 7) -> str:
+    """
+    Gemini output that misses the strict format: markdown decoration, reordered fields
+    and products without a price, which sends the parser down its flexible fallback
+    """
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(num_products):
+        title = f"**{rng.choice(_BRANDS)} {rng.choice(_NOUNS)} {i}**"
+        if i % 3 == 0:
+            blocks.append(f"Product: {title}\nURL: n/a\nRating: {rng.uniform(3, 5):.1f}\nReasoning: no price given")
+        else:
+            blocks.append(
+                f"Product: {title}\n  - Rating: {rng.uniform(3, 5):.1f}\n  - Price: ${rng.randint(5, 400)}.99\n"
+                f"  - Reasoning: {'very ' * rng.randint(1, 30)}good"
+            )
+    return "\n\n".join(blocks)
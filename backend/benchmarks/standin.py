@@ -0,0 +1,424 @@
+"""
+Local HTTP stand-in for Amazon and the Gemini API.
+
+Point the backend at it with:
+    SCRAPER_UPSTREAM=http://127.0.0.1:8765
+    GEMINI_API_BASE=http://127.0.0.1:8765/gemini
+
+record  forwards every request to the real service and stores the response in a
+        fixture corpus (API keys are stripped from what is stored)
+replay  serves responses from the corpus with configurable latency, page size
+        and error rate; with --synthetic, requests the corpus has no answer for
+        get generated pages instead, so no corpus (and no network) is needed
+
+Run from the backend directory:
+    python -m benchmarks.standin record --corpus benchmarks/corpus
+    python -m benchmarks.standin replay --corpus benchmarks/corpus --latency 150 --gemini-latency 2000
+"""
+import argparse
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+
+from benchmarks.fixtures import build_search_page
+
+GEMINI_PREFIX = "/gemini"
+GEMINI_ORIGIN = "https://generativelanguage.googleapis.com"
+DEFAULT_AMAZON_HOST = "www.amazon.com"
+
+# Never stored in the corpus or used for matching
+_SECRET_PARAMS = {"key"}
+# Request headers that describe the hop to the stand-in rather than the real request
+_HOP_HEADERS = {"host", "x-forwarded-host", "accept-encoding", "content-length", "connection"}
+# Response headers worth replaying
+_KEPT_RESPONSE_HEADERS = {"content-type", "retry-after", "location"}
+
+
+def classify(path: str, body: bytes) -> str:
+    """Fixture kind of a request: search, product, gemini-categories, gemini-rank or other"""
+    if path.startswith(GEMINI_PREFIX):
+        # The ranking prompt embeds the scraped products, the category prompt does not
+        return "gemini-rank" if b"AVAILABLE PRODUCTS FROM AMAZON" in body else "gemini-categories"
+    if path == "/s" or path.startswith("/s/"):
+        return "search"
+    if re.search(r"/(?:dp|gp/product|gp/aw/d)/", path):
+        return "product"
+    return "other"
+
+
+def fixture_key(method: str, host: str, path: str, query: str, body: bytes) -> str:
+    params = sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in _SECRET_PARAMS)
+    digest = hashlib.sha256()
+    for part in (method, host.lower(), path, urlencode(params)):
+        digest.update(part.encode("utf-8") + b"\x1f")
+    digest.update(body)
+    return digest.hexdigest()[:32]
+
+
+class FixtureCorpus:
+    """Directory of recorded responses, one gzipped JSON file per request"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._entries = {}
+        self._by_kind = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self._entries.clear()
+        self._by_kind.clear()
+        if not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".json.gz"):
+                with gzip.open(os.path.join(self.directory, name), "rt", encoding="utf-8") as f:
+                    self._index(json.load(f))
+
+    def _index(self, entry: Dict):
+        self._entries[entry["key"]] = entry
+        if entry["status"] == 200:
+            self._by_kind.setdefault(entry["kind"], []).append(entry)
+
+    def save(self, entry: Dict):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{entry['kind']}-{entry['key']}.json.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+        with self._lock:
+            self._index(entry)
+
+    def find(self, key: str, kind: str, strict: bool) -> Optional[Dict]:
+        """Exact match, or (unless strict) the next successful response of the same kind"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None or strict:
+                return entry
+            pool = self._by_kind.get(kind)
+            if not pool:
+                return None
+            cursor = self._cursors.setdefault(kind, itertools.count())
+            return pool[next(cursor) % len(pool)]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {}
+            for entry in self._entries.values():
+                counts[entry["kind"]] = counts.get(entry["kind"], 0) + 1
+            return counts
+
+
+def _gemini_text_response(text: str) -> bytes:
+    return json.dumps({"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}).encode("utf-8")
+
+
+def _gemini_sse_response(text: str, chunk_chars: int = 24) -> bytes:
+    """streamGenerateContent?alt=sse answer: the text in small chunks, one event each, like the model emits it"""
+    chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or [""]
+    return b"".join(b"data: " + _gemini_text_response(chunk) + b"\r\n\r\n" for chunk in chunks)
+
+
+def _is_gemini_stream(path: str) -> bool:
+    return path.startswith(GEMINI_PREFIX) and path.endswith(":streamGenerateContent")
+
+
+def _synthetic_product_page(asin: str) -> str:
+    rng = random.Random(asin)
+    return (
+        "<!doctype html><html><head><title>Amazon.com</title></head><body>"
+        f'<span id="productTitle">Synthetic Product {asin}</span>'
+        f'<span class="a-price"><span class="a-offscreen">${rng.randint(5, 400)}.{rng.randint(0, 99):02d}</span></span>'
+        f'<span id="acrPopover" title="{rng.uniform(3.0, 5.0):.1f} out of 5 stars"></span>'
+        f'<img id="landingImage" src="https://m.media-amazon.com/images/I/{asin}._AC_SL1500_.jpg"/>'
+        "</body></html>"
+    )
+
+
+def _synthetic_ranking(prompt: str) -> str:
+    """Answer a ranking prompt by echoing its first products in the format parse_ai_recommendations expects"""
+    marker = "AVAILABLE PRODUCTS FROM AMAZON: "
+    start = prompt.find(marker)
+    products = []
+    if start != -1:
+        try:
+            products, _ = json.JSONDecoder().raw_decode(prompt, start + len(marker))
+        except ValueError:
+            products = []
+    blocks = []
+    for product in products[:8]:
+        blocks.append(
+            f"Product: {product.get('title')}\n"
+            f"URL: {product.get('url')}\n"
+            f"Price: {product.get('price_value') or 0}\n"
+            f"Rating: {product.get('average_rating') or 4.0}\n"
+            f"Image URL: {product.get('image_url') or ''}\n"
+            f"Reasoning: Synthetic ranking"
+        )
+    return "\n\n".join(blocks)
+
+
+class StandInConfig:
+    def __init__(
+        self,
+        mode: str = "replay",
+        corpus: Optional[str] = None,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        gemini_latency_ms: float = 0,
+        page_bytes: int = 1_500_000,
+        pad_to: int = 0,
+        error_rate: float = 0.0,
+        synthetic: bool = False,
+        strict: bool = False,
+    ):
+        self.mode = mode
+        self.corpus = FixtureCorpus(corpus) if corpus else None
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.gemini_latency_ms = gemini_latency_ms
+        self.page_bytes = page_bytes
+        self.pad_to = pad_to
+        self.error_rate = error_rate
+        self.synthetic = synthetic
+        self.strict = strict
+        self.served = {}
+        self._lock = threading.Lock()
+        self.upstream = httpx.Client(timeout=60, follow_redirects=False) if mode == "record" else None
+
+    def count(self, outcome: str):
+        with self._lock:
+            self.served[outcome] = self.served.get(outcome, 0) + 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: StandInConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        config = self.config
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        parts = urlsplit(self.path)
+        host = self.headers.get("X-Forwarded-Host") or DEFAULT_AMAZON_HOST
+        kind = classify(parts.path, body)
+        if kind.startswith("gemini"):
+            host = urlsplit(GEMINI_ORIGIN).netloc
+        key = fixture_key(self.command, host, parts.path, parts.query, body)
+
+        if config.mode == "record":
+            status, headers, content = self._forward(host, kind, parts, body)
+            config.corpus.save({
+                "key": key,
+                "kind": kind,
+                "method": self.command,
+                "host": host,
+                "path": parts.path,
+                "query": urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in _SECRET_PARAMS]),
+                "status": status,
+                "headers": headers,
+                "body": content.decode("utf-8", errors="replace"),
+                "recorded_at": time.time(),
+            })
+            config.count(f"recorded {kind}")
+            self._respond(status, headers, content)
+            return
+
+        delay = config.gemini_latency_ms if kind.startswith("gemini") else config.latency_ms
+        delay += random.uniform(-config.jitter_ms, config.jitter_ms) if config.jitter_ms else 0
+        # A streamed answer spreads the latency over its events instead of arriving all at once
+        stream_delay = delay if _is_gemini_stream(parts.path) else 0
+        if delay > 0 and not stream_delay:
+            time.sleep(delay / 1000)
+
+        if config.error_rate and not kind.startswith("gemini") and random.random() < config.error_rate:
+            config.count("injected 503")
+            self._respond(503, {"content-type": "text/html", "retry-after": "1"}, b"<html><body>Service Unavailable</body></html>")
+            return
+
+        entry = config.corpus.find(key, kind, config.strict) if config.corpus else None
+        if entry is not None:
+            content = entry["body"].encode("utf-8")
+            if config.pad_to and kind in ("search", "product"):
+                content = self._pad(content, config.pad_to)
+            config.count(f"replayed {kind}")
+            self._respond(entry["status"], entry["headers"], content, stream_delay)
+            return
+
+        generated = self._synthetic(kind, parts.path, body) if config.synthetic else None
+        if generated is not None:
+            config.count(f"synthetic {kind}")
+            self._respond(200, {"content-type": generated[0]}, generated[1], stream_delay)
+            return
+
+        config.count(f"missing {kind}")
+        self._respond(404, {"content-type": "text/plain"}, f"No fixture for {self.command} {self.path}".encode("utf-8"))
+
+    def _forward(self, host: str, kind: str, parts, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        if kind.startswith("gemini"):
+            url = GEMINI_ORIGIN + parts.path[len(GEMINI_PREFIX):]
+        else:
+            url = f"https://{host}{parts.path}"
+        if parts.query:
+            url += f"?{parts.query}"
+        headers = {name: value for name, value in self.headers.items() if name.lower() not in _HOP_HEADERS}
+        try:
+            response = self.config.upstream.request(self.command, url, headers=headers, content=body)
+        except httpx.HTTPError as e:
+            return 502, {"content-type": "text/plain"}, f"Upstream error: {e}".encode("utf-8")
+        kept = {name: value for name, value in response.headers.items() if name.lower() in _KEPT_RESPONSE_HEADERS}
+        return response.status_code, kept, response.content
+
+    def _synthetic(self, kind: str, path: str, body: bytes) -> Optional[Tuple[str, bytes]]:
+        if kind == "search":
+            seed = int(hashlib.sha256(self.path.encode("utf-8")).hexdigest()[:8], 16)
+            return "text/html; charset=utf-8", build_search_page(target_bytes=self.config.page_bytes, seed=seed).encode("utf-8")
+        if kind == "product":
+            match = re.search(r"/([A-Z0-9]{10})(?:[/?]|$)", path)
+            asin = match.group(1) if match else "B000000000"
+            return "text/html; charset=utf-8", _synthetic_product_page(asin).encode("utf-8")
+        if kind == "gemini-categories":
+            text = "\n".join(f"- {name}" for name in (
+                "Wireless headphones", "Mechanical keyboards", "Hiking backpacks", "Insulated water bottles", "LED desk lamps"
+            ))
+        elif kind == "gemini-rank":
+            try:
+                prompt = json.loads(body)["contents"][0]["parts"][0]["text"]
+            except (ValueError, KeyError, IndexError):
+                prompt = ""
+            text = _synthetic_ranking(prompt)
+        else:
+            return None
+        if _is_gemini_stream(path):
+            return "text/event-stream", _gemini_sse_response(text)
+        return "application/json", _gemini_text_response(text)
+
+    @staticmethod
+    def _pad(content: bytes, target: int) -> bytes:
+        missing = target - len(content)
+        if missing <= 0:
+            return content
+        filler = b"<script>/*" + b"x" * max(missing - 12, 0) + b"*/</script>"
+        index = content.rfind(b"</body>")
+        return content + filler if index == -1 else content[:index] + filler + content[index:]
+
+    def _respond(self, status: int, headers: Dict[str, str], content: bytes, stream_delay_ms: float = 0):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if not stream_delay_ms:
+            self.wfile.write(content)
+            return
+        # Server-sent events go out one by one, `stream_delay_ms` spread evenly before them
+        parts = content.split(b"\r\n\r\n")
+        events = [part + b"\r\n\r\n" for part in parts[:-1]] + ([parts[-1]] if parts[-1] else [])
+        for event in events:
+            time.sleep(stream_delay_ms / 1000 / len(events))
+            self.wfile.write(event)
+            self.wfile.flush()
+
+
+class StandIn:
+    """The stand-in server, runnable in a background thread for in-process benchmarks"""
+
+    def __init__(self, config: StandInConfig, host: str = "127.0.0.1", port: int = 0):
+        handler = type("StandInHandler", (_Handler,), {"config": config})
+        self.config = config
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandIn":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_replay_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--corpus", help="fixture corpus directory")
+    parser.add_argument("--latency", type=float, default=0, help="added latency per Amazon response (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="+/- random latency (ms)")
+    parser.add_argument("--gemini-latency", type=float, default=0, help="added latency per Gemini response (ms)")
+    parser.add_argument("--size", type=int, default=1_500_000, help="bytes per synthetic search page")
+    parser.add_argument("--pad-to", type=int, default=0, help="pad replayed Amazon pages to this many bytes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of Amazon requests answered with 503")
+    parser.add_argument("--synthetic", action="store_true", help="generate responses the corpus has no fixture for")
+    parser.add_argument("--strict", action="store_true", help="only serve exact fixture matches")
+
+
+def config_from_args(mode: str, args: argparse.Namespace) -> StandInConfig:
+    return StandInConfig(
+        mode=mode,
+        corpus=args.corpus,
+        latency_ms=getattr(args, "latency", 0),
+        jitter_ms=getattr(args, "jitter", 0),
+        gemini_latency_ms=getattr(args, "gemini_latency", 0),
+        page_bytes=getattr(args, "size", 1_500_000),
+        pad_to=getattr(args, "pad_to", 0),
+        error_rate=getattr(args, "error_rate", 0.0),
+        synthetic=getattr(args, "synthetic", False),
+        strict=getattr(args, "strict", False),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    modes = parser.add_subparsers(dest="mode", required=True)
+    record = modes.add_parser("record", help="forward to Amazon/Gemini and store responses")
+    record.add_argument("--corpus", required=True, help="fixture corpus directory")
+    add_replay_arguments(modes.add_parser("replay", help="serve stored (or synthetic) responses"))
+    args = parser.parse_args()
+
+    if args.mode == "replay" and not args.corpus and not args.synthetic:
+        parser.error("replay needs --corpus, --synthetic or both")
+
+    standin = StandIn(config_from_args(args.mode, args), args.host, args.port)
+    if standin.config.corpus:
+        print(f"Corpus {args.corpus}: {standin.config.corpus.counts() or 'empty'}")
+    print(f"Stand-in ({args.mode}) listening on {standin.url}")
+    print(f"  SCRAPER_UPSTREAM={standin.url}")
+    print(f"  GEMINI_API_BASE={standin.url}{GEMINI_PREFIX}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Served: {standin.config.served}")
+        standin.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
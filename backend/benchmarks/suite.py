@@ -0,0 +1,279 @@
+"""
+Micro-benchmark suite for the scraper and response parsing hot paths.
+
+Reports ops/sec, p50/p99 time per op and peak allocated bytes per op, and compares
+them with the stored baselines in benchmarks/baselines.json.
+Run from the backend directory:
+    python -m benchmarks.suite                      # run everything, compare with baselines
+    python -m benchmarks.suite -k price -k domain   # only cases whose name contains a filter
+    python -m benchmarks.suite --save               # store this run as the new baselines
+    python -m benchmarks.suite --fail-on-regression # exit 1 if any case is slower than the threshold
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+from benchmarks.fixtures import (
+    LOCATIONS,
+    PRICE_STRINGS,
+    build_adversarial_ranking_response,
+    build_captcha_page,
+    build_category_response,
+    build_ranking_response,
+    build_search_page,
+)
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+class Case:
+    """One benchmark: `setup` builds the inputs once and returns the zero-argument callable to time"""
+
+    def __init__(self, name: str, setup: Callable[[], Callable[[], object]], description: str):
+        self.name = name
+        self.setup = setup
+        self.description = description
+
+
+def _quiet(func: Callable[[], object]) -> Callable[[], object]:
+    """Silence functions that print on every call, the console would dominate the timing"""
+    devnull = open(os.devnull, "w")
+
+    def run():
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            return func()
+        finally:
+            sys.stdout = stdout
+    return run
+
+
+def _extract_case(restricted: bool) -> Callable[[], Callable[[], object]]:
+    def setup():
+        from services.amazon_scraper import SEARCH_RESULTS_ONLY, ParsedPage, _extract_products_from_page
+        content = build_search_page().encode("utf-8")
+        page = ParsedPage("https://www.amazon.com/s?k=bench", content, "utf-8", SEARCH_RESULTS_ONLY if restricted else None)
+        soup = page.soup
+        return lambda: _extract_products_from_page(soup, "amazon.com")
+    return setup
+
+
+def _bot_case(page_builder: Callable[[], str]) -> Callable[[], Callable[[], object]]:
+    def setup():
+        from services.amazon_scraper import _detect_bot_protection
+        content = page_builder().encode("utf-8")
+        return lambda: _detect_bot_protection(content)
+    return setup
+
+
+def _price_setup():
+    from services.amazon_scraper import parse_price_to_float
+    prices = list(PRICE_STRINGS)
+    return lambda: [parse_price_to_float(price) for price in prices]
+
+
+def _parse_many_setup():
+    from services.price_parser import get_price_parser
+    prices = list(PRICE_STRINGS)
+    parser = get_price_parser("amazon.de")
+    return lambda: parser.parse_many(prices)
+
+
+def _ranking_case(text_builder: Callable[[], str]) -> Callable[[], Callable[[], object]]:
+    def setup():
+        from api.backend_api import parse_ai_recommendations
+        text = text_builder()
+        return _quiet(lambda: parse_ai_recommendations(text))
+    return setup
+
+
+def _domain_setup():
+    from utils.domain_gen import get_amazon_domain
+    locations = list(LOCATIONS)
+    return lambda: [get_amazon_domain(location) for location in locations]
+
+
+def _categories_case(lines: int) -> Callable[[], Callable[[], object]]:
+    def setup():
+        from api.backend_api import clean_categories
+        categories = build_category_response(lines)
+        return lambda: clean_categories(categories)
+    return setup
+
+
+CASES = [
+    Case("extract_products/full_tree", _extract_case(False), "_extract_products_from_page on a 1.5 MB page, full DOM"),
+    Case("extract_products/restricted_tree", _extract_case(True), "_extract_products_from_page on the result-containers-only tree"),
+    Case("detect_bot_protection/search_page", _bot_case(build_search_page), "_detect_bot_protection on a 1.5 MB clean page"),
+    Case("detect_bot_protection/captcha", _bot_case(build_captcha_page), "_detect_bot_protection on the captcha interstitial"),
+    Case("parse_price_to_float/mixed", _price_setup, f"parse_price_to_float over {len(PRICE_STRINGS)} marketplace price strings"),
+    Case("price_parser/parse_many_de", _parse_many_setup, f"PriceParser.parse_many over the same {len(PRICE_STRINGS)} strings, amazon.de format"),
+    Case("parse_ai_recommendations/10", _ranking_case(lambda: build_ranking_response(10)), "well-formed ranking, 10 products"),
+    Case("parse_ai_recommendations/200", _ranking_case(lambda: build_ranking_response(200)), "well-formed ranking, 200 products"),
+    Case(
+        "parse_ai_recommendations/adversarial_100",
+        _ranking_case(lambda: build_adversarial_ranking_response(100)),
+        "100 malformed products that fall through to the flexible pattern",
+    ),
+    Case("get_amazon_domain/mixed", _domain_setup, f"get_amazon_domain over {len(LOCATIONS)} typed locations"),
+    Case("clean_categories/10", _categories_case(10), "category cleaning regexes on a 10 line Gemini answer"),
+    Case("clean_categories/500", _categories_case(500), "category cleaning regexes on a 500 line Gemini answer"),
+]
+
+
+def _batch_size(func: Callable[[], object], min_batch_seconds: float) -> int:
+    """Smallest power-of-ten number of calls that takes at least min_batch_seconds"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_batch_seconds or number >= 10 ** 6:
+            return number
+        number *= 10
+
+
+def _peak_bytes(func: Callable[[], object]) -> int:
+    """Peak traced allocation while running one op, above what was live before it"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func()
+        return max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(case: Case, samples: int, min_batch_seconds: float) -> Dict:
+    func = case.setup()
+    func()  # warm up caches, compiled regexes and lazy imports
+    number = _batch_size(func, min_batch_seconds)
+
+    per_op = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(samples):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            per_op.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    per_op.sort()
+    mean = statistics.mean(per_op)
+    return {
+        "ops_per_sec": round(1 / mean, 2) if mean else 0.0,
+        "p50_us": round(per_op[len(per_op) // 2] * 1e6, 2),
+        "p99_us": round(per_op[min(int(len(per_op) * 0.99), len(per_op) - 1)] * 1e6, 2),
+        "peak_bytes": _peak_bytes(func),
+        "batch": number,
+    }
+
+
+def _format_us(value: float) -> str:
+    if value >= 1e6:
+        return f"{value / 1e6:.2f} s"
+    if value >= 1e3:
+        return f"{value / 1e3:.2f} ms"
+    return f"{value:.2f} µs"
+
+
+def _format_bytes(value: int) -> str:
+    if value >= 1024 * 1024:
+        return f"{value / 1024 / 1024:.1f} MB"
+    if value >= 1024:
+        return f"{value / 1024:.1f} KB"
+    return f"{value} B"
+
+
+def load_baselines(path: str = BASELINES_PATH) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(results: Dict[str, Dict], path: str = BASELINES_PATH):
+    baselines = load_baselines(path)
+    baselines.setdefault("cases", {}).update(results)
+    baselines["machine"] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+    baselines["saved_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _delta(current: float, baseline: Optional[float]) -> str:
+    if not baseline:
+        return "      new"
+    change = (current - baseline) / baseline * 100
+    return f"{change:+8.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", "--filter", action="append", default=[], help="run cases whose name contains this")
+    parser.add_argument("--samples", type=int, default=30, help="timed batches per case")
+    parser.add_argument("--min-batch", type=float, default=0.01, help="minimum seconds per timed batch")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baselines")
+    parser.add_argument("--threshold", type=float, default=15.0, help="p50 slowdown (%%) reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on any regression")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = parser.parse_args()
+
+    cases = [case for case in CASES if not args.filter or any(f in case.name for f in args.filter)]
+    if args.list:
+        for case in cases:
+            print(f"{case.name:<42} {case.description}")
+        return
+    if not cases:
+        parser.error("no case matches the filters")
+
+    baselines = load_baselines().get("cases", {})
+    print(f"{'case':<42} {'ops/sec':>11} {'p50':>10} {'p99':>10} {'peak alloc':>11} {'p50 vs baseline':>16}")
+    results = {}
+    regressions = []
+    for case in cases:
+        result = run_case(case, args.samples, args.min_batch)
+        results[case.name] = result
+        baseline = baselines.get(case.name, {}).get("p50_us")
+        if baseline and (result["p50_us"] - baseline) / baseline * 100 > args.threshold:
+            regressions.append(case.name)
+        print(
+            f"{case.name:<42} {result['ops_per_sec']:>11,.1f} {_format_us(result['p50_us']):>10} "
+            f"{_format_us(result['p99_us']):>10} {_format_bytes(result['peak_bytes']):>11} "
+            f"{_delta(result['p50_us'], baseline):>16}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.save:
+        save_baselines(results)
+        print(f"Saved {len(results)} baselines to {BASELINES_PATH}")
+    if regressions:
+        print(f"Slower than baseline by more than {args.threshold:.0f}%: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
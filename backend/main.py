@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from api.backend_api import app
+from services.prefetcher import start_prefetcher
 
 if __name__ == "__main__":
     print(f"Starting {app.config.get('APP_NAME', 'Eventually Yours Shopping App')} Backend...")
@@ -18,4 +19,7 @@ if __name__ == "__main__":
     # Use production mode by default, but allow debug mode via environment variable
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     
+    # Keep the search pages of popular categories warm with spare scraping capacity (PREFETCH_ENABLED=true)
+    start_prefetcher()
+
     app.run(debug=debug_mode, host="0.0.0.0", port=5000) 
\ No newline at end of file
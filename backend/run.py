@@ -3,8 +3,11 @@ import sys
 import os
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from utils.domain_gen import get_amazon_domain
-from services.amazon_scraper import amazon_category_top_products, scrape_amazon_product
+from services.amazon_scraper import amazon_category_top_products, scrape_amazon_products
+from services.gemini_client import GEMINI_GENERATE_URL
 from services.prompt_builder import build_and_get_categories
+from services.price_parser import filter_by_budget, get_price_parser
+from services.product import dedupe_products
 
 
 def get_user_details():
@@ -65,43 +68,30 @@ def main():
     # Dictionary to hold category and its products
     category_products = {}
 
+    # Budget in the marketplace's minor units, parsed once for every category
+    budget = get_price_parser(amazon_domain).parse_budget(profile_details.get("budget_range"))
+
     def fetch_category_products(category):
-        urls = amazon_category_top_products(
+        search_results = amazon_category_top_products(
             category,
             amazon_domain,
             num_results=3,
             budget_range=profile_details.get("budget_range"),
         )
         products = []
-        if not urls:
+        if not search_results:
             return category, products
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = {executor.submit(scrape_amazon_product, url): url for url in urls}
-            for future in as_completed(futures):
-                url = futures[future]
-                try:
-                    product = future.result()
-                    if product:
-                        # Filter products by budget range if price_value is available
-                        budget_range = profile_details.get("budget_range")
-                        if budget_range and product.get("price_value") is not None:
-                            try:
-                                low, high = (
-                                    budget_range.replace("€", "")
-                                    .replace("$", "")
-                                    .split("-")
-                                )
-                                low = float(low.strip())
-                                high = float(high.strip())
-                                if low <= product["price_value"] <= high:
-                                    products.append(product)
-                            except Exception:
-                                # If parsing fails, include product anyway
-                                products.append(product)
-                        else:
-                            products.append(product)
-                except Exception as e:
-                    print(f"Exception occurred while scraping URL {url}: {e}")
+        # Detail pages are fetched concurrently on the scraper event loop
+        urls = [result.url for result in search_results]
+        scraped = scrape_amazon_products(urls)
+        # Products without a price (or without a budget range) are kept
+        in_budget = filter_by_budget([product.price_minor if product else None for product in scraped], budget)
+        for url, product, affordable in zip(urls, scraped, in_budget):
+            if product:
+                if affordable:
+                    products.append(product)
+            else:
+                print(f"Failed to scrape product page {url}")
         return category, products
 
     with ThreadPoolExecutor(max_workers=len(categories)) as category_executor:
@@ -117,12 +107,15 @@ def main():
     from sorting_algorithm import SortingAlgorithm
 
     sorting_algo = SortingAlgorithm(
-        "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent",
+        GEMINI_GENERATE_URL,
         api_key,
     )
     all_products = []
     for products in category_products.values():
         all_products.extend(products)
+    all_products, duplicates_removed = dedupe_products(all_products)
+    if duplicates_removed:
+        print(f"Removed {duplicates_removed} duplicate products before ranking")
     try:
         sorted_products_text = sorting_algo.get_sorted_products(
             user_input, profile_details, all_products
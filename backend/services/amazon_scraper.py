@@ -1,77 +1,235 @@
+import asyncio
+import os
 import random
-import time
 import httpx
-from bs4 import BeautifulSoup       
+from bs4 import BeautifulSoup, SoupStrainer
 from urllib.parse import quote_plus
-import requests
 import re
 import threading
-import json
-from typing import List, Dict, Optional, Tuple
-
-# Global rate limiting for concurrent requests
-_request_lock = threading.Lock()
-_last_request_time = 0
-_min_request_interval = 2.0  # Increased to 2 seconds for better reliability
-
-# Session management for better reliability
-_session_cache = {}
-_session_lock = threading.Lock()
-
-def _get_session(domain: str) -> requests.Session:
-    """Get or create a session for a specific domain with persistent cookies"""
-    with _session_lock:
-        if domain not in _session_cache:
-            session = requests.Session()
-            
-            # Enhanced headers that look more like a real browser
-            session.headers.update({
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-                "Accept-Language": "en-US,en;q=0.9,en-GB;q=0.8",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "none",
-                "Sec-Fetch-User": "?1",
-                "Cache-Control": "max-age=0",
-                "sec-ch-ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                "sec-ch-ua-mobile": "?0",
-                "sec-ch-ua-platform": '"Windows"',
-            })
-            
-            _session_cache[domain] = session
-            
-        return _session_cache[domain]
-
-
-def _rate_limit_request():
-    """Ensure minimum time between requests to avoid overwhelming Amazon"""
-    global _last_request_time
-    with _request_lock:
-        current_time = time.time()
-        time_since_last = current_time - _last_request_time
-        if time_since_last < _min_request_interval:
-            sleep_time = _min_request_interval - time_since_last
-            time.sleep(sleep_time)
-        _last_request_time = time.time()
-
-
-def _detect_bot_protection(soup: BeautifulSoup) -> bool:
-    """Detect if Amazon is showing bot protection page"""
-    page_text = soup.get_text().lower()
-    bot_indicators = [
-        "robot", "captcha", "blocked", "unusual", "verify", "security check",
-        "enter the characters you see below", "type the characters you see",
-        "to discuss automated access", "automated requests"
-    ]
-    return any(indicator in page_text for indicator in bot_indicators)
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Coroutine, List, Dict, Optional, Tuple
+from services.rate_limiter import rate_limiter
+from services.page_cache import SearchPageCache, search_page_cache
+from services.price_parser import get_price_parser
+from services.product import Product, dedupe_key, dedupe_products
+from services.product_cache import FRESH, STALE, product_cache
+from services.client_pool import ClientPool, pool_settings_from_env
+from services.scrape_scheduler import BACKGROUND, SchedulerFull, current_priority, scrape_scheduler
+from services.single_flight import SingleFlight
+from services.circuit_breaker import (
+    BOT_DETECTED, CLOSED, CONNECTION_ERROR, FORBIDDEN, RATE_LIMITED, SERVER_ERROR, SUCCESS, TIMEOUT,
+    circuit_breakers,
+)
+from utils.asin import canonical_asin, normalize_asin
+from utils.deadline import Deadline
+from utils.http import parse_retry_after
+
+# All scraping I/O runs on one background event loop so that many fetches can be
+# in flight at once without a thread per request
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+# HTML parsing is CPU bound, keep it off the event loop so I/O stays responsive
+_parse_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="amazon-parse")
+
+# How many search strategies a category may have in flight at once (1 = one after another)
+_default_hedge_width = int(os.getenv("SCRAPER_HEDGE_WIDTH", "2"))
+
+# Pagination mode: when a strategy's first page is thin, read its next pages before trying another sort
+_default_paginate = os.getenv("SCRAPER_PAGINATE", "false").lower() == "true"
+_max_pages = int(os.getenv("SCRAPER_MAX_PAGES", "2"))
+
+# Retry backoff: doubles per attempt with jitter; waits longer than the cap are not worth making
+_retry_base_delay = float(os.getenv("SCRAPER_RETRY_BASE_DELAY", "1.0"))
+_retry_max_delay = float(os.getenv("SCRAPER_RETRY_MAX_DELAY", "20"))
+# A retry is only scheduled if at least this much of the deadline is left after the backoff
+_min_attempt_time = 2.0
+
+# Background refreshes of stale product cache entries (only touched from the event loop)
+_refresh_tasks = {}
+
+_BREAKER_OUTCOMES_BY_STATUS = {503: SERVER_ERROR, 429: RATE_LIMITED, 403: FORBIDDEN}
+
+# 403s and bot pages will not clear up within one request, retrying only digs deeper
+_RETRYABLE_OUTCOMES = frozenset({SERVER_ERROR, RATE_LIMITED, TIMEOUT, CONNECTION_ERROR})
+
+# Timeout of one request to Amazon when the deadline leaves room for it
+_request_timeout = 10.0
+
+# Connections per pooled client: one request at a time, plus a spare for redirects to another host
+_connections_per_client = 2
+
+# Send all Amazon traffic to a local stand-in (benchmarks/standin.py), e.g. "http://127.0.0.1:8765"
+_scraper_upstream = os.getenv("SCRAPER_UPSTREAM")
+
+_DEFAULT_HEADERS = {
+    # Enhanced headers that look more like a real browser
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Language": "en-US,en;q=0.9,en-GB;q=0.8",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Cache-Control": "max-age=0",
+    "sec-ch-ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"Windows"',
+}
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """Get the scraper event loop, starting its background thread on first use"""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever, name="amazon-scraper-loop", daemon=True
+            )
+            _loop_thread.start()
+        return _loop
+
+
+def submit_coroutine(coro: Coroutine) -> Future:
+    """Schedule a coroutine on the scraper event loop and return a concurrent Future"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop())
+
+
+def run_coroutine(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the scraper event loop and block until it finishes"""
+    return submit_coroutine(coro).result(timeout=timeout)
+
+
+async def _run_parser(func: Callable, *args) -> Any:
+    """Run a CPU-bound parsing function (or blocking cache I/O) in the parse executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_parse_executor, func, *args)
+
+
+class _UpstreamOverrideTransport(httpx.AsyncBaseTransport):
+    """Rewrites every request to one upstream, keeping the original host in X-Forwarded-Host"""
+
+    def __init__(self, upstream: str, limits: httpx.Limits):
+        self._upstream = httpx.URL(upstream)
+        self._transport = httpx.AsyncHTTPTransport(limits=limits)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.headers["X-Forwarded-Host"] = request.url.host
+        request.url = request.url.copy_with(
+            scheme=self._upstream.scheme, host=self._upstream.host, port=self._upstream.port
+        )
+        request.headers["Host"] = self._upstream.netloc.decode("ascii")
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _new_client() -> httpx.AsyncClient:
+    """Create one async client with its own connections and cookie jar"""
+    limits = httpx.Limits(
+        max_connections=_connections_per_client,
+        max_keepalive_connections=_connections_per_client,
+    )
+    return httpx.AsyncClient(
+        headers=_DEFAULT_HEADERS,
+        timeout=10,
+        follow_redirects=True,
+        limits=limits,
+        transport=_UpstreamOverrideTransport(_scraper_upstream, limits) if _scraper_upstream else None,
+    )
+
+
+# Clients per marketplace are checked out for one request at a time (only touched from the event loop)
+client_pool = ClientPool(_new_client, **pool_settings_from_env())
+
+
+def get_client_pool_stats() -> Dict:
+    return client_pool.stats()
+
+
+def _is_search_result_container(name: str, attrs) -> bool:
+    """SoupStrainer filter: keep only the elements _extract_products_from_page can select"""
+    if not isinstance(attrs, dict):
+        attrs = dict(attrs or ())
+    if attrs.get("data-component-type") == "s-search-result" or attrs.get("data-asin"):
+        return True
+    classes = attrs.get("class") or ""
+    if isinstance(classes, str):
+        classes = classes.split()
+    return "s-result-item" in classes
+
+
+# Only materialize result containers (and their subtrees) when parsing search pages,
+# navigation, scripts, ads and footer never become tree nodes
+SEARCH_RESULTS_ONLY = SoupStrainer(_is_search_result_container)
+
+_restricted_parse = os.getenv("SCRAPER_RESTRICTED_PARSE", "true").lower() != "false"
+
+
+class ParsedPage:
+    """A fetched page whose HTML is parsed at most once and shared by every consumer"""
+
+    __slots__ = ("url", "content", "encoding", "parse_only", "_soup")
+
+    def __init__(self, url: str, content: bytes, encoding: Optional[str] = None, parse_only: Optional[SoupStrainer] = None):
+        self.url = url
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.parse_only = parse_only
+        self._soup = None
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def parse(self) -> BeautifulSoup:
+        """Build the DOM on first use and return the cached tree afterwards"""
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.text, "html.parser", parse_only=self.parse_only)
+        return self._soup
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        return self.parse()
+
+    def release(self):
+        """Free the tree explicitly; BeautifulSoup trees are full of reference cycles"""
+        if self._soup is not None:
+            self._soup.decompose()
+            self._soup = None
+
+
+# Markup that only appears on Amazon's captcha / automated-access interstitials.
+# Matching markup rather than visible words avoids false positives on product
+# titles such as "robot vacuum" or "verified purchase".
+_BOT_PROTECTION_MARKERS = re.compile(
+    rb'action="/errors/validateCaptcha"'
+    rb'|id="captchacharacters"'
+    rb'|<title[^>]{0,40}>Robot Check</title>'
+    rb'|/captcha/[^"]{0,80}Captcha_'
+    rb'|api-services-support@amazon\.com'
+    rb'|Type the characters you see in this image'
+    rb'|Enter the characters you see below'
+)
+
+# Interstitials are small standalone documents (~5 KB), so only the head of a
+# response needs scanning; a real results page is 1-2 MB
+_BOT_PROTECTION_SCAN_BYTES = 64 * 1024
+
 
+def _detect_bot_protection(content: bytes) -> bool:
+    """Detect if Amazon is showing bot protection page, straight from the raw response bytes"""
+    return _BOT_PROTECTION_MARKERS.search(content, 0, _BOT_PROTECTION_SCAN_BYTES) is not None
 
-def _extract_products_from_page(soup: BeautifulSoup, domain: str) -> List[Dict]:
+
+def _extract_products_from_page(soup: BeautifulSoup, domain: str) -> List[Product]:
     """Extract product data from Amazon search results page"""
     products = []
     
@@ -155,8 +313,6 @@ def _extract_products_from_page(soup: BeautifulSoup, domain: str) -> List[Dict]:
                     if price_text:
                         break
             
-            price_value = parse_price_to_float(price_text)
-            
             # Extract rating
             rating_selectors = [
                 "span.a-icon-alt",
@@ -194,86 +350,360 @@ def _extract_products_from_page(soup: BeautifulSoup, domain: str) -> List[Dict]:
             
             # Only add if we have essential data
             if title and full_url:
-                product_data = {
-                    "url": full_url,
-                    "title": title,
-                    "image_url": image_url,
-                    "price": price_text,
-                    "price_value": price_value,
-                    "average_rating": rating,
-                }
-                products.append(product_data)
+                products.append(Product(
+                    url=full_url,
+                    title=title,
+                    price_text=price_text,
+                    rating=rating,
+                    image_url=image_url,
+                    asin=canonical_asin(full_url) or normalize_asin(container.get("data-asin")),
+                ))
                 
-        except Exception as e:
+        except Exception:
             continue  # Skip this product if there's an error
     
+    # Prices are parsed in one batch per page with the marketplace's number format
+    price_parser = get_price_parser(domain)
+    for product, price_minor in zip(products, price_parser.parse_many(product.price_text for product in products)):
+        product.price_minor = price_minor
+        product.price_exponent = price_parser.exponent
+
     return products
 
 
-def _make_request_with_retry(url: str, domain: str, max_retries: int = 3) -> Tuple[Optional[requests.Response], str]:
-    """Make a request with retry logic and better error handling"""
-    session = _get_session(domain)
+def _request_timeout_for(deadline: Optional[Deadline]) -> Tuple[float, bool]:
+    """
+    Timeout for one request, never past the deadline, and whether the deadline cut it
+    short. A shortened timeout firing says nothing about the marketplace's health.
+    """
+    if deadline is None:
+        return _request_timeout, False
+    timeout = deadline.timeout(_request_timeout)
+    return timeout, timeout < _request_timeout
+
+
+def _take_background_token(domain: str) -> bool:
+    """
+    Rate limit token for one background request, only if taking it leaves the
+    bucket one short of full. Background work never queues for tokens, so an
+    interactive request arriving meanwhile still finds burst - 1 of them.
+    """
+    return rate_limiter.try_acquire(domain, spare=rate_limiter.bucket(domain).burst - 1)
+
+
+def _retry_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Backoff before retry number `attempt` (1-based): exponential with equal jitter, or Retry-After plus jitter"""
+    if retry_after is not None:
+        # Jitter so every request told the same Retry-After does not come back at once
+        return retry_after + random.uniform(0, _retry_base_delay)
+    ceiling = _retry_base_delay * 2 ** (attempt - 1)
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+async def _async_make_request_with_retry(
+    url: str,
+    domain: str,
+    max_retries: int = 3,
+    parse_only: Optional[SoupStrainer] = None,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[Optional[ParsedPage], str]:
+    """
+    Fetch and parse a page, retrying 503s, 429s, timeouts and connection errors.
+    Backoff sleeps on the event loop, honours Retry-After, and a retry is only
+    scheduled if it can finish within the remaining `deadline` budget.
+    """
+    breaker = circuit_breakers.breaker(domain)
+    status = "No attempts made"
+    retry_after = None
     
     for attempt in range(max_retries):
+        if attempt > 0:
+            delay = _retry_delay(attempt, retry_after)
+            if delay > _retry_max_delay:
+                if retry_after is None:
+                    return None, f"{status}, backoff {delay:.0f}s exceeds cap"
+                return None, f"{status}, Retry-After {retry_after:.0f}s is too long to wait"
+            if deadline is not None and not deadline.has(delay + _min_attempt_time):
+                return None, f"{status}, no time left to retry"
+            await asyncio.sleep(delay)
+
+        # A blocked marketplace fails fast instead of waiting out limiter slots and timeouts
+        if not breaker.allow():
+            return None, f"Circuit open for {domain} (retry in {breaker.retry_after():.0f}s)"
+
+        outcome = None
+        retry_after = None
+        timeout_shortened = False
         try:
-            # Apply rate limiting
-            _rate_limit_request()
-            
-            # Add random delay between attempts
-            if attempt > 0:
-                delay = random.uniform(3, 6) * (attempt + 1)  # Exponential backoff
-                time.sleep(delay)
-            
-            # Add referer for subsequent attempts
-            if attempt > 0:
-                session.headers.update({
-                    "Referer": f"https://www.{domain}/"
-                })
-            
-            # Make request with timeout
-            response = session.get(url, timeout=10)
+            if deadline is not None and deadline.expired():
+                return None, f"Deadline exceeded (attempt {attempt + 1}/{max_retries})"
+            remaining = None if deadline is None else deadline.remaining()
+
+            # Wait for this job's turn at the marketplace, the slot is held until the response is read
+            try:
+                await scrape_scheduler.acquire(domain, remaining)
+            except asyncio.TimeoutError:
+                return None, f"Deadline exceeded waiting for a scrape slot (attempt {attempt + 1}/{max_retries})"
+            except SchedulerFull as e:
+                return None, f"{e} (attempt {attempt + 1}/{max_retries})"
+            try:
+                # Apply per-marketplace rate limiting, giving the slot back if the deadline passes first
+                if current_priority() == BACKGROUND:
+                    # Checked before every background request, a prefetch may make many of them
+                    if not _take_background_token(domain):
+                        return None, f"No spare rate limit tokens for background work (attempt {attempt + 1}/{max_retries})"
+                else:
+                    try:
+                        await asyncio.wait_for(rate_limiter.acquire_async(domain), None if deadline is None else deadline.remaining())
+                    except asyncio.TimeoutError:
+                        return None, f"Deadline exceeded waiting for a rate limit slot (attempt {attempt + 1}/{max_retries})"
+
+                # Add referer for subsequent attempts (per request, never on the pooled client)
+                headers = None
+                if attempt > 0:
+                    headers = {"Referer": f"https://www.{domain}/"}
+
+                try:
+                    client = await client_pool.checkout(domain, None if deadline is None else deadline.remaining())
+                except asyncio.TimeoutError:
+                    return None, f"Deadline exceeded waiting for a free client (attempt {attempt + 1}/{max_retries})"
+                bot_detected = False
+                try:
+                    # Never let one request outlive the deadline
+                    timeout, timeout_shortened = _request_timeout_for(deadline)
+                    response = await client.get(url, headers=headers, timeout=timeout)
+                    bot_detected = response.status_code == 200 and _detect_bot_protection(response.content)
+                finally:
+                    # A client that hit a bot check does not come back with its flagged cookies
+                    client_pool.checkin(domain, client, discard=bot_detected)
+            finally:
+                scrape_scheduler.release(domain)
             
             # Check for specific error codes
-            if response.status_code == 503:
-                return None, f"503 Server Error (attempt {attempt + 1}/{max_retries})"
-            elif response.status_code == 429:
-                return None, f"429 Rate Limited (attempt {attempt + 1}/{max_retries})"
-            elif response.status_code == 403:
-                return None, f"403 Forbidden (attempt {attempt + 1}/{max_retries})"
+            if response.status_code in _BREAKER_OUTCOMES_BY_STATUS:
+                outcome = _BREAKER_OUTCOMES_BY_STATUS[response.status_code]
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                status = {
+                    SERVER_ERROR: "503 Server Error",
+                    RATE_LIMITED: "429 Rate Limited",
+                    FORBIDDEN: "403 Forbidden",
+                }[outcome] + f" (attempt {attempt + 1}/{max_retries})"
+                if outcome in _RETRYABLE_OUTCOMES:
+                    continue
+                return None, status
             elif response.status_code != 200:
                 return None, f"HTTP {response.status_code} (attempt {attempt + 1}/{max_retries})"
             
-            # Check for bot protection
-            soup = BeautifulSoup(response.text, "html.parser")
-            if _detect_bot_protection(soup):
+            # Check for bot protection before paying for a DOM parse
+            if bot_detected:
+                outcome = BOT_DETECTED
                 return None, f"Bot detection (attempt {attempt + 1}/{max_retries})"
+            outcome = SUCCESS
             
-            return response, "success"
+            # Parse once, the same tree is reused by the product extractor
+            page = ParsedPage(url, response.content, response.encoding, parse_only)
+            await _run_parser(page.parse)
             
-        except requests.exceptions.Timeout:
-            return None, f"Timeout (attempt {attempt + 1}/{max_retries})"
-        except requests.exceptions.ConnectionError:
-            return None, f"Connection Error (attempt {attempt + 1}/{max_retries})"
+            return page, "success"
+            
+        except httpx.TimeoutException:
+            # Only a full-length timeout counts against the marketplace
+            outcome = None if timeout_shortened else TIMEOUT
+            status = f"Timeout (attempt {attempt + 1}/{max_retries})"
+        except httpx.NetworkError:
+            outcome = CONNECTION_ERROR
+            status = f"Connection Error (attempt {attempt + 1}/{max_retries})"
         except Exception as e:
             return None, f"Request Error: {str(e)} (attempt {attempt + 1}/{max_retries})"
+        finally:
+            breaker.record(outcome)
     
-    return None, f"All {max_retries} attempts failed"
+    return None, status
 
 
-def amazon_category_top_products(
-    category: str, 
-    amazon_domain: str, 
-    num_results: int = 4, 
-    budget_range: Optional[str] = None, 
-    preferred_brands: Optional[str] = None
-) -> List[Dict]:
+def _make_request_with_retry(
+    url: str, domain: str, max_retries: int = 3, deadline: Optional[Deadline] = None
+) -> Tuple[Optional[ParsedPage], str]:
+    """Blocking wrapper around _async_make_request_with_retry"""
+    return run_coroutine(_async_make_request_with_retry(url, domain, max_retries, deadline=deadline))
+
+
+async def _fetch_search_page(
+    url: str, domain: str, cache_key: Optional[str], max_retries: int = 2, deadline: Optional[Deadline] = None
+) -> Tuple[Optional[ParsedPage], str]:
+    """Serve a search page from the disk cache, or fetch it and store it on success"""
+    parse_only = SEARCH_RESULTS_ONLY if _restricted_parse else None
+    if search_page_cache is not None and cache_key:
+        # Decompression and file I/O stay off the event loop, like parsing
+        content = await _run_parser(search_page_cache.get, cache_key)
+        if content is not None:
+            # Cache hits skip both the rate-limit slot and the network round trip
+            page = ParsedPage(url, content, parse_only=parse_only)
+            await _run_parser(page.parse)
+            return page, "cache hit"
+
+    page, status = await _async_make_request_with_retry(
+        url, domain, max_retries=max_retries, parse_only=parse_only, deadline=deadline
+    )
+    if search_page_cache is not None and cache_key:
+        if page is not None:
+            try:
+                await _run_parser(search_page_cache.put, cache_key, page.content)
+            except OSError as e:
+                print(f"Failed to cache search page {url}: {e}")
+        elif circuit_breakers.breaker(domain).state != CLOSED:
+            # The marketplace is blocking us: an expired page beats no page
+            content = await _run_parser(lambda: search_page_cache.get(cache_key, allow_stale=True))
+            if content is not None:
+                page = ParsedPage(url, content, parse_only=parse_only)
+                await _run_parser(page.parse)
+                return page, f"stale cache hit ({status})"
+    return page, status
+
+
+async def _run_strategy(
+    strategy: Dict,
+    category: str,
+    domain: str,
+    search_query: str,
+    price_filter: str,
+    deadline: Optional[Deadline] = None,
+    page_number: int = 1,
+) -> List[Product]:
+    """Fetch one search strategy's results page (the first unless `page_number`) and extract its products"""
+    strategy_name = strategy["name"]
+    search_url = strategy["url"]
+    page_filter = ""
+    if page_number > 1:
+        page_filter = f"&page={page_number}"
+        search_url += page_filter
+        strategy_name += f" (page {page_number})"
+    
+    print(f"Trying {strategy_name} strategy: {search_url}")
+    
+    cache_key = SearchPageCache.make_key(domain, search_query, strategy["sort"], price_filter + page_filter)
+    page, status = await _fetch_search_page(search_url, domain, cache_key, max_retries=2, deadline=deadline)
+    
+    if page is None:
+        print(f"❌ {status} for {category} ({strategy_name} strategy)")
+        return []
+    
+    try:
+        products = await _run_parser(_extract_products_from_page, page.soup, domain)
+        
+        if products:
+            print(f"✅ Found {len(products)} products with {strategy_name} strategy")
+            # Log detailed product information
+            for i, product in enumerate(products, 1):
+                print(f"   {i}. {product.title or 'No title'}")
+                print(f"      Price: {product.price_text or 'No price'}")
+                print(f"      Rating: {product.rating or 'No rating'}")
+                print(f"      URL: {product.url or 'No URL'}")
+        else:
+            print(f"No products found with {strategy_name} strategy")
+        return products
+            
+    except Exception as e:
+        print(f"Error processing {strategy_name} strategy: {str(e)}")
+        return []
+    finally:
+        page.release()
+
+
+async def _run_strategies_hedged(
+    strategies: List[Dict],
+    category: str,
+    domain: str,
+    search_query: str,
+    price_filter: str,
+    target: int,
+    width: int,
+    deadline: Optional[Deadline] = None,
+) -> List[Product]:
     """
-    Ultra-reliable Amazon scraper with comprehensive error handling and fallback strategies
+    Run up to `width` strategies at once, in priority order. Extra strategies are only
+    started while the domain's rate budget has a token to spare, so hedging never queues
+    behind other traffic. Stops and cancels the stragglers once `target` distinct products are in.
     """
-    print(f"Searching for category: {category} on {amazon_domain}")
-    if preferred_brands:
-        print(f"Preferred brands: {preferred_brands}")
+    bucket = rate_limiter.bucket(domain)
+    waiting = list(strategies)
+    running = {}
+    results = {}
+
+    def start_next():
+        strategy = waiting.pop(0)
+        task = asyncio.ensure_future(
+            _run_strategy(strategy, category, domain, search_query, price_filter, deadline)
+        )
+        running[task] = strategy
+
+    start_next()
+    try:
+        while running:
+            while waiting and len(running) < width and bucket.available() >= 1:
+                start_next()
 
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                strategy = running.pop(task)
+                results[strategy["priority"]] = task.result()
+
+            found = {dedupe_key(product) for products in results.values() for product in products}
+            if len(found) >= target:
+                if running:
+                    print(f"Enough products for {category}, cancelling {len(running)} hedged strategies")
+                break
+            if deadline is not None and deadline.expired():
+                if running:
+                    print(f"⏰ Deadline reached for {category}, cancelling {len(running)} hedged strategies")
+                break
+            if not running and waiting:
+                start_next()
+    finally:
+        for task in running:
+            task.cancel()
+
+    # Keep strategy priority order regardless of which request finished first
+    return [product for priority in sorted(results) for product in results[priority]]
+
+
+async def _iter_category_products(
+    strategies: List[Dict],
+    category: str,
+    domain: str,
+    search_query: str,
+    price_filter: str,
+    deadline: Optional[Deadline] = None,
+    max_pages: int = 1,
+) -> AsyncIterator[Product]:
+    """
+    Lazily yield products strategy by strategy. With max_pages > 1, a strategy whose
+    first page had new products is followed to its next pages before the next sort is
+    tried. Nothing is fetched until the caller asks for more products than it already has.
+    """
+    seen = set()
+    for strategy in strategies:
+        for page_number in range(1, max_pages + 1):
+            if deadline is not None and deadline.expired():
+                print(f"⏰ Deadline reached for {category}, skipping remaining pages and strategies")
+                return
+            products = await _run_strategy(
+                strategy, category, domain, search_query, price_filter, deadline, page_number
+            )
+            new_keys = {dedupe_key(product) for product in products} - seen
+            if not new_keys:
+                # An empty page, or one repeating products already yielded, means this
+                # strategy is exhausted (or failing)
+                break
+            seen |= new_keys
+            for product in products:
+                yield product
+
+
+def _search_query_and_filter(
+    category: str, budget_range: Optional[str] = None, preferred_brands: Optional[str] = None
+) -> Tuple[str, str]:
+    """Search query (first preferred brand + category) and Amazon price filter parameters"""
     # Parse budget range
     low_price = None
     high_price = None
@@ -286,9 +716,6 @@ def amazon_category_top_products(
         except Exception:
             print("Error parsing budget range")
 
-    # Clean domain
-    domain = amazon_domain.replace("www.", "")
-    
     # Build search query
     search_query = category
     if preferred_brands and preferred_brands.strip():
@@ -300,81 +727,145 @@ def amazon_category_top_products(
     price_filter = ""
     if low_price and high_price:
         price_filter = f"&low-price={low_price}&high-price={high_price}"
+    return search_query, price_filter
+
+
+# Identical category scrapes in flight at the same time (same query, marketplace and
+# price filter) share one scrape, e.g. several users asking for "Bluetooth Speakers"
+_category_flights = SingleFlight()
+
+
+def get_coalescing_stats() -> Dict:
+    return _category_flights.stats()
+
+
+async def async_amazon_category_top_products(
+    category: str, 
+    amazon_domain: str, 
+    num_results: int = 4, 
+    budget_range: Optional[str] = None, 
+    preferred_brands: Optional[str] = None,
+    hedge_width: Optional[int] = None,
+    deadline: Optional[Deadline] = None,
+    paginate: Optional[bool] = None,
+) -> List[Product]:
+    """
+    Ultra-reliable Amazon scraper with comprehensive error handling and fallback strategies.
+    With hedge_width > 1 the top strategies run concurrently and the rest are cancelled
+    as soon as enough products have been found. With `paginate` (SCRAPER_PAGINATE by
+    default) strategies are walked one at a time instead, and a strategy whose first
+    page is thin is followed to its second page before another sort is tried.
+    Retries inside the strategies stop being scheduled once they could not finish
+    within `deadline`.
+    Concurrent calls for the same search share one scrape when it was started with at least
+    the caller's deadline and priority, each caller gets its own copies.
+    """
+    domain = amazon_domain.replace("www.", "")
+    search_query, price_filter = _search_query_and_filter(category, budget_range, preferred_brands)
+    paginate = _default_paginate if paginate is None else paginate
+    key = (" ".join(search_query.lower().split()), domain.lower(), price_filter, hedge_width, paginate)
+
+    try:
+        products = await _category_flights.do(
+            key,
+            lambda: _scrape_category_top_products(
+                category, domain, search_query, price_filter, num_results, hedge_width, deadline, paginate
+            ),
+            size=num_results,
+            timeout=None if deadline is None else deadline.remaining(),
+            # The scrape runs under the job and deadline of whoever started it: an interactive
+            # request never waits on a background prefetch or on a scrape that gives up sooner
+            expires_at=None if deadline is None else deadline.expires_at,
+            priority=current_priority(),
+        )
+    except asyncio.TimeoutError:
+        print(f"⏰ Deadline reached waiting for the shared scrape of {category}")
+        return []
+    return [product.copy() for product in products[:num_results]]
+
+
+async def _scrape_category_top_products(
+    category: str,
+    domain: str,
+    search_query: str,
+    price_filter: str,
+    num_results: int,
+    hedge_width: Optional[int],
+    deadline: Optional[Deadline],
+    paginate: bool = False,
+) -> List[Product]:
+    """One category scrape, run through _category_flights"""
+    print(f"Searching for category: {category} on {domain}")
+    if search_query != category:
+        print(f"Search query with preferred brand: {search_query}")
 
     # Multiple search strategies with different approaches
     search_strategies = [
         {
             "name": "best-sellers",
             "url": f"https://www.{domain}/s?k={quote_plus(search_query)}&s=best-sellers{price_filter}",
+            "sort": "best-sellers",
             "priority": 1
         },
         {
             "name": "review-rank", 
             "url": f"https://www.{domain}/s?k={quote_plus(search_query)}&s=review-rank{price_filter}",
+            "sort": "review-rank",
             "priority": 2
         },
         {
             "name": "price-low-to-high",
             "url": f"https://www.{domain}/s?k={quote_plus(search_query)}&s=price-asc-rank{price_filter}",
+            "sort": "price-asc-rank",
             "priority": 3
         },
         {
             "name": "default",
             "url": f"https://www.{domain}/s?k={quote_plus(search_query)}{price_filter}",
+            "sort": "",
             "priority": 4
         }
     ]
 
-    all_products = []
-    
-    for strategy in search_strategies:
-        strategy_name = strategy["name"]
-        search_url = strategy["url"]
-        
-        print(f"Trying {strategy_name} strategy: {search_url}")
-        
-        response, status = _make_request_with_retry(search_url, domain, max_retries=2)
-        
-        if response is None:
-            print(f"❌ {status} for {category} ({strategy_name} strategy)")
-            continue
-        
+    target = num_results * 2  # Get extra products for variety
+    width = _default_hedge_width if hedge_width is None else hedge_width
+    if paginate:
+        # Pull products only until the target is reached, so later pages and strategies are never fetched
+        all_products = []
+        unique_keys = set()
+        products = _iter_category_products(
+            search_strategies, category, domain, search_query, price_filter, deadline, max(_max_pages, 1)
+        )
         try:
-            soup = BeautifulSoup(response.text, "html.parser")
-            products = _extract_products_from_page(soup, domain)
-            
-            if products:
-                print(f"✅ Found {len(products)} products with {strategy_name} strategy")
-                # Log detailed product information
-                for i, product in enumerate(products, 1):
-                    print(f"   {i}. {product.get('title', 'No title')}")
-                    print(f"      Price: {product.get('price', 'No price')}")
-                    print(f"      Rating: {product.get('average_rating', 'No rating')}")
-                    print(f"      URL: {product.get('url', 'No URL')}")
-                all_products.extend(products)
-                
-                # If we have enough products, stop trying more strategies
-                if len(all_products) >= num_results * 2:  # Get extra products for variety
+            async for product in products:
+                all_products.append(product)
+                # Duplicates are dropped below, only distinct products count towards the target
+                unique_keys.add(dedupe_key(product))
+                if len(unique_keys) >= target:
                     break
-            else:
-                print(f"No products found with {strategy_name} strategy")
-                
-        except Exception as e:
-            print(f"Error processing {strategy_name} strategy: {str(e)}")
-            continue
-
-    # Remove duplicates and limit results
-    unique_products = []
-    seen_urls = set()
-    
-    for product in all_products:
-        if product["url"] not in seen_urls:
-            unique_products.append(product)
-            seen_urls.add(product["url"])
-            
-            if len(unique_products) >= num_results:
+        finally:
+            await products.aclose()
+    elif width > 1:
+        all_products = await _run_strategies_hedged(
+            search_strategies, category, domain, search_query, price_filter, target, width, deadline
+        )
+    else:
+        all_products = []
+        for strategy in search_strategies:
+            if deadline is not None and deadline.expired():
+                print(f"⏰ Deadline reached for {category}, skipping remaining strategies")
                 break
-    
+            all_products.extend(
+                await _run_strategy(strategy, category, domain, search_query, price_filter, deadline)
+            )
+            # If we have enough distinct products, stop trying more strategies
+            if len({dedupe_key(product) for product in all_products}) >= target:
+                break
+
+    # Remove duplicates (the same ASIN under different URL forms) and limit results
+    unique_products, _ = dedupe_products(all_products)
+    unique_products = unique_products[:num_results]
+
     if unique_products:
         print(f"✅ Successfully found {len(unique_products)} unique products for {category}")
         return unique_products
@@ -383,69 +874,195 @@ def amazon_category_top_products(
         return []
 
 
-def parse_price_to_float(price_str: Optional[str]) -> Optional[float]:
-    """Parse price string to float value"""
-    if not price_str:
-        return None
+def amazon_category_top_products(
+    category: str, 
+    amazon_domain: str, 
+    num_results: int = 4, 
+    budget_range: Optional[str] = None, 
+    preferred_brands: Optional[str] = None,
+    hedge_width: Optional[int] = None,
+    deadline: Optional[Deadline] = None,
+    paginate: Optional[bool] = None,
+) -> List[Product]:
+    """Blocking wrapper around async_amazon_category_top_products"""
+    return run_coroutine(
+        async_amazon_category_top_products(
+            category, amazon_domain, num_results, budget_range, preferred_brands, hedge_width, deadline, paginate
+        )
+    )
+
+
+def parse_price_to_float(price_str: Optional[str], domain: Optional[str] = None) -> Optional[float]:
+    """Parse price string to float value, in the number format of `domain` (amazon.com by default)"""
+    price_parser = get_price_parser(domain)
+    return price_parser.to_major(price_parser.parse(price_str))
+
+
+def _parse_product_page(html: str, url: str, domain: Optional[str] = None) -> Product:
+    """Extract product details from an Amazon product page"""
+    soup = BeautifulSoup(html, "html.parser")
     
-    try:
-        # Remove currency symbols and commas
-        cleaned_price = re.sub(r'[£$€,]', '', price_str.strip())
-        # Extract the first number (before any additional text)
-        price_match = re.search(r'(\d+\.?\d*)', cleaned_price)
-        if price_match:
-            return float(price_match.group(1))
-    except (ValueError, AttributeError):
-        pass
+    # Extract product details
+    title_elem = soup.select_one("#productTitle")
+    title = title_elem.get_text(strip=True) if title_elem else None
     
-    return None
+    price_elem = soup.select_one("#priceblock_ourprice, .a-price .a-offscreen")
+    price_text = price_elem.get_text(strip=True) if price_elem else None
+    price_parser = get_price_parser(domain)
+    
+    rating_elem = soup.select_one("#acrPopover")
+    rating = None
+    if rating_elem:
+        rating_text = rating_elem.get("title", "")
+        rating_match = re.search(r'(\d+\.?\d*)', rating_text)
+        if rating_match:
+            try:
+                rating = float(rating_match.group(1))
+            except ValueError:
+                pass
+    
+    image_elem = soup.select_one("#landingImage, #imgBlkFront")
+    image_url = image_elem.get("src") if image_elem and image_elem.has_attr("src") else None
+    
+    return Product(
+        url=url,
+        title=title,
+        price_text=price_text,
+        price_minor=price_parser.parse(price_text),
+        price_exponent=price_parser.exponent,
+        rating=rating,
+        image_url=image_url,
+        asin=canonical_asin(url),
+    )
 
 
-def scrape_amazon_product(url: str) -> Optional[Dict]:
-    """Scrape detailed product information from Amazon product page"""
+async def _fetch_product_page(url: str, domain: str, deadline: Optional[Deadline] = None) -> Optional[Product]:
+    """Fetch and parse one product page, bypassing the product cache"""
+    breaker = circuit_breakers.breaker(domain)
+    if not breaker.allow():
+        print(f"Skipping product {url}: circuit open for {domain}")
+        return None
+
+    outcome = None
+    timeout_shortened = False
     try:
-        # Extract domain from URL
-        domain = url.split("//")[1].split("/")[0].replace("www.", "")
-        
-        session = _get_session(domain)
-        response = session.get(url, timeout=10)
+        await scrape_scheduler.acquire(domain, None if deadline is None else deadline.remaining())
+        try:
+            if current_priority() == BACKGROUND:
+                if not _take_background_token(domain):
+                    print(f"Skipping product {url}: no spare rate limit tokens for background work")
+                    return None
+            else:
+                await asyncio.wait_for(rate_limiter.acquire_async(domain), None if deadline is None else deadline.remaining())
+            client = await client_pool.checkout(domain, None if deadline is None else deadline.remaining())
+            bot_detected = False
+            try:
+                timeout, timeout_shortened = _request_timeout_for(deadline)
+                response = await client.get(url, timeout=timeout)
+                bot_detected = response.status_code == 200 and _detect_bot_protection(response.content)
+            finally:
+                client_pool.checkin(domain, client, discard=bot_detected)
+        finally:
+            scrape_scheduler.release(domain)
+        outcome = _BREAKER_OUTCOMES_BY_STATUS.get(response.status_code)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # Extract product details
-        title_elem = soup.select_one("#productTitle")
-        title = title_elem.get_text(strip=True) if title_elem else None
-        
-        price_elem = soup.select_one("#priceblock_ourprice, .a-price .a-offscreen")
-        price_text = price_elem.get_text(strip=True) if price_elem else None
-        price_value = parse_price_to_float(price_text)
-        
-        rating_elem = soup.select_one("#acrPopover")
-        rating = None
-        if rating_elem:
-            rating_text = rating_elem.get("title", "")
-            rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-            if rating_match:
-                try:
-                    rating = float(rating_match.group(1))
-                except ValueError:
-                    pass
-        
-        image_elem = soup.select_one("#landingImage, #imgBlkFront")
-        image_url = image_elem.get("src") if image_elem and image_elem.has_attr("src") else None
-        
-        return {
-            "url": url,
-            "title": title,
-            "image_url": image_url,
-            "price": price_text,
-            "price_value": price_value,
-            "average_rating": rating,
-        }
+        if bot_detected:
+            outcome = BOT_DETECTED
+            print(f"Bot detection while scraping product {url}")
+            return None
+        outcome = SUCCESS
+        return await _run_parser(_parse_product_page, response.text, url, domain)
         
+    except asyncio.TimeoutError:
+        print(f"Skipping product {url}: deadline reached waiting for a scrape slot, rate limit slot or client")
+        return None
+    except SchedulerFull as e:
+        print(f"Skipping product {url}: {e}")
+        return None
+    except httpx.TimeoutException:
+        # Only a full-length timeout counts against the marketplace
+        outcome = None if timeout_shortened else TIMEOUT
+        print(f"Error scraping product {url}: timeout")
+        return None
+    except httpx.NetworkError as e:
+        outcome = CONNECTION_ERROR
+        print(f"Error scraping product {url}: {str(e).strip()}")
+        return None
     except Exception as e:
         print(f"Error scraping product {url}: {str(e).strip()}")
         return None
+    finally:
+        breaker.record(outcome)
+
+
+async def _refresh_product(url: str, domain: str, asin: str):
+    """Re-scrape a stale cache entry; failures keep serving the stale copy"""
+    try:
+        product = await _fetch_product_page(url, domain)
+        if product and product.title:
+            product_cache.put(domain, asin, product)
+        product_cache.record_refresh(bool(product))
+    finally:
+        _refresh_tasks.pop((domain, asin), None)
+
+
+def _schedule_refresh(url: str, domain: str, asin: str):
+    """Start at most one background refresh per cached product"""
+    key = (domain, asin)
+    if key not in _refresh_tasks:
+        # Refreshes are background work, they only get request slots interactive scrapes leave free
+        _refresh_tasks[key] = asyncio.get_running_loop().create_task(
+            scrape_scheduler.run(_refresh_product(url, domain, asin), f"refresh:{domain}:{asin}", BACKGROUND)
+        )
+
+
+async def async_scrape_amazon_product(url: str, deadline: Optional[Deadline] = None) -> Optional[Product]:
+    """
+    Scrape detailed product information from Amazon product page. Cached copies are
+    always served; a fresh fetch is skipped when `deadline` has too little budget left.
+    """
+    try:
+        # Extract domain from URL
+        domain = url.split("//")[1].split("/")[0].replace("www.", "")
+    except IndexError:
+        print(f"Error scraping product {url}: invalid URL")
+        return None
+
+    asin = canonical_asin(url)
+    if asin:
+        cached, state = product_cache.get(domain, asin)
+        if state == FRESH:
+            return cached
+        if state == STALE:
+            # Serve the expired copy now and refresh it off the request path
+            _schedule_refresh(url, domain, asin)
+            return cached
+
+    if deadline is not None and not deadline.has(_min_attempt_time):
+        print(f"Skipping product {url}: {deadline.remaining():.1f}s left in the request budget")
+        return None
+
+    product = await _fetch_product_page(url, domain, deadline)
+    if product and asin and product.title:
+        product_cache.put(domain, asin, product)
+    return product
+
+
+async def async_scrape_amazon_products(
+    urls: List[str], deadline: Optional[Deadline] = None
+) -> List[Optional[Product]]:
+    """Scrape several product pages concurrently, preserving input order"""
+    return await asyncio.gather(*(async_scrape_amazon_product(url, deadline) for url in urls))
+
+
+def scrape_amazon_product(url: str, deadline: Optional[Deadline] = None) -> Optional[Product]:
+    """Blocking wrapper around async_scrape_amazon_product"""
+    return run_coroutine(async_scrape_amazon_product(url, deadline))
+
+
+def scrape_amazon_products(urls: List[str], deadline: Optional[Deadline] = None) -> List[Optional[Product]]:
+    """Blocking wrapper around async_scrape_amazon_products"""
+    return run_coroutine(async_scrape_amazon_products(urls, deadline))
 
 
 def test_amazon_scraper():
@@ -466,7 +1083,7 @@ def test_amazon_scraper():
     if products:
         print(f"✅ Successfully found {len(products)} products")
         for i, product in enumerate(products, 1):
-            print(f"{i}. {product.get('title', 'No title')} - {product.get('price', 'No price')}")
+            print(f"{i}. {product.title or 'No title'} - {product.price_text or 'No price'}")
     else:
         print("❌ No products found")
     
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Profile fields construct_prompt() puts into the category prompt
+PROMPT_PROFILE_FIELDS = (
+    "age",
+    "gender",
+    "budget_range",
+    "favorite_product_categories",
+    "interests_or_hobbies",
+    "preferred_shopping_method",
+)
+
+
+def _normalize(value) -> str:
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(str(item) for item in value)
+    return " ".join(str(value or "").lower().split())
+
+
+def category_cache_key(user_input: str, user_location: str, profile_details: Dict) -> str:
+    """Hash of the normalized fields that make up the category prompt"""
+    fields = [_normalize(user_input), _normalize(user_location)]
+    fields.extend(_normalize(profile_details.get(field, "")) for field in PROMPT_PROFILE_FIELDS)
+    return hashlib.sha256("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+
+class CategoryCache:
+    """
+    LRU + TTL cache of Gemini category lists keyed by category_cache_key().
+    With a `path`, entries are also written to a JSON file and reloaded on start,
+    so a restart does not empty the cache.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()  # key -> (categories, stored_at)
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+
+        if path:
+            self._load()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                self._expired += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return list(entry[0])
+
+    def put(self, key: str, categories: List[str]):
+        with self._lock:
+            self._entries[key] = (list(categories), time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            snapshot = list(self._entries.items()) if self.path else None
+        if snapshot is not None:
+            self._save(snapshot)
+
+    def _load(self):
+        now = time.time()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+            for key, categories, stored_at in stored[-self.max_entries:]:
+                if now - stored_at <= self.ttl:
+                    self._entries[key] = (categories, stored_at)
+        except FileNotFoundError:
+            return
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Ignoring unreadable category cache {self.path}: {e}")
+            self._entries.clear()
+
+    def _save(self, snapshot):
+        """Write the entries (oldest first) atomically; a failed write only costs persistence"""
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump([[key, categories, stored_at] for key, (categories, stored_at) in snapshot], f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to persist category cache: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "persistent": bool(self.path),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "expired": self._expired,
+                "evictions": self._evictions,
+            }
+
+
+def _cache_from_env() -> Optional[CategoryCache]:
+    """
+    Build the shared cache from the environment:
+      CATEGORY_CACHE_ENABLED   "false" sends every category prompt to Gemini
+      CATEGORY_CACHE_SIZE      category lists kept (default 1000)
+      CATEGORY_CACHE_TTL       seconds a list is reused (default 3600)
+      CATEGORY_CACHE_FILE      JSON file to persist the cache in (default: memory only)
+    """
+    if os.getenv("CATEGORY_CACHE_ENABLED", "true").lower() == "false":
+        return None
+    try:
+        return CategoryCache(
+            max_entries=int(os.getenv("CATEGORY_CACHE_SIZE", "1000")),
+            ttl=float(os.getenv("CATEGORY_CACHE_TTL", "3600")),
+            path=os.getenv("CATEGORY_CACHE_FILE") or None,
+        )
+    except ValueError as e:
+        print(f"Category cache disabled: {e}")
+        return None
+
+
+category_cache = _cache_from_env()
+
+
+def get_category_cache_stats() -> Dict:
+    if category_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **category_cache.stats()}
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Outcomes reported by the request layer
+SUCCESS = "success"
+SERVER_ERROR = "503"
+RATE_LIMITED = "429"
+FORBIDDEN = "403"
+BOT_DETECTED = "bot"
+TIMEOUT = "timeout"
+CONNECTION_ERROR = "connection"
+
+# Outcomes that mean the marketplace is blocking or shedding us; anything else
+# (404s, parse errors, cancelled requests) says nothing about the marketplace
+TRIPPING_OUTCOMES = frozenset({SERVER_ERROR, RATE_LIMITED, FORBIDDEN, BOT_DETECTED, TIMEOUT, CONNECTION_ERROR})
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 60.0
+DEFAULT_MAX_COOLDOWN = 600.0
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one marketplace.
+
+    Opens after `failure_threshold` consecutive tripping failures. While open every
+    request is refused until the cooldown passes, then a single probe is let through
+    (half-open): success closes the breaker, failure re-opens it with a doubled cooldown.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown: float = DEFAULT_COOLDOWN,
+        max_cooldown: float = DEFAULT_MAX_COOLDOWN,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._current_cooldown = cooldown
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self._opens = 0
+        self._rejected = 0
+        self._failures = {}
+
+    def _maybe_half_open(self, now: float):
+        if self._state == OPEN and now - self._opened_at >= self._current_cooldown:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+
+    def _open(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self._opens += 1
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in half-open only one probe is admitted"""
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record(self, outcome: Optional[str]):
+        """Report how an admitted request ended; None or non-tripping outcomes are neutral"""
+        now = time.monotonic()
+        with self._lock:
+            if outcome == SUCCESS:
+                self._state = CLOSED
+                self._consecutive_failures = 0
+                self._current_cooldown = self.cooldown
+                self._probe_in_flight = False
+                return
+
+            if outcome not in TRIPPING_OUTCOMES:
+                # Inconclusive probe, let the next request try again
+                self._probe_in_flight = False
+                return
+
+            self._failures[outcome] = self._failures.get(outcome, 0) + 1
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN:
+                self._current_cooldown = min(self._current_cooldown * 2, self.max_cooldown)
+                self._open(now)
+            elif self._state == CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._open(now)
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will admit a probe (0 when not open)"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(self._current_cooldown - (time.monotonic() - self._opened_at), 0.0)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "cooldown_seconds": self._current_cooldown,
+                "times_opened": self._opens,
+                "rejected_requests": self._rejected,
+                "failures": dict(self._failures),
+            }
+
+
+class DomainCircuitBreakers:
+    """One circuit breaker per Amazon marketplace, so one blocked domain never stalls the others"""
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown: float = DEFAULT_COOLDOWN,
+        max_cooldown: float = DEFAULT_MAX_COOLDOWN,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(domain: str) -> str:
+        return domain.lower().replace("www.", "")
+
+    def breaker(self, domain: str) -> CircuitBreaker:
+        domain = self._normalize(domain)
+        with self._lock:
+            breaker = self._breakers.get(domain)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.cooldown, self.max_cooldown)
+                self._breakers[domain] = breaker
+            return breaker
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {domain: breaker.stats() for domain, breaker in breakers.items()}
+
+
+def _breakers_from_env() -> DomainCircuitBreakers:
+    """
+    Build the shared breakers from the environment:
+      AMAZON_BREAKER_THRESHOLD     consecutive failures before opening (default 5)
+      AMAZON_BREAKER_COOLDOWN      seconds to stay open before probing (default 60)
+      AMAZON_BREAKER_MAX_COOLDOWN  cap for the doubling cooldown (default 600)
+    """
+    try:
+        return DomainCircuitBreakers(
+            failure_threshold=int(os.getenv("AMAZON_BREAKER_THRESHOLD", str(DEFAULT_FAILURE_THRESHOLD))),
+            cooldown=float(os.getenv("AMAZON_BREAKER_COOLDOWN", str(DEFAULT_COOLDOWN))),
+            max_cooldown=float(os.getenv("AMAZON_BREAKER_MAX_COOLDOWN", str(DEFAULT_MAX_COOLDOWN))),
+        )
+    except ValueError as e:
+        print(f"Invalid circuit breaker setting, using defaults: {e}")
+        return DomainCircuitBreakers()
+
+
+circuit_breakers = _breakers_from_env()
+
+
+def get_circuit_breaker_stats(domain: Optional[str] = None) -> Dict:
+    """Breaker state for all domains, or a single one"""
+    if domain:
+        return circuit_breakers.breaker(domain).stats()
+    return circuit_breakers.stats()
@@ -0,0 +1,227 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional
+
+import httpx
+
+# Clients per marketplace: each one serves a single request at a time with its own
+# cookie jar, so this is also the number of concurrent requests to one marketplace
+DEFAULT_POOL_SIZE = 8
+# Idle clients (and their keep-alive connections) are closed after this many seconds
+DEFAULT_IDLE_TIMEOUT = 300.0
+
+
+class _DomainPool:
+    """Idle clients and waiters for one marketplace"""
+
+    def __init__(self):
+        self.idle = deque()  # (client, returned_at), most recently returned last
+        self.waiters = deque()  # futures of coroutines waiting for a client
+        self.created = 0
+        self.in_use = 0
+
+        self.checkouts = 0
+        self.reused = 0
+        self.waits = 0
+        self.wait_timeouts = 0
+        self.discarded = 0
+        self.evicted = 0
+
+
+class ClientPool:
+    """
+    Bounded pool of httpx clients per marketplace with checkout/return semantics.
+
+    A checked-out client belongs to one request until it is returned, so per-request
+    headers and cookies never mix between concurrent scrapes. Checkouts prefer the
+    most recently returned client (its connections are still warm), create a new one
+    while the pool is below `size`, and otherwise wait for a return. Clients idle for
+    longer than `idle_timeout` are closed.
+
+    Checkout and return must happen on the scraper event loop; stats() may be read
+    from any thread.
+    """
+
+    def __init__(self, factory: Callable[[], httpx.AsyncClient], size: int = DEFAULT_POOL_SIZE,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.factory = factory
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    @staticmethod
+    def _normalize(domain: str) -> str:
+        return domain.lower().replace("www.", "")
+
+    def _pool(self, domain: str) -> _DomainPool:
+        pool = self._pools.get(domain)
+        if pool is None:
+            pool = self._pools[domain] = _DomainPool()
+        return pool
+
+    async def checkout(self, domain: str, timeout: Optional[float] = None) -> httpx.AsyncClient:
+        """Take a client for `domain`, waiting at most `timeout` seconds (asyncio.TimeoutError) for a free one"""
+        domain = self._normalize(domain)
+        self._start_sweeper()
+        with self._lock:
+            pool = self._pool(domain)
+            pool.checkouts += 1
+            self._evict_idle(pool, time.monotonic())
+            while pool.idle:
+                client, _ = pool.idle.pop()
+                if not client.is_closed:
+                    pool.in_use += 1
+                    pool.reused += 1
+                    return client
+                pool.created -= 1
+            if pool.created < self.size:
+                pool.created += 1
+                pool.in_use += 1
+                create = True
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                pool.waiters.append(waiter)
+                pool.waits += 1
+                create = False
+
+        if create:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    pool.created -= 1
+                    pool.in_use -= 1
+                raise
+
+        try:
+            # The returning request hands its client over and keeps it counted as in use
+            return await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            with self._lock:
+                if waiter.done() and not waiter.cancelled():
+                    # Handed over just as the wait ended: give it straight back
+                    self._return(pool, waiter.result())
+                else:
+                    waiter.cancel()
+                    pool.wait_timeouts += 1
+            raise
+
+    def checkin(self, domain: str, client: httpx.AsyncClient, discard: bool = False):
+        """
+        Return a checked-out client. `discard` closes it instead, for clients whose
+        connections or cookies should not be reused (e.g. after a bot check).
+        """
+        domain = self._normalize(domain)
+        with self._lock:
+            pool = self._pool(domain)
+            if discard or client.is_closed:
+                pool.in_use -= 1
+                pool.created -= 1
+                pool.discarded += 1
+                self._close(client)
+                if pool.created < self.size and pool.waiters:
+                    # Let the next waiter have a fresh client instead
+                    self._wake_with_new_client(pool)
+                return
+            self._return(pool, client)
+
+    def _return(self, pool: _DomainPool, client: httpx.AsyncClient):
+        while pool.waiters:
+            waiter = pool.waiters.popleft()
+            if not waiter.done():
+                pool.reused += 1
+                waiter.set_result(client)
+                return
+        pool.in_use -= 1
+        pool.idle.append((client, time.monotonic()))
+
+    def _wake_with_new_client(self, pool: _DomainPool):
+        while pool.waiters:
+            waiter = pool.waiters.popleft()
+            if not waiter.done():
+                try:
+                    client = self.factory()
+                except Exception as e:
+                    waiter.set_exception(e)
+                    return
+                pool.created += 1
+                pool.in_use += 1
+                waiter.set_result(client)
+                return
+
+    @asynccontextmanager
+    async def client(self, domain: str, timeout: Optional[float] = None):
+        """`async with pool.client(domain) as client:` checkout that always returns the client"""
+        client = await self.checkout(domain, timeout)
+        try:
+            yield client
+        finally:
+            self.checkin(domain, client)
+
+    def _evict_idle(self, pool: _DomainPool, now: float):
+        # Oldest returns are at the left
+        while pool.idle and now - pool.idle[0][1] > self.idle_timeout:
+            client, _ = pool.idle.popleft()
+            pool.created -= 1
+            pool.evicted += 1
+            self._close(client)
+
+    @staticmethod
+    def _close(client: httpx.AsyncClient):
+        if not client.is_closed:
+            asyncio.ensure_future(client.aclose())
+
+    def _start_sweeper(self):
+        """Close idle clients of marketplaces that see no more traffic"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.ensure_future(self._sweep())
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 2, 1.0))
+            with self._lock:
+                now = time.monotonic()
+                for pool in self._pools.values():
+                    self._evict_idle(pool, now)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                domain: {
+                    "size": self.size,
+                    "open_clients": pool.created,
+                    "in_use": pool.in_use,
+                    "idle": len(pool.idle),
+                    "waiting": sum(1 for waiter in pool.waiters if not waiter.done()),
+                    "checkouts": pool.checkouts,
+                    "reused": pool.reused,
+                    "reuse_rate": round(pool.reused / pool.checkouts, 3) if pool.checkouts else 0.0,
+                    "waits": pool.waits,
+                    "wait_timeouts": pool.wait_timeouts,
+                    "discarded": pool.discarded,
+                    "evicted_idle": pool.evicted,
+                }
+                for domain, pool in self._pools.items()
+            }
+
+
+def pool_settings_from_env() -> Dict:
+    """
+    Pool settings from the environment:
+      SCRAPER_CLIENTS_PER_DOMAIN    clients (= concurrent requests) per marketplace (default 8)
+      SCRAPER_CLIENT_IDLE_SECONDS   seconds before an idle client is closed (default 300)
+    """
+    try:
+        return {
+            "size": int(os.getenv("SCRAPER_CLIENTS_PER_DOMAIN", str(DEFAULT_POOL_SIZE))),
+            "idle_timeout": float(os.getenv("SCRAPER_CLIENT_IDLE_SECONDS", str(DEFAULT_IDLE_TIMEOUT))),
+        }
+    except ValueError as e:
+        print(f"Invalid client pool setting, using defaults: {e}")
+        return {"size": DEFAULT_POOL_SIZE, "idle_timeout": DEFAULT_IDLE_TIMEOUT}
@@ -0,0 +1,256 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+import httpx
+
+from utils.deadline import Deadline
+from utils.http import parse_retry_after
+
+# GEMINI_API_BASE points the app at a local stand-in (benchmarks/standin.py) instead of Google
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com").rstrip("/")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_GENERATE_URL = f"{GEMINI_API_BASE}/v1beta/models/{GEMINI_MODEL}:generateContent"
+GEMINI_STREAM_URL = f"{GEMINI_API_BASE}/v1beta/models/{GEMINI_MODEL}:streamGenerateContent?alt=sse"
+
+# Per-call timeout when the caller has no request deadline
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 2
+# Keep-alive connections kept open to the API, shared by every caller
+DEFAULT_MAX_CONNECTIONS = 10
+
+# Overload and transient server errors clear up; bad requests, bad keys and safety blocks do not
+_RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+_RETRY_BASE_DELAY = 0.5
+_RETRY_MAX_DELAY = 10.0
+# A retry is only made if at least this much of the deadline is left after the backoff
+_MIN_ATTEMPT_TIME = 2.0
+
+
+class GeminiError(Exception):
+    """A Gemini call failed; `retryable` tells whether trying again later may succeed"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def _error_for_response(response: httpx.Response) -> GeminiError:
+    return GeminiError(
+        f"Gemini API request failed with status code {response.status_code}: {response.text[:500]}",
+        status_code=response.status_code,
+        retryable=response.status_code in _RETRYABLE_STATUSES,
+        retry_after=parse_retry_after(response.headers.get("Retry-After")),
+    )
+
+
+def _error_for_exception(error: httpx.HTTPError) -> GeminiError:
+    # Timeouts and connection failures are retryable, protocol and decoding errors are not
+    retryable = isinstance(error, (httpx.TimeoutException, httpx.NetworkError))
+    return GeminiError(f"Gemini API request failed: {type(error).__name__}: {error}", retryable=retryable)
+
+
+def response_text(payload: Dict) -> str:
+    """Text of the first candidate of a generateContent response, "" when there is none"""
+    candidates = payload.get("candidates", [])
+    if candidates and "content" in candidates[0]:
+        parts = candidates[0]["content"].get("parts", [])
+        if parts:
+            return parts[0].get("text", "")
+    return ""
+
+
+class GeminiClient:
+    """
+    Shared client for the Gemini generateContent and streamGenerateContent APIs.
+
+    Calls reuse keep-alive connections from one pool instead of a new TLS handshake
+    each, send the key in the x-goog-api-key header rather than the URL, and never
+    wait past the caller's deadline (or `timeout` without one). Timeouts, connection
+    errors, 429s and 5xx are retried with exponential backoff while the deadline
+    allows; anything else raises GeminiError straight away.
+
+    generate() and stream() may be called from any thread.
+    """
+
+    def __init__(self, url: str = GEMINI_GENERATE_URL, timeout: float = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 stream_url: str = GEMINI_STREAM_URL):
+        self.url = url
+        self.stream_url = stream_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client = None
+        self._lock = threading.Lock()
+
+        self._calls = 0
+        self._retries = 0
+        self._failures = 0
+        self._total_time = 0.0
+        self._streams = 0
+        self._total_first_chunk = 0.0
+
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(limits=self.limits, timeout=self.timeout)
+            return self._client
+
+    @staticmethod
+    def _request(api_key: str, prompt: str) -> Dict:
+        return {
+            "headers": {"Content-Type": "application/json", "x-goog-api-key": api_key},
+            "json": {"contents": [{"parts": [{"text": prompt}]}]},
+        }
+
+    def _attempt_timeout(self, deadline: Optional[Deadline], timeout: Optional[float]) -> float:
+        cap = timeout or self.timeout
+        return deadline.timeout(cap) if deadline is not None else cap
+
+    def _retry_delay(self, attempt: int, error: GeminiError, deadline: Optional[Deadline]) -> Optional[float]:
+        """Backoff before retry number `attempt`, None when the error or the deadline rules a retry out"""
+        if not error.retryable or attempt > self.max_retries:
+            return None
+        if error.retry_after is not None:
+            delay = error.retry_after
+        else:
+            ceiling = _RETRY_BASE_DELAY * 2 ** (attempt - 1)
+            delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        if delay > _RETRY_MAX_DELAY:
+            return None
+        if deadline is not None and not deadline.has(delay + _MIN_ATTEMPT_TIME):
+            return None
+        return delay
+
+    def _record(self, started: float, failed: bool):
+        with self._lock:
+            self._calls += 1
+            self._total_time += time.monotonic() - started
+            if failed:
+                self._failures += 1
+
+    def _count_retry(self, error: GeminiError, delay: float):
+        with self._lock:
+            self._retries += 1
+        print(f"⚠️ {error}, retrying Gemini in {delay:.1f}s")
+
+    def generate(self, api_key: str, prompt: str, deadline: Optional[Deadline] = None,
+                 timeout: Optional[float] = None) -> str:
+        """Generated text for `prompt` (blocking); raises GeminiError"""
+        started = time.monotonic()
+        client = self._sync_client()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = client.post(self.url, timeout=self._attempt_timeout(deadline, timeout),
+                                       **self._request(api_key, prompt))
+                if response.status_code == 200:
+                    self._record(started, failed=False)
+                    return response_text(response.json())
+                error = _error_for_response(response)
+            except httpx.HTTPError as e:
+                error = _error_for_exception(e)
+            delay = self._retry_delay(attempt, error, deadline)
+            if delay is None:
+                self._record(started, failed=True)
+                raise error
+            self._count_retry(error, delay)
+            time.sleep(delay)
+
+    def stream(self, api_key: str, prompt: str, deadline: Optional[Deadline] = None,
+               timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Generated text for `prompt` in chunks as the model produces them (blocking
+        iterator, streamGenerateContent over server-sent events); raises GeminiError.
+        Failures are only retried before the first chunk, the caller may already have
+        acted on what it received. `timeout` bounds the whole stream, like a generate().
+        """
+        started = time.monotonic()
+        budget = Deadline(timeout or self.timeout)
+        if deadline is not None and deadline.expires_at < budget.expires_at:
+            budget = deadline
+        client = self._sync_client()
+        attempt = 0
+        received = False
+        while True:
+            attempt += 1
+            try:
+                with client.stream("POST", self.stream_url, timeout=budget.timeout(),
+                                   **self._request(api_key, prompt)) as response:
+                    if response.status_code != 200:
+                        response.read()
+                        raise _error_for_response(response)
+                    for line in response.iter_lines():
+                        if budget.expired():
+                            raise GeminiError("Gemini stream ran out of time", retryable=True)
+                        # Each event is one "data: <GenerateContentResponse JSON>" line
+                        if not line.startswith("data:"):
+                            continue
+                        try:
+                            text = response_text(json.loads(line[5:]))
+                        except ValueError as e:
+                            raise GeminiError(f"Malformed Gemini stream event: {e}")
+                        if text:
+                            if not received:
+                                received = True
+                                with self._lock:
+                                    self._streams += 1
+                                    self._total_first_chunk += time.monotonic() - started
+                            yield text
+                self._record(started, failed=False)
+                return
+            except httpx.HTTPError as e:
+                error = _error_for_exception(e)
+            except GeminiError as e:
+                error = e
+            delay = None if received else self._retry_delay(attempt, error, budget)
+            if delay is None:
+                self._record(started, failed=True)
+                raise error
+            self._count_retry(error, delay)
+            time.sleep(delay)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "url": self.url,
+                "calls": self._calls,
+                "retries": self._retries,
+                "failures": self._failures,
+                "avg_time": round(self._total_time / self._calls, 3) if self._calls else 0.0,
+                "streams": self._streams,
+                "avg_time_to_first_chunk": round(self._total_first_chunk / self._streams, 3) if self._streams else 0.0,
+            }
+
+
+def _client_from_env() -> GeminiClient:
+    """
+    Build the shared client from the environment:
+      GEMINI_API_BASE         API origin (default: Google; benchmarks point it at the stand-in)
+      GEMINI_MODEL            model name (default gemini-2.0-flash)
+      GEMINI_MAX_RETRIES      retries of retryable failures (default 2)
+      GEMINI_MAX_CONNECTIONS  pooled keep-alive connections (default 10)
+    """
+    try:
+        return GeminiClient(
+            max_retries=int(os.getenv("GEMINI_MAX_RETRIES", str(DEFAULT_MAX_RETRIES))),
+            max_connections=int(os.getenv("GEMINI_MAX_CONNECTIONS", str(DEFAULT_MAX_CONNECTIONS))),
+        )
+    except ValueError as e:
+        print(f"Invalid Gemini client setting, using defaults: {e}")
+        return GeminiClient()
+
+
+gemini_client = _client_from_env()
+
+
+def get_gemini_client_stats() -> Dict:
+    return gemini_client.stats()
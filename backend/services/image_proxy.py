@@ -0,0 +1,227 @@
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from services.amazon_scraper import _run_parser, run_coroutine
+from services.single_flight import SingleFlight
+from utils.disk_lru import DiskLRU
+
+# Amazon product images live under /images/I/<id>[._<size modifiers>_].<ext> on these hosts
+_IMAGE_HOSTS = frozenset({
+    "m.media-amazon.com",
+    "images-na.ssl-images-amazon.com",
+    "images-eu.ssl-images-amazon.com",
+    "images-fe.ssl-images-amazon.com",
+    "images-amazon.com",
+})
+_IMAGE_PATH = re.compile(r"^/images/I/([A-Za-z0-9+\-]{6,64})(?:\._[^/]*_)?\.(jpg|jpeg|png|gif|webp)$", re.IGNORECASE)
+# Proxy keys are "<image id>.<ext>", so a key can only ever name an Amazon product image
+_KEY = re.compile(r"^[A-Za-z0-9+\-]{6,64}\.(jpg|jpeg|png|gif|webp)$")
+_CONTENT_TYPES = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+_UPSTREAM = "https://m.media-amazon.com/images/I/{image_id}._AC_UL{width}_.{ext}"
+
+# Images are immutable per id, clients may keep them for a year
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Anything bigger is not a thumbnail
+_MAX_IMAGE_BYTES = 5 * 1024 * 1024
+_FETCH_TIMEOUT = 10.0
+
+
+class ImageNotFound(Exception):
+    """The key is not a product image, or Amazon does not have it"""
+
+
+def image_key(url: Optional[str]) -> Optional[str]:
+    """Proxy key for an Amazon product image URL, None for anything else (placeholders, other hosts)"""
+    if not url:
+        return None
+    parts = urlsplit(url)
+    if parts.hostname not in _IMAGE_HOSTS:
+        return None
+    match = _IMAGE_PATH.match(parts.path)
+    if not match:
+        return None
+    return f"{match.group(1)}.{match.group(2).lower()}"
+
+
+def is_image_key(key: str) -> bool:
+    return bool(_KEY.match(key))
+
+
+def proxied_image_url(url: Optional[str], base_url: str) -> Optional[str]:
+    """Absolute /api/image URL for an Amazon image, other URLs are returned unchanged"""
+    key = image_key(url)
+    return f"{base_url.rstrip('/')}/api/image/{key}" if key else url
+
+
+def rewrite_product_images(products: List[Dict], base_url: str):
+    """Point the "image" of formatted products at the image proxy, in place"""
+    for product in products:
+        product["image"] = proxied_image_url(product.get("image"), base_url)
+
+
+class ImageCache:
+    """Size-bounded disk cache of image bytes by proxy key, least recently used entries go first"""
+
+    def __init__(self, directory: str, max_bytes: int = 500 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._files = DiskLRU(directory, max_bytes)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        content = self._files.read(key)
+        with self._lock:
+            if content is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        self._files.touch(key)
+        return content
+
+    def contains(self, key: str) -> bool:
+        """Whether the image is cached, without reading it; counts as a use for eviction"""
+        if not self._files.contains(key):
+            return False
+        self._files.touch(key)
+        return True
+
+    def put(self, key: str, content: bytes):
+        self._files.write(key, content)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._files.evictions,
+                "size_bytes": self._files.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class ImageProxy:
+    """
+    Serves Amazon product images from the disk cache, fetching misses from the CDN at
+    thumbnail width on the scraper event loop. Concurrent misses for the same image
+    share one fetch.
+    """
+
+    def __init__(self, cache: ImageCache, width: int = 500):
+        self.cache = cache
+        self.width = width
+        self._flights = SingleFlight()
+        self._client = None  # created on the scraper event loop
+        self._lock = threading.Lock()
+        self._fetched = 0
+        self._fetched_bytes = 0
+        self._not_found = 0
+        self._errors = 0
+        self._not_modified = 0
+
+    @staticmethod
+    def content_type(key: str) -> str:
+        return _CONTENT_TYPES[key.rsplit(".", 1)[1].lower()]
+
+    def has(self, key: str) -> bool:
+        """Whether the image is in the disk cache"""
+        return self.cache.contains(key)
+
+    def get(self, key: str) -> bytes:
+        """Image bytes for a valid key; raises ImageNotFound, or httpx errors when the CDN fails"""
+        content = self.cache.get(key)
+        if content is not None:
+            return content
+        return run_coroutine(self._flights.do(key, lambda: self._download(key)), timeout=_FETCH_TIMEOUT + 5)
+
+    async def _download(self, key: str) -> bytes:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": "Mozilla/5.0 (compatible; EventuallyYoursImageProxy/1.0)", "Accept": "image/*"},
+                timeout=_FETCH_TIMEOUT,
+                follow_redirects=True,
+            )
+        image_id, ext = key.rsplit(".", 1)
+        try:
+            response = await self._client.get(_UPSTREAM.format(image_id=image_id, width=self.width, ext=ext))
+            if response.status_code in (403, 404):
+                raise ImageNotFound(key)
+            response.raise_for_status()
+            content = response.content
+            if not response.headers.get("Content-Type", "").startswith("image/") or len(content) > _MAX_IMAGE_BYTES:
+                raise ImageNotFound(key)
+        except ImageNotFound:
+            with self._lock:
+                self._not_found += 1
+            raise
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+
+        try:
+            # Disk writes and eviction stay off the event loop
+            await _run_parser(self.cache.put, key, content)
+        except OSError as e:
+            print(f"Failed to cache image {key}: {e}")
+        with self._lock:
+            self._fetched += 1
+            self._fetched_bytes += len(content)
+        return content
+
+    def record_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {
+                "width": self.width,
+                "fetched": self._fetched,
+                "fetched_bytes": self._fetched_bytes,
+                "not_modified": self._not_modified,
+                "not_found": self._not_found,
+                "errors": self._errors,
+            }
+        stats["cache"] = self.cache.stats()
+        stats["fetches"] = self._flights.stats()
+        return stats
+
+
+def _proxy_from_env() -> Optional[ImageProxy]:
+    """
+    Build the shared image proxy from the environment:
+      IMAGE_PROXY_ENABLED    "false" keeps Amazon image URLs in responses
+      IMAGE_CACHE_DIR        directory for cached images (default: system temp dir)
+      IMAGE_CACHE_MAX_MB     size bound before LRU eviction (default 500)
+      IMAGE_PROXY_WIDTH      width images are fetched at (default 500)
+    """
+    if os.getenv("IMAGE_PROXY_ENABLED", "true").lower() == "false":
+        return None
+    directory = os.getenv("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "eventually-yours", "images"))
+    try:
+        return ImageProxy(
+            ImageCache(directory, max_bytes=int(float(os.getenv("IMAGE_CACHE_MAX_MB", "500")) * 1024 * 1024)),
+            width=int(os.getenv("IMAGE_PROXY_WIDTH", "500")),
+        )
+    except (OSError, ValueError) as e:
+        print(f"Image proxy disabled: {e}")
+        return None
+
+
+image_proxy = _proxy_from_env()
+
+
+def get_image_proxy_stats() -> Dict:
+    if image_proxy is None:
+        return {"enabled": False}
+    return {"enabled": True, **image_proxy.stats()}
@@ -0,0 +1,225 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # zlib keeps the cache working without the optional dependency
+    zstandard = None
+
+from utils.disk_lru import DiskLRU
+
+# Entry layout: magic, codec, dictionary id, created timestamp, compressed body
+_MAGIC = b"EYPC"
+_HEADER = struct.Struct("<4scId")
+_CODEC_ZSTD = b"s"
+_CODEC_ZLIB = b"z"
+_DICTIONARY_FILE = "dictionary.zdict"
+
+
+class SearchPageCache:
+    """Content-addressed, size-bounded disk cache for raw Amazon search result pages"""
+
+    def __init__(self, directory: str, ttl: float = 900, max_bytes: int = 200 * 1024 * 1024, level: int = 6):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.level = level
+        self._files = DiskLRU(directory, max_bytes, suffix=".page")
+        self._lock = threading.Lock()
+        # zstd (de)compressor objects must not be used from two threads at once
+        self._codec_lock = threading.Lock()
+        self._dictionary = None
+        self._compressor = None
+        self._decompressor = None
+
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._raw_bytes = 0
+        self._stored_bytes = 0
+
+        self._load_dictionary()
+
+    @staticmethod
+    def make_key(domain: str, query: str, sort: str, price_filter: str) -> str:
+        """Hash of the normalized request that produced the page"""
+        normalized = "\x1f".join([
+            domain.lower().replace("www.", ""),
+            " ".join(query.lower().split()),
+            sort,
+            price_filter,
+        ])
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _load_dictionary(self):
+        self._dictionary = None
+        if zstandard is not None:
+            path = os.path.join(self.directory, _DICTIONARY_FILE)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    self._dictionary = zstandard.ZstdCompressionDict(f.read())
+            self._compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self._dictionary)
+            self._decompressor = zstandard.ZstdDecompressor(dict_data=self._dictionary)
+
+    def _dictionary_id(self) -> int:
+        return self._dictionary.dict_id() if self._dictionary is not None else 0
+
+    def _compress(self, content: bytes) -> bytes:
+        if zstandard is not None:
+            with self._codec_lock:
+                header = _HEADER.pack(_MAGIC, _CODEC_ZSTD, self._dictionary_id(), time.time())
+                return header + self._compressor.compress(content)
+        return _HEADER.pack(_MAGIC, _CODEC_ZLIB, 0, time.time()) + zlib.compress(content, self.level)
+
+    def _decompress(self, codec: bytes, dict_id: int, body: bytes) -> Optional[bytes]:
+        if codec == _CODEC_ZLIB:
+            return zlib.decompress(body)
+        if codec == _CODEC_ZSTD and zstandard is not None and dict_id == self._dictionary_id():
+            with self._codec_lock:
+                return self._decompressor.decompress(body)
+        # Written with another dictionary or codec, treat as a miss
+        return None
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[bytes]:
+        """Return the cached page, or None if absent or older than the TTL (unless allow_stale)"""
+        data = self._files.read(key)
+        if data is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        try:
+            magic, codec, dict_id, created = _HEADER.unpack_from(data)
+            if magic != _MAGIC:
+                raise ValueError("not a cache entry")
+            fresh = time.time() - created <= self.ttl
+            content = self._decompress(codec, dict_id, data[_HEADER.size:]) if fresh or allow_stale else None
+        except Exception as e:
+            print(f"Discarding unreadable cache entry {key}: {e}")
+            self._files.remove(self._files.path(key))
+            content = None
+
+        with self._lock:
+            if content is None:
+                self._misses += 1
+                return None
+            if fresh:
+                self._hits += 1
+            else:
+                self._stale_hits += 1
+        self._files.touch(key)
+        return content
+
+    def age(self, key: str) -> Optional[float]:
+        """Seconds since the entry was stored, None if there is none (reads only the header)"""
+        try:
+            with open(self._files.path(key), "rb") as f:
+                magic, _, _, created = _HEADER.unpack(f.read(_HEADER.size))
+        except (OSError, struct.error):
+            return None
+        return time.time() - created if magic == _MAGIC else None
+
+    def put(self, key: str, content: bytes):
+        """Compress and store a page, evicting least recently used entries over max_bytes"""
+        entry = self._compress(content)
+        self._files.write(key, entry)
+        with self._lock:
+            self._raw_bytes += len(content)
+            self._stored_bytes += len(entry)
+
+    def train_dictionary(self, dict_size: int = 112 * 1024, max_samples: int = 500) -> bool:
+        """
+        Train a zstd dictionary on the pages currently in the cache and use it for
+        new entries. Entries written with an older dictionary read as misses.
+        """
+        if zstandard is None:
+            print("zstandard is not installed, dictionary training skipped")
+            return False
+
+        samples = []
+        for path in self._files.entry_paths()[:max_samples]:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, codec, dict_id, _ = _HEADER.unpack_from(data)
+            content = self._decompress(codec, dict_id, data[_HEADER.size:]) if magic == _MAGIC else None
+            if content:
+                samples.append(content)
+        if len(samples) < 8:
+            print(f"Not enough cached pages to train a dictionary ({len(samples)} found)")
+            return False
+
+        dictionary = zstandard.train_dictionary(dict_size, samples)
+        with open(os.path.join(self.directory, _DICTIONARY_FILE), "wb") as f:
+            f.write(dictionary.as_bytes())
+        with self._codec_lock:
+            self._load_dictionary()
+        print(f"Trained search page dictionary {dictionary.dict_id()} on {len(samples)} pages")
+        return True
+
+    def clear(self):
+        self._files.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._stale_hits + self._misses
+            return {
+                "codec": "zstd" if zstandard is not None else "zlib",
+                "dictionary_id": self._dictionary_id(),
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._files.evictions,
+                "size_bytes": self._files.total_bytes,
+                "max_bytes": self.max_bytes,
+                "compression_ratio": round(self._raw_bytes / self._stored_bytes, 2) if self._stored_bytes else 0.0,
+            }
+
+
+def _cache_from_env() -> Optional[SearchPageCache]:
+    """
+    Build the shared cache from the environment:
+      SEARCH_CACHE_ENABLED  "false" disables caching
+      SEARCH_CACHE_DIR      directory for entries (default: system temp dir)
+      SEARCH_CACHE_TTL      seconds an entry stays fresh (default 900)
+      SEARCH_CACHE_MAX_MB   size bound before LRU eviction (default 200)
+    """
+    if os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "false":
+        return None
+    directory = os.getenv(
+        "SEARCH_CACHE_DIR", os.path.join(tempfile.gettempdir(), "eventually-yours", "search-pages")
+    )
+    try:
+        return SearchPageCache(
+            directory,
+            ttl=float(os.getenv("SEARCH_CACHE_TTL", "900")),
+            max_bytes=int(float(os.getenv("SEARCH_CACHE_MAX_MB", "200")) * 1024 * 1024),
+        )
+    except (OSError, ValueError) as e:
+        print(f"Search page cache disabled: {e}")
+        return None
+
+
+search_page_cache = _cache_from_env()
+
+
+def get_search_cache_stats() -> Dict:
+    if search_page_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **search_page_cache.stats()}
+
+
+if __name__ == "__main__":
+    # Train a compression dictionary from the pages cached so far:
+    #   python -m services.page_cache
+    if search_page_cache is None:
+        print("Search page cache is disabled")
+    else:
+        search_page_cache.train_dictionary()
+        print(search_page_cache.stats())
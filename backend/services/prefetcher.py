@@ -0,0 +1,267 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from services.amazon_scraper import _search_query_and_filter, async_amazon_category_top_products, submit_coroutine
+from services.circuit_breaker import CLOSED, circuit_breakers
+from services.improved_categories import PRODUCT_CATEGORIES
+from services.page_cache import SearchPageCache, search_page_cache
+from services.rate_limiter import rate_limiter
+from services.scrape_scheduler import BACKGROUND, scrape_scheduler
+from utils.deadline import Deadline
+
+# Marketplace whose seed categories are kept warm before any request has been seen
+DEFAULT_MARKETPLACE = "amazon.com"
+# Popularity of a search halves every this many seconds without requests
+DEFAULT_HALF_LIFE = 3600.0
+# Searches tracked at once; the least popular are forgotten first
+_MAX_TRACKED = 1000
+# Time allowed for one prefetch scrape
+_PREFETCH_BUDGET = 30.0
+# Seconds to wait for spare capacity before moving on to the next marketplace
+_MAX_IDLE_WAIT = 30.0
+
+
+class PopularityTracker:
+    """Exponentially decaying request counts per search, fed by interactive category requests"""
+
+    def __init__(self, half_life: float = DEFAULT_HALF_LIFE):
+        self.half_life = half_life
+        # (domain, category, budget_range, preferred_brands) -> (score, updated_at)
+        self._scores = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(domain: str, category: str, budget_range: Optional[str], preferred_brands: Optional[str]) -> Tuple:
+        return (
+            domain.lower().replace("www.", ""),
+            " ".join(category.split()),
+            (budget_range or "").strip(),
+            (preferred_brands or "").strip(),
+        )
+
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        return score * 0.5 ** ((now - updated_at) / self.half_life)
+
+    def record(self, domain: str, category: str, budget_range: Optional[str] = None, preferred_brands: Optional[str] = None):
+        key = self._key(domain, category, budget_range, preferred_brands)
+        now = time.time()
+        with self._lock:
+            score, updated_at = self._scores.get(key, (0.0, now))
+            self._scores[key] = (self._decayed(score, updated_at, now) + 1, now)
+            if len(self._scores) > _MAX_TRACKED:
+                coldest = min(self._scores, key=lambda k: self._decayed(*self._scores[k], now))
+                del self._scores[coldest]
+
+    def ranked(self) -> Dict[str, List[Tuple[float, Tuple]]]:
+        """Tracked searches per marketplace, most popular first"""
+        now = time.time()
+        with self._lock:
+            scores = [(self._decayed(score, updated_at, now), key) for key, (score, updated_at) in self._scores.items()]
+        by_domain = {}
+        for score, key in sorted(scores, key=lambda item: item[0], reverse=True):
+            by_domain.setdefault(key[0], []).append((score, key))
+        return by_domain
+
+
+class Prefetcher:
+    """
+    Keeps the search pages of the most requested categories fresh in the search page
+    cache so first requests hit warm data.
+
+    Each cycle ranks, per marketplace, the searches seen in recent requests (decayed
+    popularity) followed by the PRODUCT_CATEGORIES seed list, and re-scrapes the top
+    `top_n` whose cached page is missing or past `refresh_after` of the cache TTL.
+    Prefetches run as background scheduler jobs, one at a time, and only while the
+    marketplace is idle: nothing in flight or queued, a full rate-limit bucket and a
+    closed circuit breaker, so an interactive request never queues behind them.
+    """
+
+    def __init__(
+        self,
+        tracker: PopularityTracker,
+        cache: SearchPageCache,
+        top_n: int = 20,
+        interval: float = 120.0,
+        refresh_after: float = 0.75,
+    ):
+        self.tracker = tracker
+        self.cache = cache
+        self.top_n = top_n
+        self.interval = interval
+        self.refresh_after = refresh_after
+        self._future = None
+        self._lock = threading.Lock()
+
+        self._cycles = 0
+        self._prefetched = 0
+        self._fresh = 0
+        self._busy = 0
+        self._failed = 0
+
+    def plan(self) -> List[Tuple]:
+        """(domain, category, budget_range, preferred_brands) to keep warm, most popular first per marketplace"""
+        ranked = self.tracker.ranked()
+        ranked.setdefault(DEFAULT_MARKETPLACE, [])
+        plan = []
+        for domain, entries in ranked.items():
+            searches = [key for _, key in entries[:self.top_n]]
+            seen = {key[1].lower() for key in searches}
+            for category in PRODUCT_CATEGORIES:
+                if len(searches) >= self.top_n:
+                    break
+                if category.lower() not in seen:
+                    searches.append((domain, category, "", ""))
+            plan.extend(searches)
+        return plan
+
+    def _is_fresh(self, domain: str, category: str, budget_range: str, preferred_brands: str) -> bool:
+        search_query, price_filter = _search_query_and_filter(category, budget_range or None, preferred_brands or None)
+        # The first strategy's page is the one every request reads
+        age = self.cache.age(SearchPageCache.make_key(domain, search_query, "best-sellers", price_filter))
+        return age is not None and age < self.cache.ttl * self.refresh_after
+
+    @staticmethod
+    def _has_spare_capacity(domain: str) -> bool:
+        bucket = rate_limiter.bucket(domain)
+        return (
+            scrape_scheduler.idle(domain)
+            and bucket.available() >= bucket.burst
+            and circuit_breakers.breaker(domain).state == CLOSED
+        )
+
+    async def _wait_for_spare_capacity(self, domain: str) -> bool:
+        waited = 0.0
+        while not self._has_spare_capacity(domain):
+            if waited >= _MAX_IDLE_WAIT:
+                return False
+            await asyncio.sleep(1.0)
+            waited += 1.0
+        return True
+
+    async def run_cycle(self):
+        busy_domains = set()
+        for domain, category, budget_range, preferred_brands in self.plan():
+            if domain in busy_domains:
+                continue
+            if self._is_fresh(domain, category, budget_range, preferred_brands):
+                with self._lock:
+                    self._fresh += 1
+                continue
+            if not await self._wait_for_spare_capacity(domain):
+                # Interactive traffic has this marketplace busy, try again next cycle
+                busy_domains.add(domain)
+                with self._lock:
+                    self._busy += 1
+                continue
+
+            products = await scrape_scheduler.run(
+                async_amazon_category_top_products(
+                    category, domain, num_results=3, budget_range=budget_range or None,
+                    preferred_brands=preferred_brands or None, hedge_width=1,
+                    deadline=Deadline(_PREFETCH_BUDGET),
+                ),
+                f"prefetch:{domain}",
+                BACKGROUND,
+            )
+            with self._lock:
+                if products:
+                    self._prefetched += 1
+                else:
+                    self._failed += 1
+        with self._lock:
+            self._cycles += 1
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.run_cycle()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Prefetch cycle failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start prefetching on the scraper event loop (idempotent)"""
+        with self._lock:
+            if self._future is None or self._future.done():
+                self._future = submit_coroutine(self._run_forever())
+                print(f"🔥 Prefetching the top {self.top_n} categories per marketplace every {self.interval:.0f}s")
+
+    def stop(self):
+        with self._lock:
+            if self._future is not None:
+                self._future.cancel()
+                self._future = None
+
+    def stats(self) -> Dict:
+        ranked = self.tracker.ranked()
+        with self._lock:
+            return {
+                "running": self._future is not None and not self._future.done(),
+                "cycles": self._cycles,
+                "prefetched": self._prefetched,
+                "already_fresh": self._fresh,
+                "skipped_busy": self._busy,
+                "failed": self._failed,
+                "popular": {
+                    domain: [{"category": key[1], "budget_range": key[2], "score": round(score, 2)} for score, key in entries[:10]]
+                    for domain, entries in ranked.items()
+                },
+            }
+
+
+def _half_life_from_env() -> float:
+    try:
+        return float(os.getenv("PREFETCH_HALF_LIFE", str(DEFAULT_HALF_LIFE)))
+    except ValueError as e:
+        print(f"Invalid PREFETCH_HALF_LIFE, using the default: {e}")
+        return DEFAULT_HALF_LIFE
+
+
+popularity = PopularityTracker(_half_life_from_env())
+
+
+def _prefetcher_from_env() -> Optional[Prefetcher]:
+    """
+    Build the shared prefetcher from the environment:
+      PREFETCH_ENABLED        "true" enables prefetching (off by default, it also needs the search page cache)
+      PREFETCH_TOP_N          searches kept warm per marketplace (default 20)
+      PREFETCH_INTERVAL       seconds between prefetch cycles (default 120)
+      PREFETCH_HALF_LIFE      seconds for a search's popularity to halve (default 3600)
+    """
+    if os.getenv("PREFETCH_ENABLED", "false").lower() != "true" or search_page_cache is None:
+        return None
+    try:
+        return Prefetcher(
+            popularity,
+            search_page_cache,
+            top_n=int(os.getenv("PREFETCH_TOP_N", "20")),
+            interval=float(os.getenv("PREFETCH_INTERVAL", "120")),
+        )
+    except ValueError as e:
+        print(f"Invalid prefetch setting, prefetching disabled: {e}")
+        return None
+
+
+prefetcher = _prefetcher_from_env()
+
+
+def record_category_request(domain: str, category: str, budget_range: Optional[str] = None, preferred_brands: Optional[str] = None):
+    """Count an interactive category scrape towards its search's popularity"""
+    popularity.record(domain, category, budget_range, preferred_brands)
+
+
+def start_prefetcher():
+    """Start background prefetching when enabled; called by the server entry points, never on import"""
+    if prefetcher is not None:
+        prefetcher.start()
+
+
+def get_prefetch_stats() -> Dict:
+    if prefetcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **prefetcher.stats()}
@@ -0,0 +1,154 @@
+import re
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+# First number in a price string: digit groups joined by . , ' or (narrow) no-break/regular spaces
+_NUMBER_PATTERN = re.compile(r"\d(?:[\d.,'\u00a0\u202f ]*\d)?")
+_GROUPING_CHARACTERS = str.maketrans("", "", ".,'\u00a0\u202f ")
+# Longer digit runs are not prices (order numbers, concatenated junk)
+_MAX_DIGITS = 15
+
+
+class MarketplaceFormat:
+    """How one Amazon marketplace writes prices"""
+
+    __slots__ = ("currency", "decimal", "exponent")
+
+    def __init__(self, currency: str, decimal: str = ".", exponent: int = 2):
+        self.currency = currency
+        self.decimal = decimal
+        # Digits after the decimal separator, i.e. minor units per major unit = 10 ** exponent
+        self.exponent = exponent
+
+
+_DEFAULT_FORMAT = MarketplaceFormat("USD")
+
+MARKETPLACE_FORMATS = {
+    "amazon.com": _DEFAULT_FORMAT,
+    "amazon.ca": MarketplaceFormat("CAD"),
+    "amazon.co.uk": MarketplaceFormat("GBP"),
+    "amazon.de": MarketplaceFormat("EUR", decimal=","),
+    "amazon.fr": MarketplaceFormat("EUR", decimal=","),
+    "amazon.it": MarketplaceFormat("EUR", decimal=","),
+    "amazon.es": MarketplaceFormat("EUR", decimal=","),
+    "amazon.nl": MarketplaceFormat("EUR", decimal=","),
+    "amazon.co.jp": MarketplaceFormat("JPY", exponent=0),
+    "amazon.com.au": MarketplaceFormat("AUD"),
+    "amazon.com.br": MarketplaceFormat("BRL", decimal=","),
+    "amazon.in": MarketplaceFormat("INR"),
+    "amazon.cn": MarketplaceFormat("CNY"),
+    "amazon.com.mx": MarketplaceFormat("MXN"),
+}
+
+
+class PriceParser:
+    """
+    Price text to integer minor units for one marketplace.
+
+    The last "." or "," is the decimal separator when it is followed by 1-2 digits and is
+    either the marketplace's separator, preceded by the other separator ("1.234,56",
+    "1,234.56"), or the only separator with exactly two digits after it ("9,99" on a "."
+    marketplace). Every other separator is digit grouping, so "1.234" on amazon.de is 1234.
+    """
+
+    def __init__(self, fmt: MarketplaceFormat):
+        self.format = fmt
+        self.exponent = fmt.exponent
+        self._scale = 10 ** fmt.exponent
+        self._decimal = fmt.decimal
+        # Minor units per unit of a 1 or 2 digit fraction; fractions finer than the currency's are dropped
+        self._fraction_scale = (0, 10 ** (fmt.exponent - 1) if fmt.exponent >= 1 else 0, 10 ** (fmt.exponent - 2) if fmt.exponent >= 2 else 0)
+
+    def _token_to_minor(self, token: str) -> Optional[int]:
+        if token.isdigit():
+            return int(token) * self._scale if len(token) <= _MAX_DIGITS else None
+
+        fraction = 0
+        decimal_at = max(token.rfind("."), token.rfind(","))
+        tail_length = len(token) - decimal_at - 1
+        if decimal_at != -1 and tail_length <= 2:
+            separator = token[decimal_at]
+            if (
+                separator == self._decimal
+                or token.find("," if separator == "." else ".", 0, decimal_at) != -1
+                or (tail_length == 2 and token.find(separator, 0, decimal_at) == -1)
+            ):
+                tail = token[decimal_at + 1:]
+                if tail.isdigit():
+                    fraction = int(tail) * self._fraction_scale[tail_length]
+                    token = token[:decimal_at]
+
+        digits = token.translate(_GROUPING_CHARACTERS)
+        if not digits or len(digits) > _MAX_DIGITS:
+            return None
+        return int(digits) * self._scale + fraction
+
+    def parse(self, text: Optional[str]) -> Optional[int]:
+        """Minor units of the first price in `text` (the low end of a range), None if there is none"""
+        if not text:
+            return None
+        match = _NUMBER_PATTERN.search(text)
+        return self._token_to_minor(match.group()) if match else None
+
+    def parse_many(self, texts: Iterable[Optional[str]]) -> List[Optional[int]]:
+        """parse() over a whole page of price strings"""
+        search = _NUMBER_PATTERN.search
+        to_minor = self._token_to_minor
+        results = []
+        append = results.append
+        for text in texts:
+            match = search(text) if text else None
+            append(to_minor(match.group()) if match else None)
+        return results
+
+    def to_major(self, minor: Optional[int]) -> Optional[float]:
+        return minor / self._scale if minor is not None else None
+
+    def parse_budget(self, budget_range: Optional[str]) -> Optional[Tuple[int, int]]:
+        """
+        "low-high" budget (as stored from the profile form, currency symbols allowed) to
+        (low, high) in minor units, None if it cannot be read.
+        """
+        if not budget_range or "-" not in budget_range:
+            return None
+        bounds = []
+        for side in budget_range.split("-", 1):
+            side = side.strip()
+            match = _NUMBER_PATTERN.search(side)
+            if not match:
+                return None
+            try:
+                # Form values are machine formatted ("1000.5"), not marketplace formatted
+                bounds.append(int(round(float(match.group()) * self._scale)))
+            except ValueError:
+                bounds.append(self._token_to_minor(match.group()))
+        if None in bounds:
+            return None
+        low, high = bounds
+        return (low, high) if low <= high else (high, low)
+
+
+def filter_by_budget(prices: List[Optional[int]], budget: Optional[Tuple[int, int]]) -> List[bool]:
+    """Budget mask over minor-unit prices; unknown prices and a missing budget always pass"""
+    if budget is None:
+        return [True] * len(prices)
+    low, high = budget
+    return [price is None or low <= price <= high for price in prices]
+
+
+_parsers = {}
+_parsers_lock = threading.Lock()
+
+
+def get_price_parser(domain: Optional[str] = None) -> PriceParser:
+    """Shared parser for a marketplace domain ("www." optional), built on first use"""
+    key = (domain or "amazon.com").lower().replace("www.", "")
+    parser = _parsers.get(key)
+    if parser is None:
+        with _parsers_lock:
+            parser = _parsers.get(key)
+            if parser is None:
+                parser = PriceParser(MARKETPLACE_FORMATS.get(key, _DEFAULT_FORMAT))
+                _parsers[key] = parser
+    return parser
+
@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional, Tuple
+from utils.asin import canonical_asin, canonical_product_url
+
+
+def to_minor_units(value: Optional[float], exponent: int = 2) -> Optional[int]:
+    """Convert a decimal price to integer minor units (cents, pence, ...; yen have exponent 0)"""
+    if value is None:
+        return None
+    return int(round(value * 10 ** exponent))
+
+
+class Product:
+    """Compact record for one Amazon product as it moves from the scraper to the API response"""
+
+    __slots__ = ("asin", "url", "title", "price_text", "price_minor", "price_exponent", "rating", "image_url")
+
+    # Fields that identify and describe the product, as opposed to its current price
+    STATIC_FIELDS = ("asin", "url", "title", "rating", "image_url")
+
+    def __init__(
+        self,
+        url: str,
+        title: Optional[str],
+        price_text: Optional[str] = None,
+        price_minor: Optional[int] = None,
+        rating: Optional[float] = None,
+        image_url: Optional[str] = None,
+        asin: Optional[str] = None,
+        price_exponent: int = 2,
+    ):
+        self.asin = asin
+        self.url = url
+        self.title = title
+        self.price_text = price_text
+        self.price_minor = price_minor
+        # Minor units per major unit is 10 ** price_exponent (2 for cents, 0 for yen)
+        self.price_exponent = price_exponent
+        self.rating = rating
+        self.image_url = image_url
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Product":
+        """Build a Product from the legacy dict shape (scraper output or sample products)"""
+        return cls(
+            url=data.get("url", ""),
+            title=data.get("title"),
+            price_text=data.get("price") if isinstance(data.get("price"), str) else None,
+            price_minor=to_minor_units(data.get("price_value")),
+            rating=data.get("average_rating", data.get("rating")),
+            image_url=data.get("image_url"),
+            asin=data.get("asin"),
+        )
+
+    @property
+    def price_value(self) -> Optional[float]:
+        return self.price_minor / 10 ** self.price_exponent if self.price_minor is not None else None
+
+    def copy(self) -> "Product":
+        return Product(
+            self.url, self.title, self.price_text, self.price_minor, self.rating, self.image_url, self.asin,
+            self.price_exponent,
+        )
+
+    def clamped_rating(self) -> float:
+        """Rating limited to the 0-5 star range, 0 when unknown"""
+        if self.rating is None:
+            return 0
+        return min(max(float(self.rating), 0), 5)
+
+    def to_prompt(self) -> Dict:
+        """Shape sent to Gemini in the ranking prompt"""
+        return {
+            "url": self.url,
+            "title": self.title,
+            "image_url": self.image_url,
+            "price": self.price_text,
+            "price_value": self.price_value,
+            "average_rating": self.rating,
+        }
+
+    def to_api(self, product_id: str, currency: str, category: str, reasoning: str, rating: Optional[float] = None) -> Dict:
+        """Shape returned to the frontend"""
+        return {
+            "id": product_id,
+            "name": self.title,
+            "price": self.price_value or 0,
+            "currency": currency,
+            "image": self.image_url or "/placeholder.svg",
+            "buyUrl": self.url or "",
+            "category": category,
+            "rating": self.clamped_rating() if rating is None else rating,
+            "reasoning": reasoning,
+        }
+
+    def __repr__(self) -> str:
+        return f"Product(asin={self.asin!r}, title={self.title!r}, price_minor={self.price_minor!r})"
+
+
+def dedupe_key(product: Product) -> str:
+    """Identity dedupe_products() goes by: the ASIN, or the canonical URL when there is none"""
+    return product.asin or canonical_asin(product.url) or canonical_product_url(product.url)
+
+
+def dedupe_products(products: List[Product]) -> Tuple[List[Product], int]:
+    """
+    Drop repeat listings of the same product across strategies and categories,
+    keyed by ASIN (canonical URL when there is none). The first listing is kept
+    and fields it lacks are filled from the duplicates.
+    Returns (unique products in original order, number removed).
+    """
+    unique = {}
+    removed = 0
+    for product in products:
+        key = dedupe_key(product)
+        kept = unique.get(key)
+        if kept is None:
+            if not product.asin:
+                product.asin = canonical_asin(product.url)
+            unique[key] = product
+            continue
+        removed += 1
+        for field in Product.__slots__:
+            if getattr(kept, field) is None and getattr(product, field) is not None:
+                setattr(kept, field, getattr(product, field))
+    return list(unique.values()), removed
@@ -0,0 +1,144 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from services.product import Product
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class _Entry:
+    __slots__ = ("product", "size", "price_at", "static_at")
+
+    def __init__(self, product: Product, size: int, price_at: float, static_at: float):
+        self.product = product
+        self.size = size
+        self.price_at = price_at
+        self.static_at = static_at
+
+
+def _estimate_size(key: Tuple[str, str], product: Product) -> int:
+    """Approximate retained bytes of an entry: the record, its key and its field values"""
+    size = sys.getsizeof(product) + sum(sys.getsizeof(part) for part in key)
+    for field in Product.__slots__:
+        size += sys.getsizeof(getattr(product, field))
+    return size
+
+
+class ProductCache:
+    """
+    In-process LRU of scraped product details keyed by (marketplace, ASIN).
+
+    Prices and static fields (title, image, rating) have separate TTLs. Entries
+    past either TTL are still returned, flagged stale, so the caller can serve
+    them immediately and refresh in the background.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, price_ttl: float = 900, static_ttl: float = 86400):
+        self.max_bytes = max_bytes
+        self.price_ttl = price_ttl
+        self.static_ttl = static_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._refreshes = 0
+        self._failed_refreshes = 0
+
+    @staticmethod
+    def _key(domain: str, asin: str) -> Tuple[str, str]:
+        return domain.lower().replace("www.", ""), asin.upper()
+
+    def get(self, domain: str, asin: str) -> Tuple[Optional[Product], str]:
+        """Return (copy of product, FRESH | STALE | MISS)"""
+        key = self._key(domain, asin)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None, MISS
+            self._entries.move_to_end(key)
+            if now - entry.price_at <= self.price_ttl and now - entry.static_at <= self.static_ttl:
+                self._hits += 1
+                state = FRESH
+            else:
+                self._stale_hits += 1
+                state = STALE
+            return entry.product.copy(), state
+
+    def put(self, domain: str, asin: str, product: Product):
+        """Store a freshly scraped product, keeping previous static fields the new scrape missed"""
+        key = self._key(domain, asin)
+        now = time.time()
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            merged = product.copy()
+            static_at = now
+            if previous is not None:
+                self._bytes -= previous.size
+                missing = [
+                    field for field in Product.STATIC_FIELDS
+                    if getattr(merged, field) is None and getattr(previous.product, field) is not None
+                ]
+                for field in missing:
+                    setattr(merged, field, getattr(previous.product, field))
+                if missing:
+                    # Static fields were only partially refreshed
+                    static_at = previous.static_at
+
+            entry = _Entry(merged, _estimate_size(key, merged), now, static_at)
+            self._entries[key] = entry
+            self._bytes += entry.size
+
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._evictions += 1
+
+    def record_refresh(self, succeeded: bool):
+        with self._lock:
+            self._refreshes += 1
+            if not succeeded:
+                self._failed_refreshes += 1
+
+    def invalidate(self, domain: str, asin: str):
+        with self._lock:
+            entry = self._entries.pop(self._key(domain, asin), None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._stale_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._stale_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "background_refreshes": self._refreshes,
+                "failed_refreshes": self._failed_refreshes,
+            }
+
+
+product_cache = ProductCache(
+    max_bytes=int(float(os.getenv("PRODUCT_CACHE_MAX_MB", "32")) * 1024 * 1024),
+    price_ttl=float(os.getenv("PRODUCT_CACHE_PRICE_TTL", "900")),
+    static_ttl=float(os.getenv("PRODUCT_CACHE_STATIC_TTL", "86400")),
+)
+
+
+def get_product_cache_stats() -> Dict:
+    return product_cache.stats()
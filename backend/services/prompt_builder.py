@@ -1,5 +1,10 @@
 import requests
 import os
+from services.category_cache import category_cache, category_cache_key
+from services.gemini_client import gemini_client
+
+# Used when the caller has no request deadline; the call used to have no timeout at all
+GEMINI_TIMEOUT = 30
 
 
 def construct_prompt(user_input, user_location, profile_details):
@@ -32,40 +37,81 @@ def construct_prompt(user_input, user_location, profile_details):
     return prompt
 
 
-def get_gemini_categories(api_key, prompt):
+def _category_from_line(line):
+    return line.strip("0123456789. \t-")
+
+
+def get_gemini_categories(api_key, prompt, deadline=None):
     print("Constructed prompt:\n")
     print(prompt)
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-    headers = {"Content-Type": "application/json"}
-
-    data = {"contents": [{"parts": [{"text": prompt}]}]}
-
-    response = requests.post(url, headers=headers, json=data)
-    response.raise_for_status()
-    response_json = response.json()
-    candidates = response_json.get("candidates", [])
-    if candidates and "content" in candidates[0]:
-        parts = candidates[0]["content"].get("parts", [])
-        if parts:
-            text = parts[0].get("text", "")
-            categories = [
-                line.strip("0123456789. \t-")
-                for line in text.splitlines()
-                if line.strip()
-            ]
-            print("Generated categories:")
-            for category in categories:
-                print(category)
-            return categories
-    return []
+    text = gemini_client.generate(api_key, prompt, deadline=deadline, timeout=GEMINI_TIMEOUT)
+    categories = [
+        _category_from_line(line)
+        for line in text.splitlines()
+        if line.strip()
+    ]
+    if categories:
+        print("Generated categories:")
+        for category in categories:
+            print(category)
+    return categories
+
 
+def build_and_get_categories(api_key, user_input, user_location, profile_details, deadline=None):
+    # Retries, refreshes and identical profiles reuse a recent answer instead of a Gemini round trip
+    cache_key = category_cache_key(user_input, user_location, profile_details) if category_cache else None
+    if cache_key:
+        categories = category_cache.get(cache_key)
+        if categories:
+            print(f"Using {len(categories)} cached categories")
+            return categories
 
-def build_and_get_categories(api_key, user_input, user_location, profile_details):
     prompt = construct_prompt(user_input, user_location, profile_details)
-    categories = get_gemini_categories(api_key, prompt)
+    categories = get_gemini_categories(api_key, prompt, deadline)
+    if cache_key and categories:
+        category_cache.put(cache_key, categories)
     return categories
 
 
+def stream_gemini_categories(api_key, prompt, deadline=None):
+    """Yield each category as soon as Gemini has finished its bullet line"""
+    print("Constructed prompt:\n")
+    print(prompt)
+    pending = ""
+    for chunk in gemini_client.stream(api_key, prompt, deadline=deadline, timeout=GEMINI_TIMEOUT):
+        pending += chunk
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if line.strip():
+                yield _category_from_line(line)
+    if pending.strip():
+        yield _category_from_line(pending)
+
+
+def stream_categories(api_key, user_input, user_location, profile_details, deadline=None):
+    """
+    Streaming build_and_get_categories(): categories are yielded one by one while
+    Gemini is still generating the rest, so their scrapes can start right away.
+    A cached list is yielded at once; a completed stream is cached like a full response.
+    """
+    cache_key = category_cache_key(user_input, user_location, profile_details) if category_cache else None
+    if cache_key:
+        categories = category_cache.get(cache_key)
+        if categories:
+            print(f"Using {len(categories)} cached categories")
+            yield from categories
+            return
+
+    prompt = construct_prompt(user_input, user_location, profile_details)
+    categories = []
+    for category in stream_gemini_categories(api_key, prompt, deadline):
+        print(f"Streamed category: {category}")
+        categories.append(category)
+        yield category
+    if cache_key and categories:
+        category_cache.put(cache_key, categories)
+
+
 def fetch_user_profile(api_url, username=None, email=None):
     params = {}
     if username:
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Default budget per marketplace: one request every 2 seconds, bursts of 2
+DEFAULT_RATE = 0.5
+DEFAULT_BURST = 2
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of sleeping under its lock"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Wait-time statistics
+        self._acquired = 0
+        self._delayed = 0
+        self._declined = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds the caller must wait before using it"""
+        with self._lock:
+            self._refill(time.monotonic())
+            # Tokens may go negative: each waiter owns a slot further in the future
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+            self._acquired += 1
+            if wait > 0:
+                self._delayed += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            return wait
+
+    def try_take(self, spare: float = 0.0) -> bool:
+        """Take a token only if one is free right now with `spare` more left behind; never reserves a future slot"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1 + spare:
+                self._declined += 1
+                return False
+            self._tokens -= 1
+            self._acquired += 1
+            return True
+
+    def refund(self):
+        """Give back a reserved token that was never used"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def available(self) -> float:
+        """Number of tokens that could be taken right now without waiting"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(self._tokens, 0.0)
+
+    def acquire(self) -> float:
+        """Block the calling thread until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Wait on the event loop until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.refund()
+                raise
+        return wait
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "requests": self._acquired,
+                "delayed_requests": self._delayed,
+                "declined_requests": self._declined,
+                "total_wait_seconds": round(self._total_wait, 3),
+                "avg_wait_seconds": round(self._total_wait / self._acquired, 3) if self._acquired else 0.0,
+                "max_wait_seconds": round(self._max_wait, 3),
+            }
+
+
+def _parse_limit(value: str) -> Tuple[float, int]:
+    """Parse a "rate:burst" setting such as "0.5:2" """
+    rate, _, burst = value.partition(":")
+    return float(rate), int(burst) if burst else DEFAULT_BURST
+
+
+class DomainRateLimiter:
+    """One token bucket per Amazon marketplace, so domains never wait on each other"""
+
+    def __init__(self, default_rate: float = DEFAULT_RATE, default_burst: int = DEFAULT_BURST):
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self._limits = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(domain: str) -> str:
+        return domain.lower().replace("www.", "")
+
+    def configure(self, domain: str, rate: float, burst: int):
+        """Set the rate (requests per second) and burst for one domain"""
+        domain = self._normalize(domain)
+        with self._lock:
+            self._limits[domain] = (rate, burst)
+            self._buckets[domain] = TokenBucket(rate, burst)
+
+    def bucket(self, domain: str) -> TokenBucket:
+        domain = self._normalize(domain)
+        with self._lock:
+            bucket = self._buckets.get(domain)
+            if bucket is None:
+                rate, burst = self._limits.get(domain, (self.default_rate, self.default_burst))
+                bucket = TokenBucket(rate, burst)
+                self._buckets[domain] = bucket
+            return bucket
+
+    def acquire(self, domain: str) -> float:
+        return self.bucket(domain).acquire()
+
+    async def acquire_async(self, domain: str) -> float:
+        return await self.bucket(domain).acquire_async()
+
+    def try_acquire(self, domain: str, spare: float = 0.0) -> bool:
+        return self.bucket(domain).try_take(spare)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {domain: bucket.stats() for domain, bucket in buckets.items()}
+
+
+def _limiter_from_env() -> DomainRateLimiter:
+    """
+    Build the shared limiter from the environment:
+      AMAZON_RATE_LIMIT="0.5:2"                         default for every domain
+      AMAZON_RATE_LIMITS="amazon.com=1:3,amazon.de=0.5:2"  per-domain overrides
+    """
+    default_rate, default_burst = DEFAULT_RATE, DEFAULT_BURST
+    default_setting = os.getenv("AMAZON_RATE_LIMIT")
+    if default_setting:
+        try:
+            default_rate, default_burst = _parse_limit(default_setting)
+        except ValueError:
+            print(f"Invalid AMAZON_RATE_LIMIT value: {default_setting}")
+
+    limiter = DomainRateLimiter(default_rate, default_burst)
+    for entry in os.getenv("AMAZON_RATE_LIMITS", "").split(","):
+        if "=" not in entry:
+            continue
+        domain, _, setting = entry.partition("=")
+        try:
+            rate, burst = _parse_limit(setting.strip())
+            limiter.configure(domain.strip(), rate, burst)
+        except ValueError:
+            print(f"Invalid AMAZON_RATE_LIMITS entry: {entry}")
+    return limiter
+
+
+rate_limiter = _limiter_from_env()
+
+
+def get_rate_limit_stats(domain: Optional[str] = None) -> Dict:
+    """Wait-time statistics for all domains, or a single one"""
+    if domain:
+        return rate_limiter.bucket(domain).stats()
+    return rate_limiter.stats()
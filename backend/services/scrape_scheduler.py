@@ -0,0 +1,269 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Coroutine, Dict, Optional
+
+# Priority classes, lower is served first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Requests in flight per marketplace, across all user requests
+DEFAULT_MAX_CONCURRENT = 4
+# Requests waiting for a slot, across all marketplaces; background work may fill half
+DEFAULT_MAX_QUEUED = 200
+
+
+class SchedulerFull(Exception):
+    """Raised when the scrape queue has no room for another waiting request"""
+
+
+class ScrapeJob:
+    """All the scraping done for one user request (or one background task)"""
+
+    __slots__ = ("job_id", "priority", "tasks", "waits", "total_wait")
+
+    def __init__(self, job_id: str, priority: int = INTERACTIVE):
+        self.job_id = job_id
+        self.priority = priority
+        self.tasks = set()
+        self.waits = 0
+        self.total_wait = 0.0
+
+
+# Job of the running task; asyncio copies it into every task the job spawns (hedged strategies, product pages)
+_current_job = contextvars.ContextVar("scrape_job", default=None)
+
+# Requests made outside of any job (scripts, run.py) share one interactive job
+_UNSCHEDULED = ScrapeJob("unscheduled")
+
+
+def current_priority() -> int:
+    """Priority class of the job the running task belongs to"""
+    return (_current_job.get() or _UNSCHEDULED).priority
+
+
+class _DomainQueue:
+    """Waiting requests for one marketplace: priority class -> job -> futures in arrival order"""
+
+    def __init__(self):
+        self.running = 0
+        self.waiting = {INTERACTIVE: OrderedDict(), BACKGROUND: OrderedDict()}
+        self.queued = 0
+
+        self.granted = 0
+        self.delayed = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class ScrapeScheduler:
+    """
+    Process-wide scheduler for outbound scrape requests.
+
+    Every request to a marketplace holds a slot while it is in flight, at most
+    `max_concurrent` per marketplace. When slots are taken, waiting requests are
+    served interactive before background and, within a class, round-robin between
+    jobs, so a user request with many categories and retries cannot starve the
+    others. At most `max_queued` requests wait at once; beyond that (or beyond half
+    of it for background work) acquire() raises SchedulerFull instead of queueing.
+
+    Slots are acquired and released on the scraper event loop; stats() and
+    cancel_job() may be called from any thread.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT, max_queued: int = DEFAULT_MAX_QUEUED):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max_queued
+        self._domains = {}
+        self._jobs = {}
+        self._queued = 0
+        self._rejected = 0
+        self._cancelled_jobs = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(domain: str) -> str:
+        return domain.lower().replace("www.", "")
+
+    def _queue(self, domain: str) -> _DomainQueue:
+        queue = self._domains.get(domain)
+        if queue is None:
+            queue = self._domains[domain] = _DomainQueue()
+        return queue
+
+    async def run(self, coro: Coroutine, job_id: str, priority: int = INTERACTIVE) -> Any:
+        """Run `coro` as part of job `job_id`; every scrape request it makes is scheduled under that job"""
+        task = asyncio.current_task()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = self._jobs[job_id] = ScrapeJob(job_id, priority)
+            job.tasks.add(task)
+        token = _current_job.set(job)
+        try:
+            return await coro
+        finally:
+            _current_job.reset(token)
+            with self._lock:
+                job.tasks.discard(task)
+                if not job.tasks:
+                    self._jobs.pop(job_id, None)
+
+    def cancel_job(self, job_id: str) -> int:
+        """Cancel everything still running for an abandoned job, returns the number of tasks cancelled"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            tasks = list(job.tasks) if job else []
+            if tasks:
+                self._cancelled_jobs += 1
+        for task in tasks:
+            # Tasks belong to the scraper event loop, which may not be the calling thread's
+            task.get_loop().call_soon_threadsafe(task.cancel)
+        return len(tasks)
+
+    async def acquire(self, domain: str, timeout: Optional[float] = None):
+        """Wait for a request slot at `domain`, at most `timeout` seconds (asyncio.TimeoutError)"""
+        domain = self._normalize(domain)
+        job = _current_job.get() or _UNSCHEDULED
+        with self._lock:
+            queue = self._queue(domain)
+            if queue.running < self.max_concurrent and not queue.queued:
+                queue.running += 1
+                queue.granted += 1
+                return
+            limit = self.max_queued if job.priority == INTERACTIVE else self.max_queued // 2
+            if self._queued >= limit:
+                self._rejected += 1
+                raise SchedulerFull(f"Scrape queue is full ({self._queued} requests waiting)")
+            waiter = asyncio.get_running_loop().create_future()
+            queue.waiting[job.priority].setdefault(job, deque()).append(waiter)
+            queue.queued += 1
+            self._queued += 1
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            with self._lock:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted just as the wait ended: pass the slot on
+                    self._release(queue)
+                else:
+                    waiter.cancel()
+                    self._remove_waiter(queue, job, waiter)
+                    queue.timeouts += 1
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            queue.delayed += 1
+            queue.total_wait += waited
+            queue.max_wait = max(queue.max_wait, waited)
+            job.waits += 1
+            job.total_wait += waited
+
+    def release(self, domain: str):
+        """Give back the slot taken by acquire()"""
+        with self._lock:
+            self._release(self._queue(self._normalize(domain)))
+
+    def _release(self, queue: _DomainQueue):
+        queue.running -= 1
+        while queue.running < self.max_concurrent:
+            waiter = self._next_waiter(queue)
+            if waiter is None:
+                return
+            # The slot passes straight to the waiter, it resumes already holding it
+            queue.running += 1
+            queue.granted += 1
+            waiter.set_result(None)
+
+    def _next_waiter(self, queue: _DomainQueue) -> Optional[asyncio.Future]:
+        for priority in (INTERACTIVE, BACKGROUND):
+            jobs = queue.waiting[priority]
+            while jobs:
+                job, waiters = next(iter(jobs.items()))
+                waiter = waiters.popleft()
+                queue.queued -= 1
+                self._queued -= 1
+                # Round-robin: a job with more waiting requests goes to the back of the line
+                if waiters:
+                    jobs.move_to_end(job)
+                else:
+                    del jobs[job]
+                if not waiter.done():
+                    return waiter
+        return None
+
+    def _remove_waiter(self, queue: _DomainQueue, job: ScrapeJob, waiter: asyncio.Future):
+        waiters = queue.waiting[job.priority].get(job)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        queue.queued -= 1
+        self._queued -= 1
+        if not waiters:
+            del queue.waiting[job.priority][job]
+
+    def idle(self, domain: str) -> bool:
+        """Whether nothing is in flight or waiting for `domain`, i.e. background work would compete with no one"""
+        with self._lock:
+            queue = self._domains.get(self._normalize(domain))
+            return queue is None or (queue.running == 0 and queue.queued == 0)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "max_concurrent_per_domain": self.max_concurrent,
+                "max_queued": self.max_queued,
+                "queued": self._queued,
+                "rejected": self._rejected,
+                "cancelled_jobs": self._cancelled_jobs,
+                "active_jobs": {
+                    PRIORITY_NAMES[priority]: sum(1 for job in self._jobs.values() if job.priority == priority)
+                    for priority in PRIORITY_NAMES
+                },
+                "domains": {
+                    domain: {
+                        "running": queue.running,
+                        "waiting": {
+                            PRIORITY_NAMES[priority]: sum(len(waiters) for waiters in jobs.values())
+                            for priority, jobs in queue.waiting.items()
+                        },
+                        "granted": queue.granted,
+                        "delayed": queue.delayed,
+                        "wait_timeouts": queue.timeouts,
+                        "avg_wait": round(queue.total_wait / queue.delayed, 3) if queue.delayed else 0.0,
+                        "max_wait": round(queue.max_wait, 3),
+                    }
+                    for domain, queue in self._domains.items()
+                },
+            }
+
+
+def _scheduler_from_env() -> ScrapeScheduler:
+    """
+    Build the shared scheduler from the environment:
+      SCRAPER_MAX_CONCURRENT_PER_DOMAIN  requests in flight per marketplace (default 4)
+      SCRAPER_QUEUE_LIMIT                requests allowed to wait for a slot (default 200)
+    """
+    try:
+        return ScrapeScheduler(
+            max_concurrent=int(os.getenv("SCRAPER_MAX_CONCURRENT_PER_DOMAIN", str(DEFAULT_MAX_CONCURRENT))),
+            max_queued=int(os.getenv("SCRAPER_QUEUE_LIMIT", str(DEFAULT_MAX_QUEUED))),
+        )
+    except ValueError as e:
+        print(f"Invalid scrape scheduler setting, using defaults: {e}")
+        return ScrapeScheduler()
+
+
+scrape_scheduler = _scheduler_from_env()
+
+
+def get_scrape_scheduler_stats() -> Dict:
+    return scrape_scheduler.stats()
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from typing import Any, Callable, Coroutine, Dict, Hashable, Optional
+
+
+class _Flight:
+    __slots__ = ("task", "size", "expires_at", "priority", "waiters")
+
+    def __init__(self, task: asyncio.Task, size: int, expires_at: Optional[float], priority: int):
+        self.task = task
+        self.size = size
+        self.expires_at = expires_at
+        self.priority = priority
+        self.waiters = 0
+
+    def covers(self, size: int, expires_at: Optional[float], priority: int) -> bool:
+        """Whether a caller with these needs gets everything it would get from its own flight"""
+        if self.task.done() or self.size < size or self.priority > priority:
+            return False
+        # A flight without a deadline outlasts any caller, one with a deadline only earlier callers
+        return self.expires_at is None or (expires_at is not None and self.expires_at >= expires_at)
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent work: the first caller for a key starts the
+    coroutine, callers arriving while it runs await the same result.
+
+    The work runs in its own task, so one caller giving up (timeout, cancelled
+    request) does not cancel it for the others; it is only cancelled once every
+    caller has given up. A caller only joins a running flight that fetches at
+    least its `size` (e.g. number of results), runs until at least its
+    `expires_at` (time.monotonic(), None for no deadline) and at a `priority` at
+    least as urgent (lower is more urgent, like the scrape scheduler's classes).
+    Otherwise it starts its own flight, which later callers join instead.
+
+    do() must be called on the scraper event loop; stats() may be read from any thread.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._started = 0
+        self._joined = 0
+        self._abandoned = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        work: Callable[[], Coroutine],
+        size: int = 0,
+        timeout: Optional[float] = None,
+        expires_at: Optional[float] = None,
+        priority: int = 0,
+    ) -> Any:
+        """Result of work() for `key`, shared with concurrent callers; asyncio.TimeoutError after `timeout`"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and not flight.covers(size, expires_at, priority):
+                flight = None
+            if flight is None:
+                flight = _Flight(asyncio.ensure_future(work()), size, expires_at, priority)
+                self._flights[key] = flight
+                self._started += 1
+                flight.task.add_done_callback(lambda _, key=key, flight=flight: self._finished(key, flight))
+            else:
+                self._joined += 1
+            flight.waiters += 1
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            with self._lock:
+                flight.waiters -= 1
+                if flight.waiters == 0 and not flight.task.done():
+                    # Nobody is waiting for the result anymore
+                    flight.task.cancel()
+                    self._abandoned += 1
+            raise
+        else:
+            with self._lock:
+                flight.waiters -= 1
+
+    def _finished(self, key: Hashable, flight: _Flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = self._started + self._joined
+            return {
+                "in_flight": len(self._flights),
+                "started": self._started,
+                "coalesced": self._joined,
+                "coalesced_rate": round(self._joined / calls, 3) if calls else 0.0,
+                "abandoned": self._abandoned,
+            }
@@ -1,6 +1,6 @@
-import requests
 import json
 import os
+from services.gemini_client import GEMINI_GENERATE_URL, GeminiClient, gemini_client
 from services.prompt_builder import build_and_get_categories, fetch_user_profile
 from services.amazon_scraper import amazon_category_top_products, scrape_amazon_product
 
@@ -9,6 +9,8 @@ class SortingAlgorithm:
     def __init__(self, gemini_api_url, gemini_api_key):
         self.api_url = gemini_api_url
         self.api_key = gemini_api_key
+        # The shared client keeps its connections warm between requests
+        self.client = gemini_client if gemini_api_url == gemini_client.url else GeminiClient(gemini_api_url)
 
     def build_prompt(self, user_input, user_profile_details, amazon_scraper_results):
         prompt = (
@@ -68,40 +70,22 @@ class SortingAlgorithm:
         ).format(
             user_input,
             json.dumps(user_profile_details),
-            json.dumps(amazon_scraper_results),
+            json.dumps([product.to_prompt() for product in amazon_scraper_results]),
         )
         return prompt
 
     def get_sorted_products(
-        self, user_input, user_profile_details, amazon_scraper_results
+        self, user_input, user_profile_details, amazon_scraper_results, deadline=None
     ):
         prompt = self.build_prompt(
             user_input, user_profile_details, amazon_scraper_results
         )
-        api_key = self.api_key
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-        headers = {"Content-Type": "application/json"}
-        data = {"contents": [{"parts": [{"text": prompt}]}]}
-
-        # Add timeout to the API call
-        response = requests.post(url, headers=headers, json=data, timeout=15)
-        if response.status_code == 200:
-            result = response.json()
-            output_text = ""
-            candidates = result.get("candidates", [])
-            if candidates and "content" in candidates[0]:
-                parts = candidates[0]["content"].get("parts", [])
-                if parts:
-                    output_text = parts[0].get("text", "")
-            return output_text
-        else:
-            raise Exception(
-                f"Gemini API request failed with status code {response.status_code}: {response.text}"
-            )
+        # Timeout of the call, never past the request deadline; GeminiError when it fails
+        return self.client.generate(self.api_key, prompt, deadline=deadline, timeout=15)
 
 
 if __name__ == "__main__":
-    gemini_api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+    gemini_api_url = GEMINI_GENERATE_URL
     gemini_api_key = os.getenv('GEMINI_API_KEY')
 
     if not gemini_api_key:
@@ -132,14 +116,14 @@ if __name__ == "__main__":
     amazon_domain = "amazon.com"
     amazon_results = []
     for category in categories[:7]:
-        urls = amazon_category_top_products(
+        search_results = amazon_category_top_products(
             category,
             amazon_domain,
             num_results=3,
             budget_range=user_profile_details.get("budget_range"),
         )
-        for url in urls:
-            product_info = scrape_amazon_product(url)
+        for result in search_results:
+            product_info = scrape_amazon_product(result.url)
             if product_info:
                 amazon_results.append(product_info)
 
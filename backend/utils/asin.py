@@ -0,0 +1,60 @@
+import re
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+# Path segments that are followed by the ASIN in the URL forms Amazon links to:
+#   /Some-Slug/dp/B0ABCDEF12/ref=...   /dp/product/B0ABCDEF12   /gp/product/B0ABCDEF12
+#   /gp/aw/d/B0ABCDEF12 (mobile)       /exec/obidos/ASIN/B0ABCDEF12   /o/ASIN/B0ABCDEF12
+_ASIN_PATH_PATTERN = re.compile(
+    r"/(?:dp(?:/product)?|gp/product|gp/aw/d|gp/offer-listing|exec/obidos/(?:asin|ASIN|tg/detail/-)|o/ASIN)"
+    r"/([A-Za-z0-9]{10})(?=[/?#&;]|$)"
+)
+# Query parameters that carry the ASIN on redirect and tracking links
+_ASIN_QUERY_PATTERN = re.compile(r"(?:^|[?&;])(?:asin|ASIN|pd_rd_i)=([A-Za-z0-9]{10})(?=[&;#]|$)")
+_ASIN_PATTERN = re.compile(r"^[A-Z0-9]{10}$")
+
+
+def normalize_asin(value: Optional[str]) -> Optional[str]:
+    """Upper-case and validate a bare ASIN, None if it is not one"""
+    if not value:
+        return None
+    value = value.strip().upper()
+    return value if _ASIN_PATTERN.match(value) else None
+
+
+def canonical_asin(url: Optional[str]) -> Optional[str]:
+    """
+    Extract the ASIN from any Amazon product URL form: slugged /dp/ links,
+    /gp/product, mobile /gp/aw/d, legacy /exec/obidos, and sponsored
+    redirect links (/sspa/click?url=...) whose target is percent-encoded.
+    """
+    if not url:
+        return None
+
+    # Sponsored links wrap the product path in an encoded query parameter; two
+    # rounds of unquoting cover the double-encoded variants
+    candidates = [url]
+    decoded = unquote(url)
+    if decoded != url:
+        candidates.append(decoded)
+        candidates.append(unquote(decoded))
+
+    for candidate in candidates:
+        match = _ASIN_PATH_PATTERN.search(candidate)
+        if match:
+            return normalize_asin(match.group(1))
+    for candidate in candidates:
+        match = _ASIN_QUERY_PATTERN.search(urlsplit(candidate).query)
+        if match:
+            return normalize_asin(match.group(1))
+    return None
+
+
+def canonical_product_url(url: str) -> str:
+    """https://<host>/dp/<ASIN> for product URLs, otherwise the URL without its fragment"""
+    parts = urlsplit(url)
+    asin = canonical_asin(url)
+    host = parts.netloc.lower() or "www.amazon.com"
+    if asin:
+        return f"https://{host}/dp/{asin}"
+    return parts._replace(netloc=host, fragment="").geturl()
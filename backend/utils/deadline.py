@@ -0,0 +1,48 @@
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    End-to-end time budget for one request. Created when the request arrives and
+    handed to every stage, which sizes its timeouts from what is left instead of
+    using its own fixed number.
+    """
+
+    __slots__ = ("budget", "started_at", "expires_at")
+
+    def __init__(self, budget: float, expires_at: Optional[float] = None):
+        self.budget = budget
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget if expires_at is None else expires_at
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def has(self, seconds: float) -> bool:
+        """Whether at least `seconds` are left, used to skip optional work when the budget runs low"""
+        return self.remaining() >= seconds
+
+    def timeout(self, cap: Optional[float] = None, floor: float = 0.1) -> float:
+        """Timeout for one blocking call: the remaining budget, at most `cap`, never zero"""
+        remaining = self.remaining()
+        if cap is not None:
+            remaining = min(remaining, cap)
+        return max(remaining, floor)
+
+    def child(self, budget: float, reserve: float = 0.0) -> "Deadline":
+        """
+        Sub-deadline for one stage: `budget` seconds from now, but ending at least
+        `reserve` seconds before this deadline so later stages keep their share.
+        """
+        now = time.monotonic()
+        return Deadline(budget, expires_at=min(now + budget, self.expires_at - reserve))
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.1f}s of {self.budget:.1f}s)"
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import threading
+from typing import List, Optional
+
+
+class DiskLRU:
+    """
+    Size-bounded directory of files, one per key. Writes are atomic; once the files
+    exceed max_bytes, the least recently used are removed until they fit in 90% of it.
+    Recency is the file's mtime, which touch() bumps on every hit.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(os.path.getsize(path) for path in self.entry_paths())
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2].lower(), key + self.suffix)
+
+    def entry_paths(self) -> List[str]:
+        paths = []
+        for root, _, files in os.walk(self.directory):
+            # Skip files of other kinds next to the entries and half-written temporaries
+            if root == self.directory:
+                continue
+            paths.extend(
+                os.path.join(root, name) for name in files if name.endswith(self.suffix) and not name.endswith(".tmp")
+            )
+        return paths
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def touch(self, key: str):
+        """Mark an entry as used, so eviction is least-recently-used rather than oldest-written"""
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+
+    def write(self, key: str, data: bytes):
+        """Store an entry atomically, evicting least recently used entries over max_bytes"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.total_bytes += len(data) - previous
+            over_budget = self.total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def remove(self, path: str) -> int:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return 0
+        with self._lock:
+            self.total_bytes -= size
+        return size
+
+    def evict(self):
+        """Drop least recently used entries until the files are back under 90% of max_bytes"""
+        entries = []
+        for path in self.entry_paths():
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        entries.sort()
+
+        target = self.max_bytes * 0.9
+        for _, path in entries:
+            with self._lock:
+                if self.total_bytes <= target:
+                    break
+            if self.remove(path):
+                with self._lock:
+                    self.evictions += 1
+
+    def clear(self):
+        for path in self.entry_paths():
+            self.remove(path)
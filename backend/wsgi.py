@@ -6,6 +6,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from api.backend_api import app
+from services.prefetcher import start_prefetcher
+
+# Keep the search pages of popular categories warm with spare scraping capacity (PREFETCH_ENABLED=true)
+start_prefetcher()
 
 # For production WSGI servers like Gunicorn
 if __name__ == "__main__":